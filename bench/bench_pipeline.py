@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_pipeline.py
+
+Benchmarks do pipeline sobre os dados sintéticos de bench/gerar_dados_sinteticos.py.
+Cenários (nesta ordem; cada um usa a saída do anterior):
+  process_chunk   leitura do CSV bruto + prepare_data.process_chunk + gravação parquet + esquema tipado
+  enriquecimento  build_dimensoes (uma varredura) + build_fato_enriquecido (junções)
+  dashboard       core_dataviz.preparar_df / congelar / choices / filter_df / kpis / agregações dos gráficos
+  dashboard_duckdb  o mesmo pelo backend DuckDB (core_duckdb: Parquet em disco, consultas lazy)
+  exports         export_stream: CSV completo e CSV filtrado com gzip
+
+Os resultados vão para bench/resultados/historico.jsonl (um registro por cenário,
+com o commit atual) e são comparados com a última execução de OUTRO commit
+(ou a do commit passado em --comparar) na mesma escala.
+
+  python bench/gerar_dados_sinteticos.py --escala 1m
+  python bench/bench_pipeline.py --escala 1m
+  python bench/bench_pipeline.py --escala 1m --cenarios dashboard,exports --repeticoes 3
+  python bench/bench_pipeline.py --historico --escala 10m
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+sys.path.insert(0, str(BASE_DIR / "streamlit_app"))
+sys.path.insert(0, str(BASE_DIR / "bench"))
+
+from gerar_dados_sinteticos import DADOS_DIR, ESCALAS, caminho_padrao, gerar  # noqa: E402
+from instrumentacao import etapa  # noqa: E402
+
+RESULTADOS = BASE_DIR / "bench" / "resultados" / "historico.jsonl"
+CENARIOS = ["process_chunk", "enriquecimento", "dashboard", "dashboard_duckdb", "exports"]
+
+# =====================
+# Utilitários
+# =====================
+
+def _git(*args) -> str | None:
+    try:
+        out = subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def versao_codigo() -> dict:
+    commit = _git("rev-parse", "HEAD")
+    sujo = _git("status", "--porcelain", "--untracked-files=no", "--", "src", "streamlit_app", "bench")
+    return {
+        "commit": commit,
+        "commit_curto": commit[:10] if commit else None,
+        "assunto": _git("log", "-1", "--format=%s"),
+        "sujo": bool(sujo),
+    }
+
+def maquina() -> dict:
+    return {
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+class Cronometro:
+    """Tempo acumulado por subetapa dentro de um cenário."""
+
+    def __init__(self):
+        self.tempos: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def __call__(self, nome: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - t0
+
+@contextlib.contextmanager
+def _silencioso(ativo: bool):
+    if not ativo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def _exigir(path: Path, cenario: str):
+    if not path.exists():
+        raise FileNotFoundError(f"{path} não existe: rode antes o cenário '{cenario}'.")
+
+# =====================
+# Cenários
+# =====================
+
+def bench_process_chunk(dirs: dict, crono: Cronometro, silencioso: bool) -> int:
+    import prepare_data
+    from dedup_pedidos import DeduplicadorPedidos
+    from esquema_tipado import tipar_partes
+
+    csv = dirs["csv"]
+    _exigir(csv, "gerar (bench/gerar_dados_sinteticos.py)")
+    proc = dirs["processed"]
+    proc.mkdir(parents=True, exist_ok=True)
+    for antigo in proc.glob("*.parquet"):
+        antigo.unlink()
+
+    linhas = 0
+    partes = []
+    reader = prepare_data.abrir_leitor(csv)
+    dedup = DeduplicadorPedidos(modo=prepare_data.DEDUP)
+    try:
+        i = 0
+        while True:
+            with crono("ler_csv"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            i += 1
+            with crono("process_chunk"), _silencioso(silencioso):
+                chunk = prepare_data.process_chunk(chunk)
+            with crono("dedup"):
+                chunk = dedup.processar(i, chunk)
+            with crono("gravar_parquet"):
+                partes.append(proc / f"part_{i:03d}.parquet")
+                chunk.to_parquet(partes[-1], index=False, engine="pyarrow")
+            linhas += len(chunk)
+    finally:
+        dedup.fechar()
+    if partes:
+        with crono("tipar_combinar"):
+            tipar_partes(partes, proc / "vendas_completo.parquet")
+    return linhas
+
+def bench_enriquecimento(dirs: dict, crono: Cronometro, silencioso: bool) -> int:
+    import build_dimensoes
+    import build_fato_enriquecido
+
+    fato = dirs["processed"] / "vendas_completo.parquet"
+    _exigir(fato, "process_chunk")
+    for antigo in dirs["dimensoes"].glob("*"):
+        antigo.unlink()   # dimensões e caches do resolver recriados do zero a cada medição
+
+    with crono("dimensoes"), _silencioso(silencioso):
+        build_dimensoes.executar(dirs["processed"], dirs["dimensoes"])
+    with crono("fato_enriquecido"), _silencioso(silencioso):
+        build_fato_enriquecido.main(str(fato), str(dirs["dimensoes"]), str(dirs["enriquecido"]))
+    return pq.ParquetFile(fato).metadata.num_rows
+
+def _consultas_dashboard(core, df, crono: Cronometro) -> int:
+    """Mesma sequência do app_streamlit.py: opções do sidebar, filtro, KPIs e gráficos."""
+    with crono("choices"):
+        opcoes = core.choices(df)
+
+    # seleção "típica" do sidebar: último ano, 3 estados, 2 categorias, 2 responsáveis
+    filtros = {
+        "anos": opcoes["anos"][-1:],
+        "estados": opcoes["estados"][:3],
+        "categorias": opcoes["categorias"][:2],
+        "responsaveis": opcoes["responsaveis"][:2],
+    }
+    with crono("filter_df"):
+        filtrado = core.filter_df(df, **filtros)
+    ref_mes = opcoes["meses"][-1] if opcoes["meses"] else None
+    with crono("kpis_filtrado"):
+        core.kpis(filtrado, ref_mes=ref_mes)
+    with crono("kpis_total"):
+        core.kpis(df, ref_mes=ref_mes)
+    with crono("graficos"):
+        core.serie_mensal(filtrado)
+        core.receita_por(filtrado, "categoria")
+        core.receita_por(filtrado, "responsavelpedido", top=10)
+        core.receita_por(filtrado, "estado")
+        core.metrica_por_uf(filtrado, "Ticket Médio")
+    with crono("tabela"):
+        core.tabela_indicadores(filtrado, [("mes", "Ano Mês"), ("estado", "Estado"), ("categoria", "CategoriaProd")])
+    return len(df)
+
+def bench_dashboard(dirs: dict, crono: Cronometro, silencioso: bool) -> int:
+    import core_dataviz
+
+    fato = dirs["enriquecido"] / "vendas_completo_enriquecido.parquet"
+    _exigir(fato, "enriquecimento")
+    with crono("ler_parquet"):
+        df = pd.read_parquet(fato, engine="pyarrow")
+    with crono("preparar_df"):
+        df = core_dataviz.preparar_df(df)
+    with crono("congelar"):
+        df = core_dataviz.congelar(df)  # como no app: dataset Arrow compartilhado
+    return _consultas_dashboard(core_dataviz, df, crono)
+
+def bench_dashboard_duckdb(dirs: dict, crono: Cronometro, silencioso: bool) -> int:
+    import core_duckdb
+
+    fato = dirs["enriquecido"] / "vendas_completo_enriquecido.parquet"
+    _exigir(fato, "enriquecimento")
+    with crono("load_df"):
+        df = core_duckdb.load_df(str(fato))
+    return _consultas_dashboard(core_duckdb, df, crono)
+
+def bench_exports(dirs: dict, crono: Cronometro, silencioso: bool) -> int:
+    from export_stream import exportar_csv_stream
+
+    fato = dirs["enriquecido"] / "vendas_completo_enriquecido.parquet"
+    _exigir(fato, "enriquecimento")
+    out = dirs["exports"]
+    with crono("csv_completo"):
+        saidas = exportar_csv_stream(fato, out / "vendas_completo.csv")
+    with crono("csv_filtrado_gzip"):
+        exportar_csv_stream(
+            fato, out / "vendas_sp.csv",
+            colunas=["cod_pedido", "data", "estado", "produto", "valor_total_bruto"],
+            filtros=["estado=SP,RJ,MG"], usar_gzip=True,
+        )
+    return sum(n for _, n in saidas)
+
+FUNCOES = {
+    "process_chunk": bench_process_chunk,
+    "enriquecimento": bench_enriquecimento,
+    "dashboard": bench_dashboard,
+    "dashboard_duckdb": bench_dashboard_duckdb,
+    "exports": bench_exports,
+}
+
+# =====================
+# Execução / histórico
+# =====================
+
+def diretorios(escala: str, csv: Path | None = None) -> dict:
+    base = DADOS_DIR / escala
+    dirs = {
+        "csv": Path(csv) if csv else caminho_padrao(escala),
+        "processed": base / "processed",
+        "dimensoes": base / "dimensoes",
+        "enriquecido": base / "enriquecido",
+        "exports": base / "exports",
+    }
+    for k, p in dirs.items():
+        if k != "csv":
+            p.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+def rodar_cenario(nome: str, dirs: dict, repeticoes: int, silencioso: bool) -> dict:
+    """Executa o cenário `repeticoes` vezes e fica com a mais rápida (tempo de parede)."""
+    melhor = None
+    for _ in range(max(1, repeticoes)):
+        crono = Cronometro()
+        with etapa(f"bench_{nome}") as m:
+            linhas = FUNCOES[nome](dirs, crono, silencioso)
+        if melhor is None or m.segundos < melhor["segundos"]:
+            melhor = {
+                "cenario": nome,
+                "linhas": linhas,
+                "segundos": round(m.segundos, 4),
+                "cpu_segundos": round(m.cpu_segundos, 4),
+                "rss_pico_mb": round(m.rss_pico / 2**20, 1) if m.rss_pico else None,
+                "linhas_por_s": round(linhas / m.segundos) if m.segundos else None,
+                "subetapas": {k: round(v, 4) for k, v in crono.tempos.items()},
+            }
+    return melhor
+
+def carregar_historico(path: Path = RESULTADOS) -> list[dict]:
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+def referencia(historico: list[dict], reg: dict, comparar: str | None) -> dict | None:
+    """Última medição do mesmo cenário/escala em outro commit (ou no commit pedido)."""
+    candidatos = [
+        h for h in historico
+        if h["cenario"] == reg["cenario"] and h["escala"] == reg["escala"]
+        and ((h.get("commit") or "").startswith(comparar) if comparar else h.get("commit") != reg.get("commit"))
+    ]
+    return candidatos[-1] if candidatos else None
+
+def imprimir(registros: list[dict], historico: list[dict], comparar: str | None):
+    print(f"\n{'cenário':<18}{'linhas':>14}{'parede(s)':>11}{'CPU(s)':>10}{'RSS MB':>9}{'linhas/s':>14}  vs. referência")
+    for r in registros:
+        ref = referencia(historico, r, comparar)
+        delta = ""
+        if ref and ref["segundos"]:
+            pct = (r["segundos"] - ref["segundos"]) / ref["segundos"] * 100
+            delta = f"{pct:+.1f}% ({ref['segundos']:.2f}s em {ref.get('commit_curto') or '?'})"
+        rss = f"{r['rss_pico_mb']:.0f}" if r["rss_pico_mb"] is not None else "-"
+        print(f"{r['cenario']:<18}{r['linhas']:>14,}{r['segundos']:>11.2f}{r['cpu_segundos']:>10.2f}"
+              f"{rss:>9}{r['linhas_por_s'] or 0:>14,}  {delta}")
+        for sub, seg in r["subetapas"].items():
+            ref_sub = (ref or {}).get("subetapas", {}).get(sub)
+            extra = f"  ({(seg - ref_sub) / ref_sub * 100:+.1f}%)" if ref_sub else ""
+            print(f"  - {sub:<22}{seg:>10.2f}s{extra}")
+
+def imprimir_historico(historico: list[dict], escala: str | None):
+    linhas = [h for h in historico if escala is None or h["escala"] == escala]
+    if not linhas:
+        print("[INFO] Histórico vazio.")
+        return
+    df = pd.DataFrame(linhas)
+    tabela = df.pivot_table(index=["escala", "data", "commit_curto"], columns="cenario",
+                            values="segundos", aggfunc="min")
+    print(tabela.reindex(columns=[c for c in CENARIOS if c in tabela.columns]).to_string())
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks do pipeline com dados sintéticos.")
+    ap.add_argument("--escala", default="1m", help=f"Escala dos dados ({', '.join(ESCALAS)} ou a usada em --linhas).")
+    ap.add_argument("--csv", default=None, help="CSV bruto (padrão: bench/dados/<escala>/vendas.csv).")
+    ap.add_argument("--gerar", action="store_true", help="Gera o CSV sintético se ele não existir.")
+    ap.add_argument("--cenarios", default=",".join(CENARIOS), help="Lista separada por vírgula.")
+    ap.add_argument("--repeticoes", type=int, default=1, help="Repete cada cenário e fica com o melhor tempo.")
+    ap.add_argument("--comparar", default=None, help="Commit (prefixo) de referência na comparação.")
+    ap.add_argument("--nao-salvar", action="store_true", help="Não grava em bench/resultados/historico.jsonl.")
+    ap.add_argument("--verboso", action="store_true", help="Mostra as mensagens dos scripts do pipeline.")
+    ap.add_argument("--historico", action="store_true", help="Só lista o histórico (tempo por commit).")
+    args = ap.parse_args(argv)
+
+    historico = carregar_historico()
+    if args.historico:
+        imprimir_historico(historico, args.escala if args.escala != "todas" else None)
+        return
+
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    desconhecidos = [c for c in cenarios if c not in FUNCOES]
+    if desconhecidos:
+        raise SystemExit(f"[ERRO] Cenário(s) desconhecido(s): {desconhecidos}. Use: {CENARIOS}")
+
+    dirs = diretorios(args.escala, args.csv)
+    if not dirs["csv"].exists() and "process_chunk" in cenarios:
+        if not args.gerar:
+            raise SystemExit(f"[ERRO] {dirs['csv']} não existe. Rode bench/gerar_dados_sinteticos.py "
+                             f"--escala {args.escala} (ou use --gerar).")
+        if args.escala not in ESCALAS:
+            raise SystemExit(f"[ERRO] --gerar só conhece as escalas {list(ESCALAS)}.")
+        gerar(ESCALAS[args.escala], dirs["csv"])
+
+    versao = versao_codigo()
+    if versao["sujo"]:
+        print("[AVISO] Há alterações não commitadas em src/streamlit_app/bench: o registro sai marcado como 'sujo'.")
+
+    inicio = datetime.now().isoformat(timespec="seconds")   # identifica a execução no histórico
+    registros = []
+    for nome in [c for c in CENARIOS if c in cenarios]:
+        print(f"[INFO] {nome} ({args.escala})…")
+        r = rodar_cenario(nome, dirs, args.repeticoes, silencioso=not args.verboso)
+        r.update({
+            "escala": args.escala,
+            "data": inicio,
+            "repeticoes": args.repeticoes,
+            **versao,
+            "maquina": maquina(),
+        })
+        registros.append(r)
+
+    imprimir(registros, historico, args.comparar)
+    if not args.nao_salvar:
+        RESULTADOS.parent.mkdir(parents=True, exist_ok=True)
+        with open(RESULTADOS, "a", encoding="utf-8") as f:
+            for r in registros:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"\n[OK] Resultados gravados em: {RESULTADOS}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_regioes.py
+
+Compara a derivação de regiao_pais antiga (DataFrame.apply linha a linha,
+como estava em eda_quick.py) com o motor vetorizado de src/regioes.py,
+usando o parquet de amostra (sample/vendas_completo_enriquecido.parquet).
+O eda_quick passou a usar o mapa de países do prepare_data (maior e sem
+diferenciar maiúsculas): as regiões que mudam são listadas e conferidas.
+
+  python bench/bench_regioes.py --repeticoes 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from regioes import PAISES_BRASIL, REGIOES_BRASIL_POR_UF, REGIOES_POR_PAIS, derivar_regiao_pais  # noqa: E402
+
+SAMPLE = BASE_DIR / "sample" / "vendas_completo_enriquecido.parquet"
+
+def _regiao_linha_a_linha(df: pd.DataFrame) -> pd.Series:
+    """Implementação antiga (referência): um pd.Series por linha."""
+    regioes_por_pais = {"Brazil": "LATAM", "Brasil": "LATAM",
+                        "Argentina": "LATAM", "United States": "NA", "Germany": "EMEA"}
+
+    def _derive_regiao(row):
+        pais = row.get("pais")
+        uf = row.get("uf")
+        if pais and str(pais).strip().lower() in ["brazil", "brasil"]:
+            if pd.notna(uf):
+                return REGIOES_BRASIL_POR_UF.get(str(uf).upper(), "Brasil - Desconhecida")
+            return "Brasil - N/A"
+        if pais and pd.notna(pais):
+            return regioes_por_pais.get(str(pais), "Outras Regiões")
+        if uf and pd.notna(uf):
+            return REGIOES_BRASIL_POR_UF.get(str(uf).upper(), "Brasil - Desconhecida")
+        return "N/A"
+
+    return df.apply(_derive_regiao, axis=1)
+
+def carregar(repeticoes: int) -> pd.DataFrame:
+    base = pd.read_parquet(SAMPLE, columns=["cod_pedido", "estado"])
+    df = pd.concat([base] * repeticoes, ignore_index=True)
+    rng = np.random.default_rng(42)
+    # amostra não tem 'pais': simula 90% Brasil + outros países (com grafias variadas)
+    df["pais"] = rng.choice(["Brasil", "Brazil", "BRASIL", "Argentina", "Germany", "Chile", "uruguay",
+                             "united states", "Japan"], size=len(df),
+                            p=[0.55, 0.3, 0.05, 0.03, 0.02, 0.02, 0.01, 0.01, 0.01])
+    df["uf"] = df.pop("estado")
+    return df
+
+def cronometrar(func, *args):
+    t0 = time.perf_counter()
+    out = func(*args)
+    return out, time.perf_counter() - t0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de derivação de regiao_pais.")
+    ap.add_argument("--repeticoes", type=int, default=1, help="Replica a amostra N vezes.")
+    ap.add_argument("--sem-antigo", action="store_true", help="Não roda a versão linha a linha.")
+    args = ap.parse_args(argv)
+
+    df = carregar(args.repeticoes)
+    print(f"[INFO] {len(df):,} linhas")
+
+    novo, t_novo = cronometrar(
+        lambda d: derivar_regiao_pais(d.index, pais=d["pais"], uf=d["uf"], assumir_brasil_sem_pais=True), df
+    )
+    print(f"[BENCH] vetorizado (regioes.py):  {t_novo:8.3f}s")
+
+    if not args.sem_antigo:
+        antigo, t_antigo = cronometrar(_regiao_linha_a_linha, df)
+        print(f"[BENCH] apply(axis=1) antigo:     {t_antigo:8.3f}s  ({t_antigo / t_novo:,.0f}x mais lento)")
+        # mesma saída para os países que o mapa antigo conhecia
+        conhecidos = df["pais"].isin(["Brasil", "Brazil", "Argentina", "Germany"])
+        iguais = (novo[conhecidos].astype(str) == antigo[conhecidos].astype(str)).all()
+        print(f"[CHECK] resultados iguais (países do mapa antigo): {iguais}")
+
+        # demais países: mudança esperada, vinda do mapa compartilhado com o prepare_data
+        mudou = novo.astype(str) != antigo.astype(str)
+        difs = (pd.DataFrame({"pais": df["pais"], "antigo": antigo.astype(str), "novo": novo.astype(str)})[mudou]
+                .value_counts().rename("linhas").reset_index().sort_values("pais"))
+        print("[INFO] regiao_pais diferente do eda_quick antigo (mapa regioes.REGIOES_POR_PAIS):")
+        print(difs.to_string(index=False) if len(difs) else "  (nenhuma)")
+        chave = difs["pais"].str.strip().str.lower()
+        explicadas = (chave.isin(PAISES_BRASIL) | (difs["novo"] == chave.map(REGIOES_POR_PAIS))).all()
+        print(f"[CHECK] toda diferença vem do mapa compartilhado: {explicadas}")
+
+if __name__ == "__main__":
+    main()
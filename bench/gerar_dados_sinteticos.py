@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+gerar_dados_sinteticos.py
+
+Gera um CSV bruto de vendas sintético, no formato que src/prepare_data.py lê
+(separador ';', latin1, tudo como texto), em escala configurável:
+
+  python bench/gerar_dados_sinteticos.py --escala 1m      # 1 milhão de linhas
+  python bench/gerar_dados_sinteticos.py --escala 10m
+  python bench/gerar_dados_sinteticos.py --escala 50m
+  python bench/gerar_dados_sinteticos.py --linhas 250000 --out /tmp/vendas.csv
+
+As distribuições (produto/categoria/preço, UF, forma de pagamento, CD,
+responsável, quantidade) vêm da amostra sample/vendas_completo_enriquecido.parquet.
+A "sujeira" também é reproduzida:
+- valores monetários como texto: "21,28", "R$ 21,28", "R$<NBSP>21,28", "1.234,56", "21.28"
+- NBSP / espaços duplicados / espaços nas pontas em produto e responsável
+- estado por extenso (com e sem acento, caixa variada) + coluna uf (às vezes minúscula/vazia)
+- quantidade ausente ou zero (prepare_data recalcula por total / valor) e total ausente
+
+Determinístico para a mesma --semente e --lote.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from regioes import UF_POR_ESTADO  # noqa: E402
+
+AMOSTRA = BASE_DIR / "sample" / "vendas_completo_enriquecido.parquet"
+DADOS_DIR = BASE_DIR / "bench" / "dados"
+
+ESCALAS = {"1m": 1_000_000, "10m": 10_000_000, "50m": 50_000_000}
+LOTE_LINHAS = 1_000_000
+ENCODING = "latin1"      # igual ao prepare_data.py
+SEP = ";"
+
+COLUNAS = [
+    "cod_pedido", "produto", "categoriaprod", "valor", "quantidade", "valor_total_bruto",
+    "data", "estado", "uf", "pais", "formapagto", "centro_distribuicao", "responsavelpedido",
+    "valor_comissao", "lucro_liquido",
+]
+
+# proporções de sujeira
+P_QTD_AUSENTE = 0.04
+P_QTD_ZERO = 0.005
+P_TOTAL_AUSENTE = 0.02
+P_UF_AUSENTE = 0.03
+P_TEXTO_SUJO = 0.03
+ESTILOS_MOEDA = np.array([0.55, 0.25, 0.08, 0.07, 0.05])   # ver _formatar_moeda
+PAISES = np.array(["Brasil", "Brazil", "BRASIL", " brasil "], dtype=object)
+P_PAISES = np.array([0.7, 0.2, 0.05, 0.05])
+
+NOMES_ESTADO = {
+    "AC": "Acre", "AP": "Amapá", "AM": "Amazonas", "PA": "Pará", "RO": "Rondônia", "RR": "Roraima",
+    "TO": "Tocantins", "AL": "Alagoas", "BA": "Bahia", "CE": "Ceará", "MA": "Maranhão",
+    "PB": "Paraíba", "PE": "Pernambuco", "PI": "Piauí", "RN": "Rio Grande do Norte",
+    "SE": "Sergipe", "DF": "Distrito Federal", "GO": "Goiás", "MT": "Mato Grosso",
+    "MS": "Mato Grosso do Sul", "ES": "Espírito Santo", "MG": "Minas Gerais",
+    "RJ": "Rio de Janeiro", "SP": "São Paulo", "PR": "Paraná", "RS": "Rio Grande do Sul",
+    "SC": "Santa Catarina",
+}
+
+# =====================
+# Distribuições a partir da amostra
+# =====================
+
+def _numero(s: pd.Series) -> pd.Series:
+    """'R$ 1.234,56' / '21,28' -> float (mesma regra do prepare_data._to_number)."""
+    s = s.astype("string").str.replace("\u00A0", " ", regex=False).str.replace(r"[^\d,.\-]", "", regex=True)
+    both = s.str.contains(",", na=False) & s.str.contains(r"\.", na=False)
+    s = s.mask(both, s.str.replace(".", "", regex=False))
+    return pd.to_numeric(s.str.replace(",", ".", regex=False), errors="coerce")
+
+def _frequencias(s: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    vc = s.dropna().astype(str).str.strip().value_counts(normalize=True)
+    return vc.index.to_numpy(dtype=object), vc.to_numpy()
+
+def carregar_distribuicoes(amostra: Path = AMOSTRA) -> dict:
+    cols = ["produto", "categoriaprod", "valor", "quantidade", "valor_comissao", "lucro_liquido",
+            "formapagto", "centro_distribuicao", "responsavelpedido", "estado"]
+    df = pd.read_parquet(amostra, columns=cols)
+    df["produto"] = df["produto"].astype("string").str.replace(r"\s+", " ", regex=True).str.strip()
+    valor = _numero(df["valor"])
+    df["_preco"] = valor
+    df["_comissao"] = _numero(df["valor_comissao"]) / df["quantidade"].astype(float).replace(0, np.nan) / valor
+    df["_lucro"] = _numero(df["lucro_liquido"]) / df["quantidade"].astype(float).replace(0, np.nan) / valor
+
+    prod = (
+        df.groupby("produto")
+          .agg(n=("produto", "size"), categoria=("categoriaprod", "first"),
+               preco=("_preco", "median"), comissao=("_comissao", "median"), lucro=("_lucro", "median"))
+          .dropna(subset=["preco"])
+    )
+    qtd = pd.to_numeric(df["quantidade"], errors="coerce")
+    qtd_v, qtd_p = _frequencias(qtd[qtd > 0].astype(int))
+    ufs = [u for u in df["estado"].dropna().unique() if u in NOMES_ESTADO]
+    uf_v, uf_p = _frequencias(df.loc[df["estado"].isin(ufs), "estado"])
+
+    return {
+        "produtos": prod.index.to_numpy(dtype=object),
+        "p_produtos": (prod["n"] / prod["n"].sum()).to_numpy(),
+        "categorias": prod["categoria"].to_numpy(dtype=object),
+        "precos": prod["preco"].to_numpy(float),
+        "comissao": prod["comissao"].fillna(0.07).to_numpy(float),
+        "lucro": prod["lucro"].fillna(1.0).to_numpy(float),
+        "quantidades": qtd_v.astype(int),
+        "p_quantidades": qtd_p,
+        "ufs": uf_v,
+        "p_ufs": uf_p,
+        "formapagto": _frequencias(df["formapagto"]),
+        "centro_distribuicao": _frequencias(df["centro_distribuicao"]),
+        "responsavelpedido": _frequencias(df["responsavelpedido"]),
+    }
+
+# =====================
+# Formatação (só nos valores distintos)
+# =====================
+
+def _moeda(v: float, estilo: int) -> str:
+    br = f"{v:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    if estilo == 0:                       # 21,28 | 1234,56 (sem milhar; decimais "curtos" como na amostra)
+        return br.replace(".", "").rstrip("0").rstrip(",")
+    if estilo == 1:                       # R$ 21,28
+        return f"R$ {br}"
+    if estilo == 2:                       # R$<NBSP>21,28
+        return f"R$\u00A0{br}"
+    if estilo == 3:                       # 1.234,56 (sempre com 2 casas)
+        return br
+    return f"{v:.2f}"                     # 21.28 (ponto decimal)
+
+def _formatar_moeda(centavos: np.ndarray, estilos: np.ndarray, ausente: np.ndarray | None = None) -> np.ndarray:
+    chave = centavos.astype(np.int64) * len(ESTILOS_MOEDA) + estilos
+    codes, uniques = pd.factorize(chave)
+    textos = np.array([_moeda((u // len(ESTILOS_MOEDA)) / 100, int(u % len(ESTILOS_MOEDA))) for u in uniques],
+                      dtype=object)
+    out = textos[codes]
+    if ausente is not None:
+        out[ausente] = ""
+    return out
+
+def _variantes(texto: str) -> list[str]:
+    """0 = limpo; 1..4 = sujo (NBSP, espaço duplo, espaços nas pontas)."""
+    partes = texto.split(" ")
+    meio = len(partes) // 2 or 1
+    return [
+        texto,
+        texto + "\u00A0",
+        " ".join(partes[:meio]) + "  " + " ".join(partes[meio:]) if len(partes) > 1 else texto + " ",
+        " " + texto + " ",
+        "\u00A0" + texto,
+    ]
+
+def _texto_sujo(rng, valores: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    tabela = np.array([_variantes(str(v)) for v in valores], dtype=object)
+    variante = np.where(rng.random(len(idx)) < P_TEXTO_SUJO, rng.integers(1, 5, len(idx)), 0)
+    return tabela[idx, variante]
+
+def _estados_por_extenso() -> dict[str, np.ndarray]:
+    """UF -> variantes do nome: 'São Paulo', 'SAO PAULO', 'sao  paulo', 'São Paulo<NBSP>'."""
+    nomes = {}
+    for uf, nome in NOMES_ESTADO.items():
+        sem_acento = next(k for k, v in UF_POR_ESTADO.items() if v == uf)
+        nomes[uf] = np.array([nome, sem_acento.upper(), sem_acento.replace(" ", "  "), nome + "\u00A0"],
+                             dtype=object)
+    return nomes
+
+# =====================
+# Geração em lotes
+# =====================
+
+def gerar_lote(rng, dist: dict, n: int, primeiro_pedido: int, datas: np.ndarray,
+               estados: dict[str, np.ndarray]) -> tuple[pd.DataFrame, int]:
+    # pedidos com 1..N itens: o código avança em ~75% das linhas
+    novo = rng.random(n) < 0.75
+    novo[0] = True
+    cod = primeiro_pedido + np.cumsum(novo) - 1
+
+    prod = rng.choice(len(dist["produtos"]), size=n, p=dist["p_produtos"])
+    preco = dist["precos"][prod] * rng.uniform(0.8, 1.2, n)          # variação de preço no tempo
+    preco_c = np.maximum(np.round(preco * 100), 1).astype(np.int64)
+
+    qtd = rng.choice(dist["quantidades"], size=n, p=dist["p_quantidades"])
+    total_c = preco_c * qtd
+    comissao_c = np.round(total_c * dist["comissao"][prod]).astype(np.int64)
+    lucro_c = np.round(total_c * dist["lucro"][prod]).astype(np.int64)
+
+    qtd_txt = qtd.astype(str).astype(object)
+    sorteio = rng.random(n)
+    qtd_txt[sorteio < P_QTD_AUSENTE] = ""
+    qtd_txt[(sorteio >= P_QTD_AUSENTE) & (sorteio < P_QTD_AUSENTE + P_QTD_ZERO)] = "0"
+    total_ausente = (rng.random(n) < P_TOTAL_AUSENTE) & (qtd_txt != "")   # nunca os dois ausentes
+
+    estilos = lambda: rng.choice(len(ESTILOS_MOEDA), size=n, p=ESTILOS_MOEDA)  # noqa: E731
+
+    ufs = rng.choice(dist["ufs"], size=n, p=dist["p_ufs"])
+    codes_uf, ufs_u = pd.factorize(ufs)
+    var_estado = rng.integers(0, 4, n)
+    estado = np.empty(n, dtype=object)
+    for i, uf in enumerate(ufs_u):
+        sel = codes_uf == i
+        estado[sel] = estados[uf][var_estado[sel]]
+    uf_txt = ufs.astype(object)
+    minusc = rng.random(n) < 0.05
+    uf_txt[minusc] = np.char.lower(ufs[minusc].astype(str)).astype(object)
+    uf_txt[rng.random(n) < P_UF_AUSENTE] = ""
+
+    def _cat(chave):
+        valores, p = dist[chave]
+        return _texto_sujo(rng, valores, rng.choice(len(valores), size=n, p=p))
+
+    df = pd.DataFrame({
+        "cod_pedido": cod.astype(str),
+        "produto": _texto_sujo(rng, dist["produtos"], prod),
+        "categoriaprod": dist["categorias"][prod],
+        "valor": _formatar_moeda(preco_c, estilos()),
+        "quantidade": qtd_txt,
+        "valor_total_bruto": _formatar_moeda(total_c, estilos(), total_ausente),
+        "data": datas[rng.integers(0, len(datas), n)],
+        "estado": estado,
+        "uf": uf_txt,
+        "pais": rng.choice(PAISES, size=n, p=P_PAISES),
+        "formapagto": _cat("formapagto"),
+        "centro_distribuicao": _cat("centro_distribuicao"),
+        "responsavelpedido": _cat("responsavelpedido"),
+        "valor_comissao": _formatar_moeda(comissao_c, np.zeros(n, np.int64)),
+        "lucro_liquido": _formatar_moeda(lucro_c, np.zeros(n, np.int64)),
+    }, columns=COLUNAS)
+    return df, int(cod[-1]) + 1
+
+def gerar(linhas: int, destino: Path, semente: int = 42, lote: int = LOTE_LINHAS,
+          inicio: str = "2020-01-01", fim: str = "2024-12-31") -> Path:
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semente)
+    dist = carregar_distribuicoes()
+    datas = pd.date_range(inicio, fim, freq="D").strftime("%d/%m/%Y").to_numpy(dtype=object)
+    estados = _estados_por_extenso()
+
+    t0 = time.perf_counter()
+    proximo = 50_000
+    feitas = 0
+    with open(destino, "w", encoding=ENCODING, newline="") as f:
+        while feitas < linhas:
+            n = min(lote, linhas - feitas)
+            df, proximo = gerar_lote(rng, dist, n, proximo, datas, estados)
+            df.to_csv(f, sep=SEP, index=False, header=(feitas == 0))
+            feitas += n
+            print(f"[INFO] {feitas:,}/{linhas:,} linhas ({time.perf_counter() - t0:.1f}s)")
+    return destino
+
+def caminho_padrao(escala: str) -> Path:
+    return DADOS_DIR / escala / "vendas.csv"
+
+def _linhas(valor: str) -> int:
+    v = valor.strip().lower()
+    if v in ESCALAS:
+        return ESCALAS[v]
+    mult = {"k": 1_000, "m": 1_000_000}.get(v[-1:], 1)
+    return int(float(v[:-1] if mult > 1 else v) * mult)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera CSV bruto de vendas sintético (escala configurável).")
+    ap.add_argument("--escala", choices=list(ESCALAS), default="1m",
+                    help="Tamanho pré-definido (grava em bench/dados/<escala>/vendas.csv).")
+    ap.add_argument("--linhas", default=None, help="Número de linhas (ex.: 250000, 500k, 2m); ignora --escala.")
+    ap.add_argument("--out", default=None, help="CSV de saída.")
+    ap.add_argument("--semente", type=int, default=42)
+    ap.add_argument("--lote", type=int, default=LOTE_LINHAS, help="Linhas geradas/gravadas por vez.")
+    args = ap.parse_args(argv)
+
+    linhas = _linhas(args.linhas) if args.linhas else ESCALAS[args.escala]
+    destino = Path(args.out) if args.out else caminho_padrao(args.escala if not args.linhas else args.linhas.lower())
+    t0 = time.perf_counter()
+    gerar(linhas, destino, semente=args.semente, lote=args.lote)
+    mb = destino.stat().st_size / 2**20
+    print(f"[OK] {linhas:,} linhas em {destino} ({mb:,.1f} MB, {time.perf_counter() - t0:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# src/1_detectar_out_rec_mensal.py
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from numpy.lib.stride_tricks import sliding_window_view
+
+from conversao_numerica import numero
+from datas_rapidas import converter_datas_arrow
+from instrumentacao import etapa, iniciar, lotes
+
+# ==============================================
+# Outliers de receita mensal por série UF x categoria x centro x forma de pagamento
+# - 1 passada no fato (só as colunas usadas): soma de receita por série e mês com
+#   group_by do Arrow lote a lote, depois combinação dos parciais
+# - matriz séries x meses (eixo contínuo); mês sem venda = 0 entre a 1ª e a última
+#   venda da série, NaN fora desse intervalo (série ainda não existia / encerrada)
+# - estatísticas robustas em janela móvel (meses ANTERIORES ao avaliado), para todas
+#   as séries de uma vez com sliding_window_view (blocos de séries limitam a memória):
+#     * mediana e MAD  -> z robusto = (y - mediana) / (1.4826 * MAD)
+#     * Q1/Q3          -> fora do intervalo [Q1 - k*IQR, Q3 + k*IQR]
+#     * base sazonal   -> mediana do mesmo mês nos anos anteriores (t-12, t-24, t-36)
+# - outlier = |z| >= limiar E fora das cercas do IQR E (sem base sazonal OU também
+#   destoa do mesmo mês dos anos anteriores): pico sazonal recorrente não é alerta e
+#   outlier do ano passado não contamina o mês atual
+# - relatório ordenado por score (menor |z| entre móvel e sazonal) e impacto em R$
+#
+# Uso:
+#   python src/1_detectar_out_rec_mensal.py --input data/enriquecido/vendas_completo_enriquecido.parquet
+# ==============================================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INPUT_PATH = BASE_DIR / "data" / "enriquecido" / "vendas_completo_enriquecido.parquet"
+OUT_PATH = BASE_DIR / "data" / "audit" / "outliers_receita_series.csv"
+
+DIMENSOES = {   # nome no relatório -> colunas candidatas no fato
+    "uf": ["uf", "estado"],
+    "categoria": ["categoria", "categoriaprod", "category"],
+    "centro": ["centro_distribuicao_normalizado", "centro_distribuicao", "centro_id"],
+    "forma_pagamento": ["forma_pagamento", "formapagto", "channel"],
+}
+COLS_DATA = ["data_pedido", "data", "date", "dt_pedido"]
+COLS_RECEITA = ["valor_total_bruto", "valor_total", "revenue"]
+
+JANELA = 12              # meses anteriores usados na mediana/MAD/IQR
+MIN_HISTORICO = 6        # mínimo de meses COM receita na janela para avaliar
+LIMIAR_Z = 3.5           # |z robusto| (Iglewicz & Hoaglin)
+FATOR_IQR = 3.0          # cercas "extremas" de Tukey
+ANOS_SAZONAIS = 3
+BLOCO_SERIES = 20_000    # séries por bloco: BLOCO x meses x JANELA floats em memória
+LOTE_LINHAS = 256_000
+
+def _primeira(cols, opcoes):
+    return next((c for c in opcoes if c in cols), None)
+
+# =====================
+# 1) fato -> receita por série e mês
+# =====================
+
+def _texto(arr) -> pa.Array:
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    if not (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+        arr = pc.cast(arr, pa.string())
+    return pc.fill_null(pc.utf8_trim_whitespace(arr), "N/D")
+
+def agregar_series(path, lote: int = LOTE_LINHAS) -> tuple[pd.DataFrame, list[str]]:
+    dataset = ds.dataset(str(path), format="parquet")
+    nomes = dataset.schema.names
+    cols_dim = {d: _primeira(nomes, c) for d, c in DIMENSOES.items()}
+    dims = [d for d, c in cols_dim.items() if c]
+    col_data, col_rec = _primeira(nomes, COLS_DATA), _primeira(nomes, COLS_RECEITA)
+    if not col_data or not col_rec:
+        raise RuntimeError("colunas de data/receita não encontradas no fato.")
+    print("[INFO] Séries por:", ", ".join(f"{d}={cols_dim[d]}" for d in dims), f"| data={col_data} | receita={col_rec}")
+
+    parciais = []
+    colunas = [cols_dim[d] for d in dims] + [col_data, col_rec]
+    for batch in lotes(dataset.to_batches(columns=colunas, batch_size=lote), "ler_agregar"):
+        datas = converter_datas_arrow(batch.column(col_data))
+        mes = pc.add(pc.multiply(pc.cast(pc.year(datas), pa.int32()), 12), pc.subtract(pc.cast(pc.month(datas), pa.int32()), 1))
+        t = pa.table([_texto(batch.column(cols_dim[d])) for d in dims] + [mes, numero(batch.column(col_rec))],
+                     names=dims + ["mes", "receita"])
+        t = t.filter(pc.is_valid(t["mes"]))
+        parciais.append(t.group_by(dims + ["mes"]).aggregate([("receita", "sum")]))
+    if not parciais:
+        return pd.DataFrame(columns=dims + ["mes", "receita"]), dims
+    total = pa.concat_tables(parciais).group_by(dims + ["mes"]).aggregate([("receita_sum", "sum")])
+    return total.rename_columns(dims + ["mes", "receita"]).to_pandas(), dims
+
+def matriz_series(agg: pd.DataFrame, dims: list[str]) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """-> (séries: uma linha por série), Y (séries x meses), índice dos meses (ano*12 + mês-1)."""
+    codigos, series = pd.factorize(pd.MultiIndex.from_frame(agg[dims]))
+    series = pd.DataFrame(list(series), columns=dims)
+    k0 = int(agg["mes"].min())
+    meses = np.arange(k0, int(agg["mes"].max()) + 1)
+    Y = np.zeros((len(series), len(meses)))
+    np.add.at(Y, (codigos, agg["mes"].to_numpy() - k0), np.nan_to_num(agg["receita"].to_numpy(dtype=float)))
+
+    ativo = np.zeros_like(Y, dtype=bool)
+    ativo[codigos, agg["mes"].to_numpy() - k0] = True
+    t = np.arange(len(meses))
+    primeiro = np.where(ativo.any(1), ativo.argmax(1), len(meses))
+    ultimo = len(meses) - 1 - ativo[:, ::-1].argmax(1)
+    Y[(t[None, :] < primeiro[:, None]) | (t[None, :] > ultimo[:, None])] = np.nan
+    return series, Y, meses
+
+# =====================
+# 2) estatísticas robustas em todas as séries
+# =====================
+
+def _anterior(Y: np.ndarray, k: int) -> np.ndarray:
+    out = np.full_like(Y, np.nan)
+    if k < Y.shape[1]:
+        out[:, k:] = Y[:, :-k]
+    return out
+
+def _janelas(Y: np.ndarray, w: int) -> np.ndarray:
+    """(séries, meses) -> (séries, meses, w): janela do mês t = Y[:, t-w:t] (sem o próprio t)."""
+    Z = np.concatenate([np.full((Y.shape[0], w), np.nan), Y], axis=1)
+    return sliding_window_view(Z, w, axis=1)[:, : Y.shape[1], :]
+
+def _quantis(X: np.ndarray, qs) -> list[np.ndarray]:
+    """Quantis (interpolação linear, como np.nanpercentile) no último eixo ignorando NaN:
+    1 sort (NaN vão para o fim) + leitura por posição; nanmedian/nanpercentile em
+    3D com NaN caem num caminho lento."""
+    S = np.sort(X, axis=-1)
+    n = np.sum(~np.isnan(X), axis=-1)
+    saida = []
+    for q in qs:
+        pos = q * np.maximum(n - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        v_lo = np.take_along_axis(S, lo[..., None], axis=-1)[..., 0]
+        v_hi = np.take_along_axis(S, hi[..., None], axis=-1)[..., 0]
+        saida.append(np.where(n > 0, v_lo + (pos - lo) * (v_hi - v_lo), np.nan))
+    return saida
+
+def estatisticas(Y: np.ndarray, janela: int = JANELA, min_hist: int = MIN_HISTORICO,
+                 limiar: float = LIMIAR_Z, fator_iqr: float = FATOR_IQR) -> dict[str, np.ndarray]:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        J = _janelas(Y, janela)
+        n = np.sum(J > 0, axis=2)     # série intermitente (quase tudo 0) não tem "normal" para comparar
+        q1, mediana, q3 = _quantis(J, [0.25, 0.5, 0.75])
+        mad = _quantis(np.abs(J - mediana[..., None]), [0.5])[0] * 1.4826
+        base_saz = _quantis(np.stack([_anterior(Y, 12 * a) for a in range(1, ANOS_SAZONAIS + 1)], axis=2), [0.5])[0]
+
+        # escala mínima: séries quase constantes não geram z infinito
+        escala = np.maximum(mad, np.maximum(0.05 * np.abs(mediana), 1.0))
+        z = (Y - mediana) / escala
+        z_saz = (Y - base_saz) / escala
+        iqr = q3 - q1
+        fora_iqr = (Y > q3 + fator_iqr * iqr) | (Y < q1 - fator_iqr * iqr)
+
+    avaliado = (n >= min_hist) & ~np.isnan(Y)
+    z, z_saz = np.where(avaliado, z, np.nan), np.where(avaliado, z_saz, np.nan)
+    score = np.fmin(np.abs(z), np.abs(z_saz))     # sem base sazonal -> só o |z| móvel
+    outlier = avaliado & (score >= limiar) & fora_iqr
+    return {"receita": Y, "n_hist": n, "mediana_movel": mediana, "mad": mad, "q1": q1, "q3": q3,
+            "base_sazonal": base_saz, "z_robusto": z, "z_sazonal": z_saz, "score": score, "outlier": outlier}
+
+def detectar(series: pd.DataFrame, Y: np.ndarray, meses: np.ndarray, bloco: int = BLOCO_SERIES, **kw) -> pd.DataFrame:
+    """Relatório (só os outliers), ordenado por score e impacto."""
+    partes = []
+    for ini in range(0, len(Y), bloco):
+        est = estatisticas(Y[ini: ini + bloco], **kw)
+        s_idx, t_idx = np.nonzero(est["outlier"])
+        if not len(s_idx):
+            continue
+        linha = series.iloc[ini + s_idx].reset_index(drop=True)
+        linha.insert(len(series.columns), "mes", [f"{k // 12:04d}-{k % 12 + 1:02d}" for k in meses[t_idx]])
+        for nome, arr in est.items():
+            if nome != "outlier":
+                linha[nome] = arr[s_idx, t_idx]
+        partes.append(linha)
+    colunas = list(series.columns) + ["mes", "receita", "n_hist", "mediana_movel", "mad", "q1", "q3",
+                                      "base_sazonal", "z_robusto", "z_sazonal", "score"]
+    if not partes:
+        return pd.DataFrame(columns=colunas + ["impacto", "direcao", "rank"])
+    rel = pd.concat(partes, ignore_index=True)
+    rel["impacto"] = rel["receita"] - rel["mediana_movel"]
+    rel["direcao"] = np.where(rel["impacto"] >= 0, "alta", "queda")
+    rel = rel.assign(_abs=rel["impacto"].abs()).sort_values(["score", "_abs"], ascending=False, ignore_index=True)
+    rel["rank"] = np.arange(1, len(rel) + 1)
+    return rel.drop(columns="_abs")
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Outliers de receita mensal por série (UF x categoria x centro x forma de pagamento).")
+    ap.add_argument("--input", default=str(INPUT_PATH), help="Parquet (arquivo ou diretório) do fato enriquecido.")
+    ap.add_argument("--out", default=str(OUT_PATH), help="CSV do relatório de anomalias.")
+    ap.add_argument("--janela", type=int, default=JANELA, help="Meses anteriores na janela móvel.")
+    ap.add_argument("--min-historico", type=int, default=MIN_HISTORICO, help="Meses com receita mínimos na janela.")
+    ap.add_argument("--limiar", type=float, default=LIMIAR_Z, help="|z robusto| mínimo.")
+    ap.add_argument("--top", type=int, default=15, help="Linhas do relatório mostradas no terminal.")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    iniciar("detectar_out_rec_mensal")
+    args = parse_args()
+    agg, dims = agregar_series(args.input)
+    with etapa("matriz", entrada=len(agg)) as m:
+        series, Y, meses = matriz_series(agg, dims)
+        m.saida(len(series))
+    print(f"[INFO] {len(series):,} séries x {len(meses)} meses")
+    with etapa("detectar", entrada=Y.size) as m:
+        rel = detectar(series, Y, meses, janela=args.janela, min_hist=args.min_historico, limiar=args.limiar)
+        m.saida(len(rel))
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    rel.to_csv(out, index=False, encoding="utf-8-sig")
+    print(f"[OK] {len(rel):,} anomalias em {rel[dims].drop_duplicates().shape[0] if len(rel) else 0:,} séries -> {out}")
+    if len(rel):
+        print(rel.head(args.top)[dims + ["mes", "receita", "mediana_movel", "base_sazonal", "score", "direcao"]].to_string(index=False))
@@ -0,0 +1,57 @@
+# src/assinatura_parquet.py
+import hashlib
+from pathlib import Path
+
+# ==============================================
+# Assinatura de um arquivo parquet = sha256 do footer (schema, row groups com
+# offsets e estatísticas, nº de linhas, created_by)
+# - muda quando o arquivo é regravado, mesmo que o tamanho seja o mesmo
+# - barata: lê só a cauda do arquivo (local: seek; URL: HTTP Range), nunca os dados
+# - gravada pelo catalogo_dados.py no catálogo e conferida pelo dashboard
+#   (streamlit_app/dados_compartilhados.py) antes de confiar nele
+#
+# Uso:
+#   assinatura("data/enriquecido/vendas_completo_enriquecido.parquet")
+#   assinatura("https://.../vendas_completo_enriquecido.parquet")
+# ==============================================
+
+MAGIC = b"PAR1"
+CAUDA = 64 * 1024        # 1ª leitura; footer maior que isso custa uma 2ª
+
+def _cauda_local(path):
+    def ler(n: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            f.seek(max(f.tell() - n, 0))
+            return f.read()
+    return ler
+
+def _cauda_url(url: str, timeout: int = 10):
+    import requests
+
+    def ler(n: int) -> bytes:
+        with requests.get(url, headers={"Range": f"bytes=-{n}"}, timeout=timeout, stream=True) as r:
+            if r.status_code != 206:
+                raise OSError(f"sem suporte a Range (HTTP {r.status_code})")   # não baixa o arquivo todo
+            return r.content
+    return ler
+
+def assinatura_footer(ler_cauda) -> str | None:
+    """`ler_cauda(n)` -> últimos n bytes. None se não termina como parquet."""
+    cauda = ler_cauda(CAUDA)
+    if len(cauda) < 8 or cauda[-4:] != MAGIC:
+        return None
+    n = int.from_bytes(cauda[-8:-4], "little")
+    if n + 8 > len(cauda):
+        cauda = ler_cauda(n + 8)
+        if len(cauda) < n + 8:
+            return None
+    return hashlib.sha256(cauda[-(n + 8):-8]).hexdigest()[:32]
+
+def assinatura(fonte) -> str | None:
+    """Arquivo local ou URL; None se não der para ler a cauda."""
+    try:
+        ler = _cauda_local(fonte) if Path(fonte).exists() else _cauda_url(str(fonte))
+        return assinatura_footer(ler)
+    except Exception:
+        return None
@@ -6,10 +6,12 @@ build_dim_produto.py
 
 Gera a dimensão Produto a partir de uma base tratada.
 - Cria produto_id (sequencial OU hash).
-- Classifica categoria por regras quando a coluna não existir.
+- Classifica categoria por regras quando a coluna não existir
+  (regex única compilada, com prioridade das categorias e cache por nome normalizado).
 - Preserva IDs de dimensão anterior (se informada).
-- Exporta dim_produto.parquet e dim_produto.csv.
+- Exporta dim_produto.parquet e dim_produto.csv (+ índice dim_produto.idx.arrow).
 - Exporta relatório dim_produto_sem_categoria.csv para revisão.
+- Exporta dim_produto_classificacao.csv (categoria pela regra + palavra-chave que casou).
 
 MODO 1 — Terminal (recomendado):
   python build_dim_produto.py ^
@@ -26,9 +28,16 @@ MODO 2 — Spyder/IPython (sem argumentos):
 
 import argparse
 import os
+import re
 import sys
 from hashlib import md5
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from indice_dimensoes import norm, salvar_indice
 
 # -----------------------
 # Defaults para rodar no Spyder (sem argumentos)
@@ -86,17 +95,54 @@ REGRAS = {
 # -----------------------
 # Funções utilitárias
 # -----------------------
-def norm(s: str) -> str:
-    s = unidecode(str(s or "")).lower().strip()
-    return " ".join(s.split())
+def gerar_normalizados(nomes: pd.Series) -> pd.Series:
+    """norm() uma vez por valor distinto."""
+    codes, uniques = pd.factorize(nomes)
+    normalizados = np.array([norm(u) for u in uniques] + [norm(None)], dtype=object)
+    return pd.Series(normalizados[codes], index=nomes.index)
+
+def _norm_palavra(p: str) -> str:
+    # como norm(), mas preserva espaços nas pontas ("cama " não casa com "camada")
+    return unidecode(p).lower()
+
+def compilar_regras(regras: dict) -> re.Pattern:
+    """Uma única regex para todas as palavras-chave.
+    Cada categoria vira um lookahead ancorado no início, na ordem de REGRAS:
+    a primeira categoria com alguma palavra presente vence (mesma prioridade do loop),
+    e o grupo nomeado devolve a palavra que casou."""
+    ramos = []
+    for i, palavras in enumerate(regras.values()):
+        alts = list(dict.fromkeys(_norm_palavra(p) for p in palavras))   # ex.: "ômega" == "omega"
+        alts.sort(key=len, reverse=True)
+        ramos.append(f"(?=.*?(?P<c{i}>{'|'.join(re.escape(a) for a in alts)}))")
+    return re.compile("^(?:" + "|".join(ramos) + ")", re.DOTALL)
+
+_REGEX_REGRAS = compilar_regras(REGRAS)
+_CAT_KEYS = list(REGRAS)
+_CACHE_CLASSIFICACAO: dict[str, tuple[str, str]] = {}   # nome normalizado -> (categoria, palavra)
+
+def classificar_categorias(nomes_norm: pd.Series) -> pd.DataFrame:
+    """Classifica nomes JÁ normalizados (norm) de forma vetorizada.
+    Só os distintos ainda fora do cache passam pela regex.
+    Retorna DataFrame (mesmo índice) com 'categoria' ('#' = sem regra) e 'palavra_chave'."""
+    distintos = pd.Series(pd.unique(nomes_norm.astype(str)))
+    novos = distintos[~distintos.isin(_CACHE_CLASSIFICACAO.keys())]
+    if len(novos):
+        grupos = novos.str.extract(_REGEX_REGRAS)   # colunas c0..cN, NaN onde não casou
+        primeira = grupos.notna().to_numpy().argmax(axis=1)
+        casou = grupos.notna().any(axis=1).to_numpy()
+        for nome, i, ok, linha in zip(novos, primeira, casou, grupos.itertuples(index=False)):
+            _CACHE_CLASSIFICACAO[nome] = (CATEGORIAS_VALIDAS[_CAT_KEYS[i]], linha[i]) if ok else ("#", "")
+    res = nomes_norm.astype(str).map(_CACHE_CLASSIFICACAO)
+    return pd.DataFrame({
+        "categoria": res.map(lambda t: t[0]),
+        "palavra_chave": res.map(lambda t: t[1]),
+    }, index=nomes_norm.index)
 
 def classificar_categoria(nome_produto: str) -> str:
-    n = norm(nome_produto)
-    for cat_key, palavras in REGRAS.items():
-        for p in palavras:
-            if p in n:
-                return CATEGORIAS_VALIDAS[cat_key]
-    return "#"  # pendente de revisão
+    return classificar_categorias(pd.Series([norm(nome_produto)]))["categoria"].iat[0]
+
+LOTE_LINHAS = 500_000
 
 def carregar_df_caminho(path: str, usecols=None) -> pd.DataFrame:
     ext = os.path.splitext(path.lower())[1]
@@ -106,11 +152,53 @@ def carregar_df_caminho(path: str, usecols=None) -> pd.DataFrame:
         return pd.read_csv(path, usecols=usecols, encoding="utf-8-sig")
     raise ValueError(f"Formato não suportado: {path}")
 
+def distintos_primeira_ordem(df: pd.DataFrame, col_nome: str, col_categoria: str | None = None) -> pd.DataFrame:
+    """Nomes distintos na ordem da 1ª ocorrência (define os IDs sequenciais);
+    a categoria de cada nome é a da ÚLTIMA ocorrência."""
+    df = df.dropna(subset=[col_nome])
+    base = df[[col_nome]].drop_duplicates()
+    if col_categoria:
+        ultima = df.drop_duplicates(subset=[col_nome], keep="last").set_index(col_nome)[col_categoria]
+        base[col_categoria] = base[col_nome].map(ultima)
+    return base
+
+def carregar_base_distinta(path: str, col_nome: str, col_categoria: str | None = None) -> pd.DataFrame:
+    """Produtos distintos (na ordem da 1ª ocorrência, com a ÚLTIMA categoria de cada um)
+    direto do Parquet: lê só as colunas projetadas, lote a lote, e deduplica em Arrow
+    (group_by) antes de qualquer coisa virar pandas. Memória ~ nº de produtos, não nº de linhas."""
+    ext = os.path.splitext(path.lower())[1]
+    if ext != ".parquet":
+        usecols = [col_nome] + ([col_categoria] if col_categoria else [])
+        df = carregar_df_caminho(path, usecols=usecols)
+        return distintos_primeira_ordem(df, col_nome, col_categoria if col_categoria in df.columns else None)
+
+    pf = pq.ParquetFile(path)
+    tem_cat = bool(col_categoria) and col_categoria in pf.schema_arrow.names
+    cols = [col_nome] + ([col_categoria] if tem_cat else [])
+    ultima: dict = {}     # dict mantém a posição da 1ª inserção; group_by sai na ordem de aparição
+    for batch in pf.iter_batches(batch_size=LOTE_LINHAS, columns=cols):
+        t = pa.Table.from_batches([batch]).filter(pc.is_valid(batch.column(0)))
+        if tem_cat:
+            g = t.group_by(col_nome, use_threads=False).aggregate(
+                [(col_categoria, "last", pc.ScalarAggregateOptions(skip_nulls=False))])   # nulo conta, como no pandas
+            ultima.update(zip(g[col_nome].to_pylist(), g[f"{col_categoria}_last"].to_pylist()))
+        else:
+            for nome in pc.unique(t[col_nome]).to_pylist():
+                ultima.setdefault(nome, None)
+    dados = {col_nome: list(ultima)}
+    if tem_cat:
+        dados[col_categoria] = list(ultima.values())
+    return pd.DataFrame(dados)
+
 def gerar_ids_hash(nomes_norm: pd.Series) -> pd.Series:
-    return nomes_norm.map(lambda s: "PROD" + md5(s.encode()).hexdigest()[:8].upper())
+    """md5 (mesmo ID de sempre) calculado uma vez por nome distinto e espalhado por índice."""
+    codes, uniques = pd.factorize(nomes_norm)
+    ids = np.array(["PROD" + md5(s.encode()).hexdigest()[:8].upper() for s in uniques], dtype=object)
+    return pd.Series(ids[codes], index=nomes_norm.index)
 
 def gerar_ids_sequenciais(qtd: int, start_from: int = 1) -> list:
-    return ["PROD" + f"{i:03d}" for i in range(start_from, start_from + qtd)]
+    nums = pd.Series(np.arange(start_from, start_from + qtd)).astype(str).str.zfill(3)
+    return ("PROD" + nums).tolist()
 
 def construir_dim(
     df_base: pd.DataFrame,
@@ -119,40 +207,26 @@ def construir_dim(
     metodo: str,
     df_dim_existente: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
-    # Base única e normalizada
-    cols = [col_nome]
-    if col_categoria and col_categoria in df_base.columns:
-        cols.append(col_categoria)
-
+    # Base única: nomes na ordem da 1ª ocorrência + última categoria de cada produto
+    tem_cat = bool(col_categoria) and col_categoria in df_base.columns
     base = (
-        df_base[cols]
-        .dropna(subset=[col_nome])
-        .drop_duplicates(subset=[col_nome])
-        .rename(columns={col_nome: "produto_nome"})
-        .copy()
+        distintos_primeira_ordem(df_base, col_nome, col_categoria if tem_cat else None)
+        .rename(columns={col_nome: "produto_nome", col_categoria: "categoria"} if tem_cat
+                else {col_nome: "produto_nome"})
+        .reset_index(drop=True)
     )
-    base["produto_nome_normalizado"] = base["produto_nome"].map(norm)
+    base["produto_nome_normalizado"] = gerar_normalizados(base["produto_nome"])
 
     # Categoria: usa a coluna original se existir, senão aplica regras
-    if col_categoria and col_categoria in df_base.columns:
-        cat = (
-            df_base[[col_nome, col_categoria]]
-            .dropna(subset=[col_nome])
-            .drop_duplicates(subset=[col_nome], keep="last")
-            .rename(columns={col_nome: "produto_nome", col_categoria: "categoria"})
-        )
-        base = base.merge(cat, on="produto_nome", how="left")
-    else:
-        base["categoria"] = base["produto_nome"].map(classificar_categoria)
+    if not tem_cat:
+        base["categoria"] = classificar_categorias(base["produto_nome_normalizado"])["categoria"]
 
-    # Preservar IDs já existentes, se fornecidos
+    # Preservar IDs já existentes: lookup por produto_nome
+    # (o normalizado é derivado do nome, então a chave (nome, normalizado) equivale ao nome)
+    base["produto_id"] = pd.NA
     if df_dim_existente is not None and "produto_id" in df_dim_existente.columns:
-        dim_old = df_dim_existente[["produto_id", "produto_nome", "produto_nome_normalizado"]].copy()
-        base = base.merge(dim_old, on=["produto_nome", "produto_nome_normalizado"], how="left")
-
-    # Garante que a coluna produto_id exista
-    if "produto_id" not in base.columns:
-        base["produto_id"] = pd.NA
+        ids_old = df_dim_existente.drop_duplicates(subset=["produto_nome"]).set_index("produto_nome")["produto_id"]
+        base["produto_id"] = base["produto_nome"].map(ids_old)
 
     # Atribuir IDs faltantes
     faltantes = base["produto_id"].isna()
@@ -179,8 +253,8 @@ def construir_dim(
 def executar(input_path, out_dir, col_nome, col_categoria, existing_dim_path, method):
     os.makedirs(out_dir, exist_ok=True)
 
-    usecols = [col_nome] + ([col_categoria] if col_categoria else [])
-    df_base = carregar_df_caminho(input_path, usecols=usecols)
+    # já chega deduplicado (projeção + group_by em Arrow)
+    df_base = carregar_base_distinta(input_path, col_nome, col_categoria)
 
     df_dim_exist = None
     if existing_dim_path:
@@ -198,12 +272,23 @@ def executar(input_path, out_dir, col_nome, col_categoria, existing_dim_path, me
     out_csv = os.path.join(out_dir, "dim_produto.csv")
     dim.to_parquet(out_parquet, index=False)
     dim.to_csv(out_csv, index=False, encoding="utf-8-sig")
+    out_idx = salvar_indice(dim, out_dir, "dim_produto", "produto_nome_normalizado", "produto_id",
+                            ["produto_nome", "categoria"], "norm")
 
     pend = dim[dim["categoria"].fillna("#") == "#"].copy()
     pend_path = os.path.join(out_dir, "dim_produto_sem_categoria.csv")
     pend.to_csv(pend_path, index=False, encoding="utf-8-sig")
 
-    print(f"[OK] Dimensão salva:\n - {out_parquet}\n - {out_csv}")
+    # Qual regra/palavra-chave classificaria cada produto (apoio à revisão)
+    regra = classificar_categorias(dim["produto_nome_normalizado"])
+    rel = dim[["produto_id", "produto_nome", "produto_nome_normalizado", "categoria"]].assign(
+        categoria_regra=regra["categoria"], palavra_chave=regra["palavra_chave"]
+    )
+    rel_path = os.path.join(out_dir, "dim_produto_classificacao.csv")
+    rel.to_csv(rel_path, index=False, encoding="utf-8-sig")
+
+    print(f"[OK] Dimensão salva:\n - {out_parquet}\n - {out_csv}\n - {out_idx}")
+    print(f"[OK] Classificação por regra (palavra-chave): {rel_path}")
     if len(pend) > 0:
         print(f"[ATENÇÃO] {len(pend)} item(ns) sem categoria. Revise {pend_path}")
     else:
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+build_dimensoes.py
+
+Construtor genérico e INCREMENTAL das dimensões (produto, centro de distribuição,
+forma de pagamento e responsável pelo pedido).
+- Descobre os membros distintos direto do fato, em UMA leitura projetada
+  (só as colunas das dimensões, lote a lote) compartilhada pelas quatro dimensões.
+- Preserva os IDs da dimensão existente (dim_*.parquet / dim_*.csv no --out-dir)
+  e só ACRESCENTA membros novos, com IDs a partir do maior já usado.
+- Grava também dim_*.idx.arrow (índice de lookup, ver indice_dimensoes.py).
+- Sem dimensão anterior, parte das listas-semente (as mesmas que os
+  build_dim_* usavam), então os IDs históricos (CDS001, FRM001, VEND001...) não mudam.
+
+Uso:
+  python src/build_dimensoes.py --input data/processed --out-dir data/dimensoes
+  python src/build_dimensoes.py --dimensoes centro_distribuicao,formapagto
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from build_dim_produto import classificar_categorias
+from export_stream import abrir_dataset
+from indice_dimensoes import NORMALIZADORES, salvar_indice
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_INPUT = BASE_DIR / "data" / "processed"
+DEFAULT_OUT_DIR = BASE_DIR / "data" / "dimensoes"
+LOTE_LINHAS = 500_000
+
+# =====================
+# Especificação das dimensões
+# =====================
+# col_fato     : coluna do fato com o membro
+# col_nome     : nome do membro na dimensão
+# col_norm     : chave de junção (mesma normalização usada em build_fato_enriquecido.py)
+# normalizacao : "norm" (sem acento, minúsculo) ou "strip" -> indice_dimensoes.NORMALIZADORES
+# semente      : membros iniciais (ordem = IDs 001, 002, ...) quando não há dimensão anterior
+DIMENSOES = {
+    "produto": {
+        "arquivo": "dim_produto",
+        "col_fato": "produto",
+        "col_categoria": "categoriaprod",   # se não existir no fato, classifica por regras
+        "id_col": "produto_id",
+        "prefixo": "PROD",
+        "col_nome": "produto_nome",
+        "col_norm": "produto_nome_normalizado",
+        "normalizacao": "norm",
+        "semente": [],
+    },
+    "centro_distribuicao": {
+        "arquivo": "dim_centro_distribuicao",
+        "col_fato": "centro_distribuicao",
+        "id_col": "centro_id",
+        "prefixo": "CDS",
+        "col_nome": "centro_distribuicao",
+        "col_norm": "centro_distribuicao_normalizado",
+        "normalizacao": "strip",
+        "semente": ["Gold Beach", "Grãos Blue", "Papa Léguas", "Rapid Pink", "Tree True"],
+    },
+    "formapagto": {
+        "arquivo": "dim_formapagto",
+        "col_fato": "formapagto",
+        "id_col": "formapagto_id",
+        "prefixo": "FRM",
+        "col_nome": "forma_pagamento",
+        "col_norm": "forma_pagamento_normalizado",
+        "normalizacao": "strip",
+        "semente": ["Boleto Bancário", "Cartão Crédito", "Cartão Débito", "Dinheiro", "Pix"],
+    },
+    "responsavelpedido": {
+        "arquivo": "dim_responsavelpedido",
+        "col_fato": "responsavelpedido",
+        "id_col": "responsavelpedido_id",
+        "prefixo": "VEND",
+        "col_nome": "responsavel_pedido",
+        "col_norm": "responsavel_pedido_normalizado",
+        "normalizacao": "strip",
+        "semente": [
+            "Adriana", "Andressa", "Antonio", "Beatriz", "Carlos", "Clarice", "Claudio",
+            "Cristian", "Cristina", "Dolores", "Julia", "Ligia", "Lucia", "Maria Clara",
+            "Maria Linda", "Marta", "Miriam", "Monique", "Neide", "Silvia", "Sonia",
+            "Tereza", "Vitória", "Vivian", "Yuri",
+        ],
+    },
+}
+
+def colunas_saida(spec: dict) -> list[str]:
+    extras = ["categoria"] if "col_categoria" in spec else []
+    return [spec["id_col"], spec["col_nome"], spec["col_norm"], *extras, "ativo"]
+
+# =====================
+# Leitura única do fato
+# =====================
+
+def coletar_membros(origem, specs: dict, lote: int = LOTE_LINHAS) -> dict[str, dict]:
+    """Uma passada no fato, projetando só as colunas das dimensões pedidas.
+    Retorna {dimensao: {membro: categoria_ou_None}} na ordem da 1ª ocorrência; para produto,
+    a categoria da ÚLTIMA linha (nulo conta), a mesma regra do build_dim_produto."""
+    dataset = abrir_dataset(origem)
+    nomes = set(dataset.schema.names)
+    ativos = {d: s for d, s in specs.items() if s["col_fato"] in nomes}
+    for d in specs.keys() - ativos.keys():
+        print(f"[AVISO] Coluna '{specs[d]['col_fato']}' ausente no fato; dimensão '{d}' só com o existente.")
+
+    colunas = []
+    for s in ativos.values():
+        colunas.append(s["col_fato"])
+        if s.get("col_categoria") in nomes:
+            colunas.append(s["col_categoria"])
+    colunas = list(dict.fromkeys(colunas))
+
+    membros = {d: {} for d in specs}
+    if not colunas:
+        return membros
+    for batch in dataset.to_batches(columns=colunas, batch_size=lote):
+        tabela = pa.Table.from_batches([batch])
+        for d, s in ativos.items():
+            col, col_cat = s["col_fato"], s.get("col_categoria")
+            if col_cat in nomes:
+                t = tabela.select([col, col_cat]).filter(pc.is_valid(tabela[col]))
+                g = t.group_by(col, use_threads=False).aggregate(
+                    [(col_cat, "last", pc.ScalarAggregateOptions(skip_nulls=False))])
+                # update mantém a posição da 1ª inserção e troca só a categoria
+                membros[d].update(zip(g[col].to_pylist(), g[f"{col_cat}_last"].to_pylist()))
+            else:
+                for v in pc.unique(tabela[col]).drop_null().to_pylist():
+                    membros[d].setdefault(v, None)
+    return membros
+
+# =====================
+# Dimensão existente / semente
+# =====================
+
+def carregar_existente(spec: dict, out_dir: Path) -> pd.DataFrame | None:
+    for ext in (".parquet", ".csv"):
+        p = out_dir / f"{spec['arquivo']}{ext}"
+        if p.exists():
+            df = pd.read_parquet(p) if ext == ".parquet" else pd.read_csv(p, encoding="utf-8-sig")
+            if spec["col_norm"] not in df.columns:
+                df[spec["col_norm"]] = df[spec["col_nome"]].map(NORMALIZADORES[spec["normalizacao"]])
+            return df
+    return None
+
+def dimensao_semente(spec: dict) -> pd.DataFrame:
+    """Mesma construção dos build_dim_* antigos: IDs pela posição na lista."""
+    df = pd.DataFrame({spec["col_nome"]: spec["semente"]}, dtype=object)
+    df = df.dropna().drop_duplicates().reset_index(drop=True)
+    df[spec["col_norm"]] = df[spec["col_nome"]].map(NORMALIZADORES[spec["normalizacao"]])
+    df[spec["id_col"]] = [f"{spec['prefixo']}{i+1:03d}" for i in range(len(df))]
+    if "col_categoria" in spec:
+        df["categoria"] = pd.Series(dtype=object)
+    df["ativo"] = True
+    return df[colunas_saida(spec)]
+
+def proximo_id(ids: pd.Series, prefixo: str) -> int:
+    nums = ids.dropna().astype(str).str.extract(rf"^{re.escape(prefixo)}(\d+)$", expand=False).dropna()
+    return int(nums.astype(int).max()) + 1 if len(nums) else 1
+
+# =====================
+# Atualização incremental
+# =====================
+
+def atualizar_dimensao(spec: dict, membros: dict, existente: pd.DataFrame | None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Mantém as linhas (e IDs) existentes e acrescenta só os membros novos.
+    Retorna (dimensao, novos)."""
+    if existente is None:
+        existente = dimensao_semente(spec)
+    col_nome, col_norm, id_col = spec["col_nome"], spec["col_norm"], spec["id_col"]
+
+    cand = pd.DataFrame({col_nome: list(membros), "_categoria": list(membros.values())}, dtype=object)
+    cand[col_norm] = cand[col_nome].map(NORMALIZADORES[spec["normalizacao"]])
+    conhecidos = set(existente[col_norm].dropna())
+    novos = (
+        cand[~cand[col_norm].isin(conhecidos)]
+        .drop_duplicates(subset=[col_norm], keep="first")   # IDs novos na ordem da 1ª ocorrência,
+        .reset_index(drop=True)                              # como no build_dim_produto
+    )
+
+    inicio = proximo_id(existente[id_col], spec["prefixo"])
+    novos[id_col] = [f"{spec['prefixo']}{i:03d}" for i in range(inicio, inicio + len(novos))]
+    novos["ativo"] = True
+    if "col_categoria" in spec:
+        sem_cat = novos["_categoria"].isna()
+        if sem_cat.any():
+            novos.loc[sem_cat, "_categoria"] = classificar_categorias(novos.loc[sem_cat, col_norm])["categoria"].to_numpy()
+        novos["categoria"] = novos["_categoria"]
+
+    cols = colunas_saida(spec)
+    existente = existente.reindex(columns=cols)
+    dim = pd.concat([existente, novos[cols]], ignore_index=True) if len(novos) else existente.reset_index(drop=True)
+    return dim, novos[cols]
+
+def salvar_dimensao(dim: pd.DataFrame, spec: dict, out_dir: Path) -> tuple[Path, Path]:
+    out_parquet = out_dir / f"{spec['arquivo']}.parquet"
+    out_csv = out_dir / f"{spec['arquivo']}.csv"
+    dim.to_parquet(out_parquet, index=False)
+    dim.to_csv(out_csv, index=False, encoding="utf-8-sig")
+    # índice de lookup (chave normalizada -> id + atributos) para o enriquecimento
+    atributos = [c for c in colunas_saida(spec) if c not in (spec["col_norm"], "ativo")]
+    salvar_indice(dim, out_dir, spec["arquivo"], spec["col_norm"], spec["id_col"], atributos, spec["normalizacao"])
+    return out_parquet, out_csv
+
+def executar(input_path=DEFAULT_INPUT, out_dir=DEFAULT_OUT_DIR, apenas: list[str] | None = None,
+             lote: int = LOTE_LINHAS) -> dict[str, pd.DataFrame]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    desconhecidas = set(apenas or []) - DIMENSOES.keys()
+    if desconhecidas:
+        raise ValueError(f"Dimensões desconhecidas: {sorted(desconhecidas)}. Opções: {list(DIMENSOES)}")
+    specs = {d: s for d, s in DIMENSOES.items() if not apenas or d in apenas}
+
+    membros = coletar_membros(input_path, specs, lote=lote)
+    saida = {}
+    for d, spec in specs.items():
+        dim, novos = atualizar_dimensao(spec, membros[d], carregar_existente(spec, out_dir))
+        out_parquet, out_csv = salvar_dimensao(dim, spec, out_dir)
+        print(f"[OK] {spec['arquivo']}: {len(dim)} membros ({len(novos)} novos) -> {out_parquet.name} / {out_csv.name}")
+        for _, r in novos.head(10).iterrows():
+            print(f"   + {r[spec['id_col']]}  {r[spec['col_nome']]}")
+        if len(novos) > 10:
+            print(f"   ... (+{len(novos) - 10})")
+        saida[d] = dim
+    return saida
+
+# =====================
+# CLI
+# =====================
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Atualiza as dimensões a partir do fato (incremental).")
+    ap.add_argument("--input", default=str(DEFAULT_INPUT), help="Parquet do fato (arquivo ou diretório de partições).")
+    ap.add_argument("--out-dir", default=str(DEFAULT_OUT_DIR), help="Diretório das dimensões (lidas e regravadas).")
+    ap.add_argument("--dimensoes", default=None,
+                    help=f"Subconjunto separado por vírgula (padrão: todas). Opções: {','.join(DIMENSOES)}")
+    ap.add_argument("--lote", type=int, default=LOTE_LINHAS, help="Linhas por lote lido do fato.")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    apenas = [d.strip() for d in args.dimensoes.split(",")] if args.dimensoes else None
+    executar(args.input, args.out_dir, apenas=apenas, lote=args.lote)
+
+if __name__ == "__main__":
+    main()
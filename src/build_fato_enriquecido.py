@@ -1,30 +1,48 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import os
 import pandas as pd
-from unidecode import unidecode
+
+from catalogo_dados import salvar_catalogo
+from indice_dimensoes import NORMALIZADORES, carregar_indices, enriquecer
+from instrumentacao import etapa, iniciar
+from resolver_nao_casados import aliases as aliases_aceitos, resolver
 
 # --- paths (ajuste conforme sua árvore) ---
 BASE_DIR  = r"I:/Projetos_Python/Fiap_F5/Fiap_F5"
 FACT_PATH = os.path.join(BASE_DIR, "data/processed/vendas_completo.parquet")
 DIM_DIR   = os.path.join(BASE_DIR, "data/dimensoes")
-OUT_DIR   = os.path.join(BASE_DIR, "data/processed")
+OUT_DIR   = os.path.join(BASE_DIR, "data/enriquecido")   # fora do processed/: não entra nos globs das partições
 
 DIM_PROD_PATH = os.path.join(DIM_DIR, "dim_produto.csv")
 DIM_CDS_PATH  = os.path.join(DIM_DIR, "dim_centro_distribuicao.csv")
 DIM_FRM_PATH  = os.path.join(DIM_DIR, "dim_formapagto.csv")
 DIM_VEND_PATH = os.path.join(DIM_DIR, "dim_responsavelpedido.csv")
 
+# --- casamento aproximado de produtos (src/resolver_nao_casados.py) ---
+RESOLVER_PRODUTOS = True      # False => só relatório de não-casados, como antes
+RESOLUCOES_PATH = os.path.join(DIM_DIR, "resolucoes_produto.csv")
+NGRAM_PATH      = os.path.join(DIM_DIR, "dim_produto.ngram.npz")
+
 # --- colunas na sua base ---
 COL_PROD_FATO = "produto"
 COL_CDS_FATO  = "centro_distribuicao"
 COL_FRM_FATO  = "formapagto"
 COL_VEND_FATO = "responsavelpedido"
 
-def norm(s: str) -> str:
-    s = unidecode(str(s or "")).lower().strip()
-    return " ".join(s.split())
+# dimensão -> (arquivo, coluna no fato, CSV, chave normalizada, coluna nome, normalização, id, colunas, relatório)
+DIMENSOES = [
+    ("dim_produto", COL_PROD_FATO, DIM_PROD_PATH, "produto_nome_normalizado", "produto_nome", "norm",
+     "produto_id", ["produto_id", "produto_nome", "categoria"], "nao_casados_produto.csv", "__prod_norm"),
+    ("dim_centro_distribuicao", COL_CDS_FATO, DIM_CDS_PATH, "centro_distribuicao_normalizado", "centro_distribuicao", "strip",
+     "centro_id", ["centro_id", "centro_distribuicao"], "nao_casados_cds.csv", "__cds_norm"),
+    ("dim_formapagto", COL_FRM_FATO, DIM_FRM_PATH, "forma_pagamento_normalizado", "forma_pagamento", "strip",
+     "formapagto_id", ["formapagto_id", "forma_pagamento"], "nao_casados_formapagto.csv", "__frm_norm"),
+    ("dim_responsavelpedido", COL_VEND_FATO, DIM_VEND_PATH, "responsavel_pedido_normalizado", "responsavel_pedido", "strip",
+     "responsavelpedido_id", ["responsavelpedido_id", "responsavel_pedido"], "nao_casados_responsavelpedido.csv", "__vend_norm"),
+]
 
 def load_parquet_or_csv(path):
     ext = os.path.splitext(path.lower())[1]
@@ -76,111 +94,98 @@ def safe_merge_left(fato: pd.DataFrame,
     merged.drop(columns=[right_on], inplace=True, errors="ignore")
     return merged, not_matched
 
-def main():
-    os.makedirs(OUT_DIR, exist_ok=True)
+def main(fact_path=FACT_PATH, dim_dir=DIM_DIR, out_dir=OUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
 
     # 1) fato
-    fato = load_parquet_or_csv(FACT_PATH)
-
-    # 2) normalizações auxiliares para join por texto
-    if COL_PROD_FATO in fato.columns:
-        fato["__prod_norm"] = fato[COL_PROD_FATO].map(norm)
-    if COL_CDS_FATO in fato.columns:
-        fato["__cds_norm"]  = fato[COL_CDS_FATO].map(lambda x: str(x).strip())
-    if COL_FRM_FATO in fato.columns:
-        fato["__frm_norm"]  = fato[COL_FRM_FATO].map(lambda x: str(x).strip())
-    if COL_VEND_FATO in fato.columns:
-        fato["__vend_norm"] = fato[COL_VEND_FATO].map(lambda x: str(x).strip())
+    with etapa("ler_fato") as m:
+        fato = load_parquet_or_csv(fact_path)
+        m.saida(len(fato))
+
+    # 2) índices de lookup (dim_*.idx.arrow): chave já normalizada, sem reler CSV
+    indices = carregar_indices(dim_dir) if os.path.isdir(dim_dir) else {}
 
     reports = {}
 
-    # 3) Produto
-    if os.path.exists(DIM_PROD_PATH) and "__prod_norm" in fato.columns:
-        dim_prod = pd.read_csv(DIM_PROD_PATH, encoding="utf-8-sig")
-        if "produto_nome_normalizado" not in dim_prod.columns:
-            dim_prod["produto_nome_normalizado"] = dim_prod["produto_nome"].map(norm)
-
-        # Traga o essencial; evite 'ativo' para não colidir
-        fato, not_matched = safe_merge_left(
-            fato=fato,
-            dim=dim_prod,
-            left_on="__prod_norm",
-            right_on="produto_nome_normalizado",
-            id_col="produto_id",
-            keep_cols=["produto_id", "produto_nome", "categoria"]  # será renomeado p/ *_dim se já existir
-        )
-        reports["nao_casados_produto.csv"] = not_matched
-
-    # 4) Centro de distribuição
-    if os.path.exists(DIM_CDS_PATH) and "__cds_norm" in fato.columns:
-        dim_cds = pd.read_csv(DIM_CDS_PATH, encoding="utf-8-sig")
-        if "centro_distribuicao_normalizado" not in dim_cds.columns:
-            dim_cds["centro_distribuicao_normalizado"] = dim_cds["centro_distribuicao"].map(lambda x: str(x).strip())
-
-        fato, not_matched = safe_merge_left(
-            fato=fato,
-            dim=dim_cds,
-            left_on="__cds_norm",
-            right_on="centro_distribuicao_normalizado",
-            id_col="centro_id",
-            keep_cols=["centro_id", "centro_distribuicao"]  # evita 'ativo'
-        )
-        reports["nao_casados_cds.csv"] = not_matched
-
-    # 5) Forma de pagamento
-    if os.path.exists(DIM_FRM_PATH) and "__frm_norm" in fato.columns:
-        dim_frm = pd.read_csv(DIM_FRM_PATH, encoding="utf-8-sig")
-        if "forma_pagamento_normalizado" not in dim_frm.columns:
-            dim_frm["forma_pagamento_normalizado"] = dim_frm["forma_pagamento"].map(lambda x: str(x).strip())
-
-        fato, not_matched = safe_merge_left(
-            fato=fato,
-            dim=dim_frm,
-            left_on="__frm_norm",
-            right_on="forma_pagamento_normalizado",
-            id_col="formapagto_id",
-            keep_cols=["formapagto_id", "forma_pagamento"]
-        )
-        reports["nao_casados_formapagto.csv"] = not_matched
-
-    # 6) Responsável Pedido
-    if os.path.exists(DIM_VEND_PATH) and "__vend_norm" in fato.columns:
-        dim_vend = pd.read_csv(DIM_VEND_PATH, encoding="utf-8-sig")
-        if "responsavel_pedido_normalizado" not in dim_vend.columns:
-            dim_vend["responsavel_pedido_normalizado"] = dim_vend["responsavel_pedido"].map(lambda x: str(x).strip())
-
-        fato, not_matched = safe_merge_left(
-            fato=fato,
-            dim=dim_vend,
-            left_on="__vend_norm",
-            right_on="responsavel_pedido_normalizado",
-            id_col="responsavelpedido_id",
-            keep_cols=["responsavelpedido_id", "responsavel_pedido"]
-        )
-        reports["nao_casados_responsavelpedido.csv"] = not_matched
-
-    # 7) limpeza de colunas auxiliares
-    fato.drop(columns=[c for c in ["__prod_norm","__cds_norm","__frm_norm","__vend_norm"] if c in fato.columns],
-              inplace=True, errors="ignore")
-
-    # 8) saída
-    out_parquet = os.path.join(OUT_DIR, "vendas_completo_enriquecido.parquet")
-    out_csv     = os.path.join(OUT_DIR, "vendas_completo_enriquecido.csv")
-    fato.to_parquet(out_parquet, index=False)
-    fato.to_csv(out_csv, index=False, encoding="utf-8-sig")
-
-    # 9) relatórios de não-casados
+    # 3) uma junção por dimensão (índice se existir; senão CSV + merge)
+    for arquivo, col_fato, csv_path, col_norm, col_nome, normalizacao, id_col, keep_cols, rel, col_aux in DIMENSOES:
+        if col_fato not in fato.columns:
+            continue
+        dim = None
+        csv_path = os.path.join(dim_dir, os.path.basename(csv_path))
+        if arquivo in indices:
+            chaves_dim, ids_dim = indices[arquivo].chaves(), indices[arquivo].tabela.column(id_col).to_numpy(zero_copy_only=False)
+        elif os.path.exists(csv_path):
+            dim = pd.read_csv(csv_path, encoding="utf-8-sig")
+            if col_norm not in dim.columns:
+                dim[col_norm] = dim[col_nome].map(NORMALIZADORES[normalizacao])
+            chaves_dim, ids_dim = dim[col_norm], dim[id_col]
+        else:
+            continue
+
+        # produto: nomes que derivaram (acento, gramatura...) -> chave da dimensão
+        aliases = {}
+        if arquivo == "dim_produto" and RESOLVER_PRODUTOS:
+            distintos = pd.Series(fato[col_fato].unique()).map(NORMALIZADORES[normalizacao])
+            with etapa("resolver_produtos", entrada=len(distintos)):
+                resolucoes = resolver(distintos, chaves_dim, ids_dim,
+                                      cache_path=os.path.join(dim_dir, os.path.basename(RESOLUCOES_PATH)),
+                                      indice_path=os.path.join(dim_dir, os.path.basename(NGRAM_PATH)))
+            aliases = aliases_aceitos(resolucoes)
+            if len(resolucoes):
+                reports["nao_casados_produto_sugestoes.csv"] = resolucoes
+                print(f"[INFO] Produtos resolvidos por similaridade: {len(aliases)} de {len(resolucoes)}")
+
+        with etapa(f"juntar_{arquivo}", entrada=len(fato)):
+            if dim is None:
+                # evita 'ativo' para não colidir; keep_cols viram *_dim se já existirem
+                fato, not_matched = enriquecer(fato, indices[arquivo], col_fato, keep_cols,
+                                               col_relatorio=col_aux, aliases=aliases)
+            else:
+                fato[col_aux] = fato[col_fato].map(NORMALIZADORES[normalizacao])
+                if aliases:
+                    fato[col_aux] = fato[col_aux].replace(aliases)
+                fato, not_matched = safe_merge_left(
+                    fato=fato,
+                    dim=dim,
+                    left_on=col_aux,
+                    right_on=col_norm,
+                    id_col=id_col,
+                    keep_cols=keep_cols,
+                )
+                fato.drop(columns=[col_aux], inplace=True, errors="ignore")
+        reports[rel] = not_matched
+
+    # 4) saída
+    # CSV completo apenas sob demanda (src/export_stream.py)
+    out_parquet = os.path.join(out_dir, "vendas_completo_enriquecido.parquet")
+    with etapa("gravar_parquet", entrada=len(fato)):
+        fato.to_parquet(out_parquet, index=False)
+    # catálogo para o dashboard (opções de filtro/período sem ler o fato)
+    out_catalogo = salvar_catalogo(out_parquet)
+
+    # 5) relatórios de não-casados
     for fname, dfrep in reports.items():
-        dfrep_path = os.path.join(OUT_DIR, fname)
+        dfrep_path = os.path.join(out_dir, fname)
         dfrep.to_csv(dfrep_path, index=False, encoding="utf-8-sig")
 
     print("[OK] Fato enriquecido salvo:")
     print(" -", out_parquet)
-    print(" -", out_csv)
+    print(" -", out_catalogo)
+    print("[INFO] CSV sob demanda: python src/export_stream.py --input", out_parquet, "--out <arquivo.csv>")
     if reports:
-        print("[AVISO] Relatórios de não-casados gerados em:", OUT_DIR)
+        print("[AVISO] Relatórios de não-casados gerados em:", out_dir)
         for fn in reports:
             print("  *", fn)
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Enriquece o fato com as dimensões.")
+    ap.add_argument("--fato", default=FACT_PATH, help="Parquet/CSV do fato.")
+    ap.add_argument("--dim-dir", default=DIM_DIR, help="Diretório das dimensões (dim_*.csv / *.idx.arrow).")
+    ap.add_argument("--out-dir", default=OUT_DIR, help="Diretório de saída.")
+    return ap.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
+    iniciar("build_fato_enriquecido")
+    args = parse_args()
+    main(args.fato, args.dim_dir, args.out_dir)
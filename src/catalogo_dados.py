@@ -0,0 +1,141 @@
+# src/catalogo_dados.py
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from assinatura_parquet import assinatura
+from datas_rapidas import datas_com_periodo
+from instrumentacao import etapa, iniciar
+
+# ==============================================
+# Catálogo de metadados do parquet enriquecido (arquivo ao lado: <nome>.catalogo.json)
+# - linhas, row groups, tamanho do arquivo e assinatura (sha256 do footer,
+#   assinatura_parquet.py): o dashboard só confia no catálogo se ela bater
+# - por coluna: tipo, nulos e taxa de nulos (estatísticas do footer quando existem)
+# - intervalo de datas + anos/meses presentes (mesma conversão do dashboard: datas_rapidas)
+# - membros distintos de cada dimensão (texto sem espaços nas pontas, ordenados)
+# Lido pelo dashboard (streamlit_app/dados_compartilhados.py) para montar sidebar e
+# cabeçalho sem varrer o fato. Uma passada, row group a row group, só nas colunas
+# de data/dimensões.
+#
+# Uso:
+#   python src/catalogo_dados.py --input data/enriquecido/vendas_completo_enriquecido.parquet
+# ==============================================
+
+FORMATO = 2              # 2: + assinatura (catálogos antigos são ignorados pelo dashboard)
+COLS_DATA = ["data_pedido", "data", "dt_pedido", "pedido_data"]   # mesma ordem do core_dataviz.preparar_df
+DIMENSOES = ["estado", "regiao_pais", "categoria", "subcategoria", "canal", "forma_pagamento",
+             "responsavelpedido", "centro_distribuicao_normalizado", "centro_distribuicao",
+             "centro_id", "centro"]
+MAX_MEMBROS = 5_000      # dimensão com mais membros que isso não é lista de filtro: só a contagem
+
+def caminho_catalogo(parquet) -> Path:
+    p = Path(parquet)
+    return p.with_name(p.stem + ".catalogo.json")
+
+def _nulos_footer(meta: pq.FileMetaData, idx: int) -> int | None:
+    total = 0
+    for rg in range(meta.num_row_groups):
+        st = meta.row_group(rg).column(idx).statistics
+        if st is None or not st.has_null_count:
+            return None
+        total += st.null_count
+    return total
+
+def gerar_catalogo(parquet) -> dict:
+    pf = pq.ParquetFile(parquet)
+    meta = pf.metadata
+    schema = pf.schema_arrow
+    nomes = schema.names
+    linhas = meta.num_rows
+
+    col_data = next((c for c in COLS_DATA if c in nomes), None)
+    dims = [c for c in DIMENSOES if c in nomes]
+
+    # nulos: footer quando todas as row groups têm a estatística; senão conta na leitura
+    nulos = {}
+    idx_folha = {meta.schema.column(i).path: i for i in range(meta.num_columns)}
+    for c in nomes:
+        nulos[c] = _nulos_footer(meta, idx_folha[c]) if c in idx_folha else None
+    ler = list(dict.fromkeys(([col_data] if col_data else []) + dims + [c for c, n in nulos.items() if n is None]))
+
+    membros: dict[str, set] = {c: set() for c in dims}
+    datas: set = set()
+    contar = {c for c, n in nulos.items() if n is None}
+    for c in contar:
+        nulos[c] = 0
+    for rg in range(pf.num_row_groups):
+        tabela = pf.read_row_group(rg, columns=ler)
+        for c in contar:
+            nulos[c] += tabela.column(c).null_count
+        for c in dims:
+            if membros[c] is not None:
+                membros[c].update(pc.unique(tabela.column(c)).to_pylist())
+                if len(membros[c]) > MAX_MEMBROS * 2:
+                    membros[c] = None
+        if col_data:
+            datas.update(pc.unique(tabela.column(col_data)).to_pylist())
+
+    dimensoes = {}
+    for c in dims:
+        if membros[c] is None:
+            dimensoes[c] = {"membros": None, "distintos": f">{MAX_MEMBROS}"}
+            continue
+        valores = sorted({str(v).strip() for v in membros[c] if v is not None})
+        dimensoes[c] = ({"membros": valores, "distintos": len(valores)} if len(valores) <= MAX_MEMBROS
+                        else {"membros": None, "distintos": len(valores)})
+
+    periodo = None
+    if col_data:
+        per = datas_com_periodo(pd.Series([d for d in datas if d is not None], dtype=object))
+        validas = per["data"].dropna()
+        periodo = {
+            "coluna": col_data,
+            "min": validas.min().date().isoformat() if len(validas) else None,
+            "max": validas.max().date().isoformat() if len(validas) else None,
+            "anos": sorted(int(a) for a in per["ano"].dropna().unique()),
+            "meses": sorted(per["mes"].dropna().unique().tolist()),
+            "valores_invalidos": int(len(per) - len(validas)),
+        }
+
+    return {
+        "formato": FORMATO,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "arquivo": Path(parquet).name,
+        "tamanho_bytes": Path(parquet).stat().st_size,
+        "assinatura": assinatura(parquet),
+        "linhas": linhas,
+        "row_groups": meta.num_row_groups,
+        "colunas": {
+            c: {"tipo": str(schema.field(c).type), "nulos": nulos[c],
+                "taxa_nulos": round(nulos[c] / linhas, 6) if linhas else 0.0}
+            for c in nomes
+        },
+        "periodo": periodo,
+        "dimensoes": dimensoes,
+    }
+
+def salvar_catalogo(parquet, destino=None) -> Path:
+    destino = Path(destino) if destino else caminho_catalogo(parquet)
+    with etapa("catalogo") as m:
+        catalogo = gerar_catalogo(parquet)
+        m.entrada(catalogo["linhas"])
+    destino.write_text(json.dumps(catalogo, ensure_ascii=False, indent=1), encoding="utf-8")
+    return destino
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Gera o catálogo de metadados (<parquet>.catalogo.json) do fato enriquecido.")
+    ap.add_argument("--input", required=True, help="Parquet enriquecido.")
+    ap.add_argument("--out", default=None, help="Destino (padrão: ao lado do parquet).")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    iniciar("catalogo_dados")
+    args = parse_args()
+    destino = salvar_catalogo(args.input, args.out)
+    print("[OK] Catálogo salvo:", destino)
@@ -0,0 +1,123 @@
+# src/comparativos.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ==============================================
+# Comparativos período a período (MoM, YoY, YTD) sobre rollups mensais
+# - entrada: rollup já agregado (mes + [dimensão] + medidas), do dashboard
+#   (serie_mensal / rollup_mensal) ou do kpi_mensal.csv do pipeline
+# - cubo meses x membros x medidas com eixo de meses CONTÍNUO (mês sem venda = 0):
+#   deslocar 1 linha = mês anterior, 12 linhas = mesmo mês do ano anterior
+# - todas as variações de todos os meses e membros saem de um deslocamento do cubo
+#   inteiro; YTD = soma acumulada menos o acumulado até dezembro do ano anterior
+# - ticket = receita / pedidos, recalculado em cada agregado (inclusive no YTD)
+#
+# Uso:
+#   comp = comparar(core.serie_mensal(df_f))                  # total
+#   comp = comparar(core.rollup_mensal(df_f, "estado"), "estado")
+#   linha(comp, "2023-05")["receita_yoy"]
+# ==============================================
+
+MEDIDAS = ("receita", "pedidos", "itens")
+SINONIMOS = {"mes": ["mes", "yyyymm"], "receita": ["receita", "Receita", "revenue"],
+             "pedidos": ["pedidos", "Pedidos", "orders"], "itens": ["itens", "Itens"]}
+
+@dataclass
+class CuboMensal:
+    meses: list[str]            # "AAAA-MM", contínuo do primeiro ao último mês
+    indice: np.ndarray          # ano * 12 + (mês - 1) de cada linha do cubo
+    membros: list               # membros da dimensão ([None] sem dimensão)
+    medidas: list[str]
+    valores: np.ndarray         # (meses, membros, medidas)
+
+def _coluna(df: pd.DataFrame, nome: str) -> str | None:
+    return next((c for c in SINONIMOS.get(nome, [nome]) if c in df.columns), None)
+
+def montar_cubo(rollup: pd.DataFrame, dim: str | None = None, medidas=MEDIDAS) -> CuboMensal:
+    col_mes = _coluna(rollup, "mes")
+    medidas = [m for m in medidas if _coluna(rollup, m)]
+    r = rollup[rollup[col_mes].astype("string").str.match(r"^\d{4}-\d{2}$").fillna(False)]
+    if dim:
+        r = r[r[dim].notna()]
+    if r.empty:
+        return CuboMensal([], np.empty(0, dtype=np.int64), [], medidas, np.zeros((0, 0, len(medidas))))
+
+    rotulos = r[col_mes].astype(str)
+    k = (rotulos.str[:4].astype(int) * 12 + rotulos.str[5:7].astype(int) - 1).to_numpy()
+    k0 = k.min()
+    indice = np.arange(k0, k.max() + 1)
+    if dim:
+        codigos, membros = pd.factorize(r[dim], sort=True)
+        membros = list(membros)
+    else:
+        codigos, membros = np.zeros(len(r), dtype=np.int64), [None]
+
+    valores = np.zeros((len(indice), len(membros), len(medidas)))
+    brutos = np.nan_to_num(np.column_stack([pd.to_numeric(r[_coluna(r, m)], errors="coerce").to_numpy(dtype=float)
+                                            for m in medidas]))
+    np.add.at(valores, (k - k0, codigos), brutos)   # linhas repetidas no rollup somam
+    meses = [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in indice]
+    return CuboMensal(meses, indice, membros, medidas, valores)
+
+def _anterior(X: np.ndarray, k: int) -> np.ndarray:
+    """X deslocado k meses para frente (linha t recebe t-k); sem histórico -> NaN."""
+    out = np.full_like(X, np.nan)
+    if k < len(X):
+        out[k:] = X[:-k]
+    return out
+
+def _variacao(atual: np.ndarray, anterior: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(anterior > 0, atual / anterior - 1, np.nan)
+
+def _ytd(cubo: CuboMensal) -> np.ndarray:
+    X = cubo.valores
+    acum = np.cumsum(X, axis=0)
+    t = np.arange(len(X))
+    inicio_ano = t - cubo.indice % 12                    # linha de janeiro do mesmo ano
+    base = np.where((inicio_ano > 0)[:, None, None], acum[np.clip(inicio_ano - 1, 0, None)], 0.0)
+    ytd = acum - base
+    ytd[inicio_ano < 0] = np.nan                          # ano começou antes do eixo: YTD parcial
+    return ytd
+
+def _ticket(X: np.ndarray, medidas: list[str]) -> np.ndarray | None:
+    if not {"receita", "pedidos"} <= set(medidas):
+        return None
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(X[..., medidas.index("pedidos")] > 0,
+                        X[..., medidas.index("receita")] / X[..., medidas.index("pedidos")], np.nan)[..., None]
+
+def comparar(rollup: pd.DataFrame, dim: str | None = None, medidas=MEDIDAS) -> pd.DataFrame:
+    """Uma linha por mês (x membro): medida, medida_mom, medida_yoy, medida_ytd, medida_ytd_yoy."""
+    cubo = montar_cubo(rollup, dim, medidas)
+    nomes = list(cubo.medidas)
+    X, ytd = cubo.valores, _ytd(cubo)
+    tk, tk_ytd = _ticket(X, nomes), _ticket(ytd, nomes)
+    if tk is not None:
+        X, ytd, nomes = np.concatenate([X, tk], axis=2), np.concatenate([ytd, tk_ytd], axis=2), nomes + ["ticket"]
+
+    blocos = {
+        "": X,
+        "_mom": _variacao(X, _anterior(X, 1)),
+        "_yoy": _variacao(X, _anterior(X, 12)),
+        "_ytd": ytd,
+        "_ytd_yoy": _variacao(ytd, _anterior(ytd, 12)),
+    }
+    T, M = X.shape[:2]
+    out = {"mes": np.repeat(cubo.meses, M)}
+    if dim:
+        out[dim] = np.tile(np.asarray(cubo.membros, dtype=object), T)
+    for i, nome in enumerate(nomes):
+        for sufixo, bloco in blocos.items():
+            out[nome + sufixo] = bloco[..., i].ravel()
+    return pd.DataFrame(out)
+
+def linha(comp: pd.DataFrame, mes: str, membro=None, dim: str | None = None) -> dict:
+    """Comparativos de um mês (e membro); {} se o mês está fora do rollup."""
+    sel = comp["mes"] == mes
+    if dim:
+        sel &= comp[dim] == membro
+    r = comp[sel]
+    return r.iloc[0].to_dict() if len(r) else {}
@@ -0,0 +1,324 @@
+# src/contrato_dados.py
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from conversao_numerica import numero, texto
+from datas_rapidas import converter_datas_arrow
+from export_stream import listar_parquets
+from instrumentacao import etapa, iniciar
+from regioes import REGIOES_BRASIL_POR_UF
+
+# ==============================================
+# Contrato de dados da base processada (substitui o antigo sanidade_dados.py)
+# - regras DECLARATIVAS (lista de dicts; --contrato aceita o mesmo formato em JSON):
+#     presenca  : colunas obrigatórias no schema
+#     nao_nulo  : sem nulo/vazio
+#     numerico  : texto preenchido que não vira número ("R$ 1.234,56" vira)
+#     faixa     : min <= x <= max (opcional: inteiro)
+#     dominio   : valor numa lista (ex.: UFs)
+#     produto   : total ≈ valor x quantidade (tolerância absoluta/relativa)
+#     datas     : data válida entre min e max ("hoje" = data da execução)
+#     unico     : chave sem repetição em TODA a base
+# - unidade de trabalho = row group de cada parquet; row groups avaliados em
+#   paralelo (threads: pyarrow/numpy liberam o GIL), lote a lote, com as regras
+#   vetorizadas em pyarrow.compute -> máscara por linha
+# - unico: hash 64 bits da chave por linha + posição (row group, linha); no fim,
+#   1 sort global acha as repetições (a 1ª ocorrência não conta como violação)
+# - saída: violações por regra (data/audit/contrato_resumo.csv) e amostra limitada
+#   das linhas ofensoras (data/audit/contrato_amostras.csv)
+# - gate: regra "erro" acima da taxa tolerada -> código de saída 1 (o orquestrador
+#   para as etapas seguintes)
+#
+# Uso:
+#   python src/contrato_dados.py --input data/processed
+#   python src/contrato_dados.py --input data/processed --contrato contrato.json --workers 4
+# ==============================================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INPUT_DIR = BASE_DIR / "data" / "processed"
+OUT_DIR = BASE_DIR / "data" / "audit"
+
+LOTE_LINHAS = 128_000
+MAX_AMOSTRAS = 20        # linhas de exemplo por regra
+
+CONTRATO = [
+    {"regra": "colunas_obrigatorias", "tipo": "presenca", "severidade": "erro",
+     "colunas": ["cod_pedido", "produto", "valor", "quantidade", "valor_total_bruto", "data", "estado"]},
+    {"regra": "cod_pedido_preenchido", "tipo": "nao_nulo", "colunas": ["cod_pedido"], "severidade": "erro"},
+    {"regra": "estado_preenchido", "tipo": "nao_nulo", "colunas": ["estado"], "severidade": "aviso"},
+    {"regra": "valor_numerico", "tipo": "numerico", "colunas": ["valor"], "severidade": "erro", "taxa_max": 0.01},
+    {"regra": "total_numerico", "tipo": "numerico", "colunas": ["valor_total_bruto"], "severidade": "erro", "taxa_max": 0.01},
+    {"regra": "comissao_lucro_numericos", "tipo": "numerico", "colunas": ["valor_comissao", "lucro_liquido"], "severidade": "aviso"},
+    {"regra": "valor_faixa", "tipo": "faixa", "colunas": ["valor"], "min": 0, "max": 100_000, "severidade": "erro", "taxa_max": 0.01},
+    {"regra": "quantidade_faixa", "tipo": "faixa", "colunas": ["quantidade"], "min": 1, "max": 1_000, "inteiro": True,
+     "severidade": "erro", "taxa_max": 0.01},
+    {"regra": "uf_valida", "tipo": "dominio", "colunas": ["estado"], "valores": sorted(REGIOES_BRASIL_POR_UF),
+     "severidade": "aviso"},
+    {"regra": "total_confere", "tipo": "produto", "colunas": ["valor_total_bruto", "valor", "quantidade"],
+     "tolerancia_abs": 0.05, "tolerancia_rel": 0.01, "severidade": "aviso"},
+    {"regra": "data_no_periodo", "tipo": "datas", "colunas": ["data"], "min": "2015-01-01", "max": "hoje",
+     "dayfirst": True, "severidade": "erro", "taxa_max": 0.01},
+    {"regra": "pedido_produto_unico", "tipo": "unico", "colunas": ["cod_pedido", "produto"], "severidade": "aviso"},
+]
+
+@dataclass
+class ParcialUnidade:
+    """Resultado de um row group: contagens por regra, amostras e hashes das chaves únicas."""
+    avaliadas: dict = field(default_factory=dict)
+    violacoes: dict = field(default_factory=dict)
+    amostras: dict = field(default_factory=dict)      # regra -> [dict]
+    hashes: dict = field(default_factory=dict)        # regra -> [np.ndarray uint64]
+    linhas: int = 0
+
+@dataclass
+class ResultadoContrato:
+    resumo: pd.DataFrame
+    amostras: pd.DataFrame
+
+    @property
+    def falhou(self) -> bool:
+        return bool((self.resumo["status"] == "FALHOU").any())
+
+# =====================
+# Conversões Arrow (vetorizadas)
+# =====================
+
+def _preenchido(arr) -> pa.Array:
+    if pa.types.is_null(arr.type):
+        return pa.array(np.zeros(len(arr), dtype=bool))
+    if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type) or pa.types.is_dictionary(arr.type):
+        return pc.fill_null(pc.greater(pc.utf8_length(texto(arr)), 0), False)
+    return pc.is_valid(arr)
+
+def _np(mascara) -> np.ndarray:
+    return np.asarray(pc.fill_null(mascara, False).to_numpy(zero_copy_only=False), dtype=bool)
+
+def _data_limite(txt: str) -> np.datetime64:
+    return np.datetime64(date.today() if txt == "hoje" else txt, "us")
+
+# =====================
+# Regras: lote -> (avaliada, violou) por linha
+# =====================
+
+def _nao_nulo(batch, regra):
+    ruins = [~_np(_preenchido(batch.column(c))) for c in regra["colunas"]]
+    return np.ones(batch.num_rows, dtype=bool), np.logical_or.reduce(ruins)
+
+def _numerico(batch, regra):
+    avaliada = np.zeros(batch.num_rows, dtype=bool)
+    violou = np.zeros(batch.num_rows, dtype=bool)
+    for c in regra["colunas"]:
+        col = batch.column(c)
+        tem = _np(_preenchido(col))
+        avaliada |= tem
+        violou |= tem & ~_np(pc.is_valid(numero(col)))
+    return avaliada, violou
+
+def _faixa(batch, regra):
+    avaliada = np.zeros(batch.num_rows, dtype=bool)
+    violou = np.zeros(batch.num_rows, dtype=bool)
+    for c in regra["colunas"]:
+        x = numero(batch.column(c)).to_numpy(zero_copy_only=False)
+        ok = ~np.isnan(x)
+        ruim = np.zeros_like(ok)
+        if "min" in regra:
+            ruim |= x < regra["min"]
+        if "max" in regra:
+            ruim |= x > regra["max"]
+        if regra.get("inteiro"):
+            ruim |= ok & (x != np.floor(x))
+        avaliada |= ok
+        violou |= ok & ruim
+    return avaliada, violou
+
+def _dominio(batch, regra):
+    col = batch.column(regra["colunas"][0])
+    s = pc.utf8_upper(texto(col)) if regra.get("maiusculas", True) else texto(col)
+    avaliada = _np(_preenchido(col))
+    return avaliada, avaliada & ~_np(pc.is_in(s, value_set=pa.array(regra["valores"], type=s.type)))
+
+def _produto(batch, regra):
+    total, valor, qtd = (numero(batch.column(c)).to_numpy(zero_copy_only=False) for c in regra["colunas"])
+    avaliada = ~(np.isnan(total) | np.isnan(valor) | np.isnan(qtd))
+    with np.errstate(invalid="ignore"):
+        tol = np.maximum(regra.get("tolerancia_abs", 0.0), regra.get("tolerancia_rel", 0.0) * np.abs(total))
+        violou = avaliada & (np.abs(total - valor * qtd) > tol)
+    return avaliada, violou
+
+def _datas(batch, regra):
+    col = batch.column(regra["colunas"][0])
+    avaliada = _np(_preenchido(col))
+    d = converter_datas_arrow(col, dayfirst=regra.get("dayfirst", True))
+    v = np.asarray(d.to_numpy(zero_copy_only=False), dtype="datetime64[us]")
+    fora = np.isnat(v)
+    with np.errstate(invalid="ignore"):
+        if "min" in regra:
+            fora |= v < _data_limite(regra["min"])
+        if "max" in regra:
+            fora |= v > _data_limite(regra["max"])
+    return avaliada, avaliada & fora
+
+AVALIADORES = {"nao_nulo": _nao_nulo, "numerico": _numerico, "faixa": _faixa,
+               "dominio": _dominio, "produto": _produto, "datas": _datas}
+
+def _hash_chave(batch, colunas) -> np.ndarray:
+    chave = pd.DataFrame({c: texto(batch.column(c)).to_pandas() for c in colunas})
+    return pd.util.hash_pandas_object(chave, index=False).to_numpy(dtype=np.uint64)
+
+def _linha_amostra(batch, i: int, colunas: list[str]) -> dict:
+    return {c: batch.column(c)[i].as_py() for c in colunas}
+
+# =====================
+# Execução
+# =====================
+
+def unidades(origem) -> list[tuple[str, int]]:
+    """(arquivo, row group) de todos os parquets da origem."""
+    out = []
+    for f in listar_parquets(origem):
+        out += [(str(f), rg) for rg in range(pq.ParquetFile(f).metadata.num_row_groups)]
+    return out
+
+def _avaliar_unidade(unidade, regras, colunas, max_amostras, lote) -> ParcialUnidade:
+    arquivo, rg = unidade
+    parc = ParcialUnidade()
+    offset = 0
+    with etapa("avaliar_row_group") as m:
+        for batch in pq.ParquetFile(arquivo).iter_batches(batch_size=lote, row_groups=[rg], columns=colunas):
+            for r in regras:
+                nome = r["regra"]
+                if r["tipo"] == "unico":
+                    parc.hashes.setdefault(nome, []).append(_hash_chave(batch, r["colunas"]))
+                    continue
+                avaliada, violou = AVALIADORES[r["tipo"]](batch, r)
+                parc.avaliadas[nome] = parc.avaliadas.get(nome, 0) + int(avaliada.sum())
+                parc.violacoes[nome] = parc.violacoes.get(nome, 0) + int(violou.sum())
+                amostras = parc.amostras.setdefault(nome, [])
+                for i in np.flatnonzero(violou)[: max(0, max_amostras - len(amostras))]:
+                    amostras.append({"arquivo": Path(arquivo).name, "row_group": rg, "linha": offset + int(i),
+                                     "valores": _linha_amostra(batch, int(i), r["colunas"])})
+            offset += batch.num_rows
+        parc.linhas = offset
+        m.saida(offset)
+    return parc
+
+def _duplicatas(regra, parciais, lista_unidades, max_amostras):
+    """Sort global dos hashes: cada repetição após a 1ª ocorrência é violação."""
+    nome = regra["regra"]
+    blocos = [np.concatenate(p.hashes[nome]) if p.hashes.get(nome) else np.empty(0, np.uint64) for p in parciais]
+    h = np.concatenate(blocos) if blocos else np.empty(0, np.uint64)
+    unidade = np.repeat(np.arange(len(blocos)), [len(b) for b in blocos])
+    linha = np.concatenate([np.arange(len(b)) for b in blocos]) if blocos else np.empty(0, np.int64)
+    ordem = np.argsort(h, kind="stable")           # empate: ordem de leitura -> 1ª ocorrência fica
+    repetida = np.zeros(len(h), dtype=bool)
+    repetida[ordem[1:]] = h[ordem[1:]] == h[ordem[:-1]]
+
+    amostras = []
+    pos = np.flatnonzero(repetida)[:max_amostras]
+    for u in np.unique(unidade[pos]):
+        arquivo, rg = lista_unidades[u]
+        tab = pq.ParquetFile(arquivo).read_row_group(rg, columns=regra["colunas"])
+        for i in linha[pos][unidade[pos] == u]:
+            amostras.append({"arquivo": Path(arquivo).name, "row_group": rg, "linha": int(i),
+                             "valores": {c: tab.column(c)[int(i)].as_py() for c in regra["colunas"]}})
+    return len(h), int(repetida.sum()), amostras
+
+def validar(origem, contrato=CONTRATO, workers: int | None = None,
+            max_amostras: int = MAX_AMOSTRAS, lote: int = LOTE_LINHAS) -> ResultadoContrato:
+    lista = unidades(origem)
+    if not lista:
+        raise FileNotFoundError(f"Nenhum parquet encontrado em: {origem}")
+    schema = set(pq.ParquetFile(lista[0][0]).schema_arrow.names)
+    ausentes = {r["regra"]: [c for c in r["colunas"] if c not in schema] for r in contrato}
+    ativas = [r for r in contrato if r["tipo"] != "presenca" and not ausentes[r["regra"]]]
+    colunas = sorted({c for r in ativas for c in r["colunas"]})
+
+    workers = workers or min(len(lista), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        parciais = list(ex.map(lambda u: _avaliar_unidade(u, ativas, colunas, max_amostras, lote), lista))
+    total_linhas = sum(p.linhas for p in parciais)
+
+    linhas, exemplos = [], []
+    for r in contrato:
+        nome = r["regra"]
+        if r["tipo"] == "presenca":
+            avaliadas, violacoes, amostras = len(r["colunas"]), len(ausentes[nome]), []
+        elif ausentes[nome]:
+            avaliadas, violacoes, amostras = 0, 0, []
+        elif r["tipo"] == "unico":
+            avaliadas, violacoes, amostras = _duplicatas(r, parciais, lista, max_amostras)
+        else:
+            avaliadas = sum(p.avaliadas.get(nome, 0) for p in parciais)
+            violacoes = sum(p.violacoes.get(nome, 0) for p in parciais)
+            amostras = [a for p in parciais for a in p.amostras.get(nome, [])][:max_amostras]
+        taxa = violacoes / avaliadas if avaliadas else 0.0
+        taxa_max = r.get("taxa_max", 0.0)
+        if r["tipo"] != "presenca" and ausentes[nome]:
+            status = "ausente"
+        elif taxa <= taxa_max:
+            status = "ok"
+        else:
+            status = "FALHOU" if r.get("severidade", "erro") == "erro" else "aviso"
+        linhas.append({"regra": nome, "tipo": r["tipo"], "colunas": ",".join(r["colunas"]),
+                       "severidade": r.get("severidade", "erro"), "avaliadas": avaliadas, "violacoes": violacoes,
+                       "taxa": taxa, "taxa_max": taxa_max, "status": status,
+                       "detalhe": ("faltam: " + ",".join(ausentes[nome])) if ausentes[nome] else ""})
+        exemplos += [{"regra": nome, **a, "valores": json.dumps(a["valores"], ensure_ascii=False, default=str)}
+                     for a in amostras]
+    print(f"[INFO] {total_linhas:,} linhas em {len(lista)} row group(s), {workers} worker(s)")
+    return ResultadoContrato(
+        resumo=pd.DataFrame(linhas),
+        amostras=pd.DataFrame(exemplos, columns=["regra", "arquivo", "row_group", "linha", "valores"]),
+    )
+
+def salvar(res: ResultadoContrato, out_dir=OUT_DIR) -> list[Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    saidas = [out_dir / "contrato_resumo.csv", out_dir / "contrato_amostras.csv"]
+    res.resumo.to_csv(saidas[0], index=False, encoding="utf-8-sig")
+    res.amostras.to_csv(saidas[1], index=False, encoding="utf-8-sig")
+    return saidas
+
+def ler_contrato(path) -> list[dict]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Contrato de dados: regras declarativas sobre os parquets processados.")
+    ap.add_argument("--input", default=str(INPUT_DIR), help="Parquet ou diretório (prefere part_*.parquet).")
+    ap.add_argument("--contrato", default=None, help="JSON com a lista de regras (padrão: CONTRATO).")
+    ap.add_argument("--out-dir", default=str(OUT_DIR), help="Diretório do resumo e das amostras.")
+    ap.add_argument("--workers", type=int, default=None, help="Row groups avaliados em paralelo.")
+    ap.add_argument("--amostras", type=int, default=MAX_AMOSTRAS, help="Linhas de exemplo por regra.")
+    ap.add_argument("--nao-bloquear", action="store_true", help="Não sai com erro quando uma regra 'erro' falha.")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    iniciar("contrato_dados")
+    args = parse_args(argv)
+    contrato = ler_contrato(args.contrato) if args.contrato else CONTRATO
+    with etapa("contrato_dados"):
+        res = validar(args.input, contrato, workers=args.workers, max_amostras=args.amostras)
+        saidas = salvar(res, args.out_dir)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 40):
+        print(res.resumo[["regra", "severidade", "avaliadas", "violacoes", "taxa", "status", "detalhe"]].to_string(index=False))
+    print("[OK] Contrato salvo em:")
+    for p in saidas:
+        print(" -", p)
+    if res.falhou and not args.nao_bloquear:
+        falhas = res.resumo.loc[res.resumo["status"] == "FALHOU", "regra"].tolist()
+        print("[ERRO] Contrato violado:", ", ".join(falhas))
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
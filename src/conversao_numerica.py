@@ -0,0 +1,56 @@
+# src/conversao_numerica.py
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ==============================================
+# Conversões numéricas compartilhadas (esquema_tipado, contrato_dados, detector de
+# outliers, kpi_mensal/eda_quick e dashboard) -- só pandas/pyarrow, sem depender
+# de outros módulos do pipeline
+# - numero(): coluna Arrow -> float64; texto na regra do prepare_data._to_number
+#   (com vírgula, ponto = milhar e vírgula = decimal); inválido -> nulo
+# - moeda float32 do esquema_tipado volta ao float64 exato de CASAS_MOEDA casas:
+#   numero() no Arrow, normalizar_medida() no pandas, CASAS_MOEDA no SQL do core_duckdb
+# - normalizar_medida(): tipos compactos -> 64 bits para somar (IntN -> Int64)
+#
+# Uso:
+#   x = numero(batch.column("valor"))
+#   receita = normalizar_medida(pd.to_numeric(df["valor_total_bruto"], errors="coerce"))
+# ==============================================
+
+CASAS_MOEDA = 2
+_RE_NUMERO = r"^-?\d+(\.\d+)?$"
+_FLOAT32 = ("float32", "Float32", "float[pyarrow]")
+_INTEIROS_PEQUENOS = ("int8", "int16", "int32", "Int8", "Int16", "Int32",
+                      "int8[pyarrow]", "int16[pyarrow]", "int32[pyarrow]")
+
+def texto(arr) -> pa.Array:
+    """Coluna Arrow -> string sem espaços nas pontas (dictionary decodificado)."""
+    if pa.types.is_dictionary(arr.type):
+        arr = pc.cast(arr, arr.type.value_type)
+    if not (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+        arr = pc.cast(arr, pa.string())
+    return pc.utf8_trim_whitespace(arr)
+
+def numero(arr) -> pa.Array:
+    """Texto monetário/numérico -> float64 (mesma regra do prepare_data._to_number:
+    com vírgula, ponto = milhar e vírgula = decimal); inválido -> nulo."""
+    if pa.types.is_null(arr.type):
+        return pa.nulls(len(arr), pa.float64())
+    if pa.types.is_float32(arr.type):
+        return pc.round(pc.cast(arr, pa.float64()), CASAS_MOEDA)
+    if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type) or pa.types.is_decimal(arr.type):
+        return pc.cast(arr, pa.float64())
+    s = pc.replace_substring_regex(texto(arr), r"[^\d,.\-]", "")
+    s = pc.if_else(pc.match_substring(s, ","), pc.replace_substring(pc.replace_substring(s, ".", ""), ",", "."), s)
+    return pc.cast(pc.if_else(pc.match_substring_regex(s, _RE_NUMERO), s, pa.scalar(None, s.type)), pa.float64())
+
+def normalizar_medida(s: pd.Series) -> pd.Series:
+    """Tipos compactos -> 64 bits para somar: float32 vira o float64 de 2 casas que
+    foi gravado, inteiros pequenos viram Int64. Outros tipos passam direto."""
+    nome = str(s.dtype)
+    if nome in _FLOAT32:
+        return s.astype("float64").round(CASAS_MOEDA)
+    if nome in _INTEIROS_PEQUENOS:
+        return s.astype("Int64")
+    return s
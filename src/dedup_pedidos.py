@@ -0,0 +1,176 @@
+# src/dedup_pedidos.py
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ==============================================
+# Duplicatas entre chunks na ingestão (prepare_data.py)
+# - o process_chunk só enxerga um chunk; a mesma linha do vendas.csv repetida em
+#   outro chunk passava direto e a receita era contada duas vezes
+# - impressão digital por linha = hash 64 bits de todas as colunas; cada coluna é
+#   fatorada e só os valores DISTINTOS são hasheados (~3x mais rápido que
+#   hash_pandas_object no chunk inteiro); chave do pedido = hash de cod_pedido + produto
+# - ConjuntoHashes: hashes já vistos em runs ORDENADOS (consulta = searchsorted);
+#   runs pequenos em memória são fundidos; acima de `limite` hashes o run vai para
+#   disco (.npy) e é consultado por mmap -> memória limitada em arquivos enormes
+# - linha idêntica a uma já vista: removida (modo "remover") ou marcada
+#   (modo "marcar": colunas linha_duplicada / chave_duplicada)
+# - mesma chave com conteúdo diferente: nunca removida (pode ser correção),
+#   só contada e amostrada no relatório
+# - colisão de hash 64 bits: ~3e-4 de chance em 100M de linhas distintas
+#
+# Uso:
+#   dedup = DeduplicadorPedidos(modo="remover")
+#   chunk = dedup.processar(i, chunk)      # na ordem dos chunks
+#   dedup.salvar_relatorio(OUT_DIR); dedup.fechar()
+# ==============================================
+
+MODOS = ("remover", "marcar", "desligado")
+COLS_CHAVE = [["cod_pedido", "order_id"], ["produto", "sku"]]
+LIMITE_MEMORIA = 32_000_000   # hashes em RAM (~256 MB) antes de gravar um run em disco
+MAX_RUNS_MEMORIA = 8
+MAX_AMOSTRAS = 50
+_HASH_NULO = np.uint64(0x9E3779B97F4A7C15)
+_MULT = np.uint64(1_000_003)
+
+class ConjuntoHashes:
+    """Conjunto de uint64 só de inserção: runs ordenados em memória + runs em disco (mmap)."""
+
+    def __init__(self, limite: int = LIMITE_MEMORIA, dir_runs=None):
+        self.limite = limite
+        self._dir_runs = Path(dir_runs) if dir_runs else None
+        self._tmp = None
+        self._memoria: list[np.ndarray] = []
+        self._disco: list[np.ndarray] = []
+        self.tamanho = 0
+
+    def contem(self, h: np.ndarray) -> np.ndarray:
+        achado = np.zeros(len(h), dtype=bool)
+        if not len(h):
+            return achado
+        ordem = np.argsort(h, kind="stable")     # consultas ordenadas: acesso sequencial ao mmap
+        q = h[ordem]
+        for run in self._memoria + self._disco:
+            pos = np.searchsorted(run, q)
+            ok = pos < len(run)
+            achado[ordem[ok]] |= np.asarray(run[pos[ok]]) == q[ok]
+        return achado
+
+    def adicionar(self, novos: np.ndarray):
+        """`novos` sem repetição e ausentes do conjunto (quem chama garante)."""
+        if not len(novos):
+            return
+        self._memoria.append(np.sort(novos))
+        self.tamanho += len(novos)
+        if len(self._memoria) > MAX_RUNS_MEMORIA:
+            self._memoria = [np.sort(np.concatenate(self._memoria), kind="mergesort")]
+        if sum(len(r) for r in self._memoria) >= self.limite:
+            self._despejar()
+
+    def _despejar(self):
+        if self._tmp is None:
+            self._tmp = Path(tempfile.mkdtemp(prefix="hashes_", dir=self._dir_runs))
+        run = np.sort(np.concatenate(self._memoria), kind="mergesort")
+        path = self._tmp / f"run_{len(self._disco):04d}.npy"
+        np.save(path, run)
+        self._disco.append(np.load(path, mmap_mode="r"))
+        self._memoria = []
+
+    @property
+    def runs_disco(self) -> int:
+        return len(self._disco)
+
+    def fechar(self):
+        self._memoria, self._disco = [], []
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
+
+def _hash_distintos(unicos) -> np.ndarray:
+    # número sempre como float64: o mesmo "2" vira Int64 num chunk e Float64 em outro
+    if pd.api.types.is_numeric_dtype(unicos.dtype) and not pd.api.types.is_bool_dtype(unicos.dtype):
+        return pd.util.hash_array(np.asarray(unicos.to_numpy(dtype="float64")))
+    return pd.util.hash_array(np.asarray(unicos, dtype=object), categorize=False)
+
+def hash_linhas(df: pd.DataFrame, colunas=None) -> np.ndarray:
+    """Hash 64 bits por linha, estável entre chunks (depende só dos valores)."""
+    acc = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for c in (df.columns if colunas is None else colunas):
+            codigos, unicos = pd.factorize(df[c], use_na_sentinel=True)
+            acc = acc * _MULT ^ np.append(_hash_distintos(unicos), _HASH_NULO)[codigos]   # -1 (nulo) -> último
+    return acc
+
+def colunas_chave(df: pd.DataFrame) -> list[str] | None:
+    cols = [next((c for c in opcoes if c in df.columns), None) for opcoes in COLS_CHAVE]
+    return cols if all(cols) else None
+
+def _novos(h: np.ndarray, ja_vistos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """-> (repetido: visto antes ou repetido dentro do próprio chunk, hashes novos distintos)."""
+    repetido = ja_vistos | pd.Series(h).duplicated().to_numpy()
+    return repetido, np.unique(h[~repetido])
+
+@dataclass
+class DeduplicadorPedidos:
+    modo: str = "remover"
+    limite: int = LIMITE_MEMORIA
+    dir_runs: str | None = None
+    chunks: list = field(default_factory=list)       # estatística por chunk
+    amostras: list = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.modo not in MODOS:
+            raise ValueError(f"modo inválido: {self.modo} (use {', '.join(MODOS)})")
+        self.linhas = ConjuntoHashes(self.limite, self.dir_runs)
+        self.chaves = ConjuntoHashes(self.limite, self.dir_runs)
+
+    def processar(self, i: int, chunk: pd.DataFrame) -> pd.DataFrame:
+        if self.modo == "desligado" or chunk.empty:
+            return chunk
+        h = hash_linhas(chunk)
+        dup, novos = _novos(h, self.linhas.contem(h))
+        self.linhas.adicionar(novos)
+
+        cols = colunas_chave(chunk)
+        chave_dup = np.zeros(len(chunk), dtype=bool)
+        if cols:
+            k = hash_linhas(chunk, cols)
+            # só linhas não idênticas: a cópia exata já foi contada acima
+            rep, novas = _novos(k[~dup], self.chaves.contem(k[~dup]))
+            chave_dup[~dup] = rep
+            self.chaves.adicionar(novas)
+
+        self.chunks.append({"chunk": i, "linhas": len(chunk), "linhas_duplicadas": int(dup.sum()),
+                            "chaves_repetidas": int(chave_dup.sum()), "runs_disco": self.linhas.runs_disco})
+        self._amostrar(i, chunk, dup, "linha_duplicada", cols)
+        self._amostrar(i, chunk, chave_dup, "chave_duplicada", cols)
+
+        if self.modo == "marcar":
+            return chunk.assign(linha_duplicada=dup, chave_duplicada=chave_dup)
+        return chunk[~dup] if dup.any() else chunk
+
+    def _amostrar(self, i, chunk, mascara, tipo, cols):
+        falta = MAX_AMOSTRAS - sum(a["tipo"] == tipo for a in self.amostras)
+        for pos in np.flatnonzero(mascara)[: max(falta, 0)]:
+            linha = chunk.iloc[int(pos)]
+            self.amostras.append({"tipo": tipo, "chunk": i, "linha_no_chunk": int(pos),
+                                  **({c: linha[c] for c in cols} if cols else {})})
+
+    def resumo(self) -> pd.DataFrame:
+        return pd.DataFrame(self.chunks, columns=["chunk", "linhas", "linhas_duplicadas", "chaves_repetidas", "runs_disco"])
+
+    def salvar_relatorio(self, out_dir) -> list[Path]:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        saidas = [out_dir / "duplicatas_ingestao.csv", out_dir / "duplicatas_amostras.csv"]
+        self.resumo().to_csv(saidas[0], index=False, encoding="utf-8-sig")
+        pd.DataFrame(self.amostras).to_csv(saidas[1], index=False, encoding="utf-8-sig")
+        return saidas
+
+    def fechar(self):
+        self.linhas.fechar()
+        self.chaves.fechar()
@@ -1,39 +1,19 @@
 # src/eda_quick.py
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import matplotlib.pyplot as plt
-from unidecode import unidecode
-
-# ==================== MAPEAMENTOS ====================
-REGIOES_BRASIL_POR_UF = {
-    "AC":"Norte","AP":"Norte","AM":"Norte","PA":"Norte","RO":"Norte","RR":"Norte","TO":"Norte",
-    "AL":"Nordeste","BA":"Nordeste","CE":"Nordeste","MA":"Nordeste","PB":"Nordeste","PE":"Nordeste",
-    "PI":"Nordeste","RN":"Nordeste","SE":"Nordeste",
-    "DF":"Centro-Oeste","GO":"Centro-Oeste","MT":"Centro-Oeste","MS":"Centro-Oeste",
-    "ES":"Sudeste","MG":"Sudeste","RJ":"Sudeste","SP":"Sudeste",
-    "PR":"Sul","RS":"Sul","SC":"Sul",
-}
-
-UF_POR_ESTADO = {
-    "acre":"AC","amapa":"AP","amazonas":"AM","para":"PA","rondonia":"RO","roraima":"RR","tocantins":"TO",
-    "alagoas":"AL","bahia":"BA","ceara":"CE","maranhao":"MA","paraiba":"PB","pernambuco":"PE",
-    "piaui":"PI","rio grande do norte":"RN","sergipe":"SE",
-    "distrito federal":"DF","goias":"GO","mato grosso":"MT","mato grosso do sul":"MS",
-    "espirito santo":"ES","minas gerais":"MG","rio de janeiro":"RJ","sao paulo":"SP",
-    "parana":"PR","rio grande do sul":"RS","santa catarina":"SC",
-}
-
-REGIOES_POR_PAIS = {
-    "Brazil": "LATAM", "Brasil": "LATAM",
-    "Argentina": "LATAM", "United States": "NA", "Germany": "EMEA"
-}
 
-# ==================== HELPERS ====================
-def _nome_to_uf(nome):
-    if pd.isna(nome): return pd.NA
-    key = unidecode(str(nome)).strip().lower()
-    return UF_POR_ESTADO.get(key, pd.NA)
+from conversao_numerica import normalizar_medida
+from export_stream import listar_parquets
+from instrumentacao import etapa, iniciar, lotes
+from kpi_mensal import kpi_mensal_parquet, salvar_kpis
+from perfil_colunar import perfilar_parquet, para_dataframe
+from regioes import nome_para_uf, derivar_regiao_pais
 
+# ==================== HELPERS ====================
 def rename_truncated_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Normaliza colunas comuns com nomes truncados/variações."""
     ren = {}
@@ -63,7 +43,7 @@ def rename_truncated_columns(df: pd.DataFrame) -> pd.DataFrame:
         if found and found != std:
             ren[found] = std
     if ren:
-        df = df.rename(columns=ren)
+        df.rename(columns=ren, inplace=True)
     return df
 
 def enriquecer_para_mapas_e_dimensoes(
@@ -78,11 +58,16 @@ def enriquecer_para_mapas_e_dimensoes(
     col_valor_comissao="valor_comissao",
     col_lucro_liquido="lucro_liquido",
 ) -> pd.DataFrame:
-    df = df.copy()
-
-    # Garante dimensões mínimas
-    for c in [col_resp, col_cd, col_cod_pedido]:
-        if c and c not in df.columns:
+    """Enriquece o DataFrame IN-PLACE (sem cópia da base) e o devolve.
+    regiao_pais é derivada de forma vetorizada (regioes.derivar_regiao_pais), com o mesmo
+    mapa de países do prepare_data (sem diferenciar maiúsculas; Chile/Uruguai -> LATAM,
+    EUA/USA -> NA), e não mais o mapa curto que só o eda_quick usava."""
+    # nomes finais de cada dimensão
+    finais = {col_resp: "responsavelpedido", col_cd: "centro_distribuicao", col_cod_pedido: "Cod_pedido"}
+
+    # Garante dimensões mínimas (sem duplicar quando a coluna já veio com o nome final)
+    for c, final in finais.items():
+        if c and c not in df.columns and final not in df.columns:
             df[c] = pd.NA
 
     # Detecta UF a partir do nome do estado, se necessário
@@ -90,26 +75,18 @@ def enriquecer_para_mapas_e_dimensoes(
     if col_uf and col_uf in df.columns:
         uf_col = col_uf
     elif col_estado_nome and col_estado_nome in df.columns:
-        df["_uf_tmp_"] = df[col_estado_nome].apply(_nome_to_uf)
+        df["_uf_tmp_"] = nome_para_uf(df[col_estado_nome])
         uf_col = "_uf_tmp_"
 
     # === regiao_pais ===
-    def _derive_regiao(row):
-        pais = row.get(col_pais)
-        uf   = row.get(uf_col) if uf_col else None
-        if pais and str(pais).strip().lower() in ["brazil","brasil"]:
-            if pd.notna(uf):
-                return REGIOES_BRASIL_POR_UF.get(str(uf).upper(), "Brasil - Desconhecida")
-            return "Brasil - N/A"
-        if pais and pd.notna(pais):
-            return REGIOES_POR_PAIS.get(str(pais), "Outras Regiões")
-        # Se país não vier mas tivermos UF, assumir Brasil
-        if uf and pd.notna(uf):
-            return REGIOES_BRASIL_POR_UF.get(str(uf).upper(), "Brasil - Desconhecida")
-        return "N/A"
-
+    # Se país não vier mas tivermos UF, assumir Brasil
     if (col_pais in df.columns) or uf_col:
-        df["regiao_pais"] = df.apply(_derive_regiao, axis=1)
+        df["regiao_pais"] = derivar_regiao_pais(
+            df.index,
+            pais=df[col_pais] if col_pais in df.columns else None,
+            uf=df[uf_col] if uf_col else None,
+            assumir_brasil_sem_pais=True,
+        )
     else:
         df["regiao_pais"] = "N/A"
 
@@ -125,14 +102,13 @@ def enriquecer_para_mapas_e_dimensoes(
         if "estado" not in df.columns:
             df["estado"] = pd.NA
 
-    # Renomeia padrões finais
+    # Renomeia padrões finais (in-place; ignora quando o nome final já existe)
     rename_final = {}
-    if col_resp in df.columns:            rename_final[col_resp] = "responsavelpedido"
-    if col_cd in df.columns:              rename_final[col_cd] = "centro_distribuicao"
-    if col_cod_pedido in df.columns:      rename_final[col_cod_pedido] = "Cod_pedido"
-    if col_valor_comissao in df.columns:  rename_final[col_valor_comissao] = "valor_comissao"
-    if col_lucro_liquido in df.columns:   rename_final[col_lucro_liquido] = "lucro_liquido"
-    df = df.rename(columns=rename_final)
+    for c, final in [*finais.items(), (col_valor_comissao, "valor_comissao"), (col_lucro_liquido, "lucro_liquido")]:
+        if c in df.columns and c != final and final not in df.columns:
+            rename_final[c] = final
+    if rename_final:
+        df.rename(columns=rename_final, inplace=True)
 
     # Tipagens
     for c in ["regiao_pais","estado","responsavelpedido","centro_distribuicao","Cod_pedido"]:
@@ -145,173 +121,183 @@ def enriquecer_para_mapas_e_dimensoes(
             except: pass
 
     if "_uf_tmp_" in df.columns:
-        df = df.drop(columns="_uf_tmp_")
+        df.drop(columns="_uf_tmp_", inplace=True)
 
     return df
 
 # ==================== PATHS ====================
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
+ENRIQ_DIR = DATA_DIR / "enriquecido"
 PROC_DIR = DATA_DIR / "processed"
 SAMP_DIR = DATA_DIR / "sample"
+LOTE_LINHAS = 256_000   # linhas por lote lido/enriquecido/gravado
+
+iniciar("eda_quick")
 
 # ==================== LOAD ====================
-files = list(PROC_DIR.glob("*.parquet"))
+# Uma entrada só: o fato enriquecido; sem ele, as partições do processed/ (nunca o
+# combinado junto com as partes, que somaria as mesmas vendas mais de uma vez)
+files = listar_parquets(ENRIQ_DIR) or listar_parquets(PROC_DIR)
 if not files:
-    print("[WARN] Nenhum dado em processed/, usando sample/")
-    files = list(SAMP_DIR.glob("*.parquet"))
+    print("[WARN] Nenhum dado em enriquecido/ ou processed/, usando sample/")
+    files = listar_parquets(SAMP_DIR)
 if not files:
-    raise FileNotFoundError("Nenhum .parquet em processed/ ou sample/.")
-
-print(f"[INFO] Lendo {len(files)} arquivo(s)...")
-df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    raise FileNotFoundError("Nenhum .parquet em enriquecido/, processed/ ou sample/.")
 
-# Normaliza cabeçalhos “truncados”
-df = rename_truncated_columns(df)
-
-# ==================== ENRIQUECIMENTO ====================
-df = enriquecer_para_mapas_e_dimensoes(
-    df,
-    col_pais="pais",
-    col_uf="uf",                     # se não houver, ele tenta col_estado_nome
-    col_estado_nome="estado_nome",   # será ignorado se não existir
-    col_resp="responsavelpedido",
-    col_cd="centro_distribuicao",
-    col_cod_pedido="cod_pedido",
-    col_valor_comissao="valor_comissao",
-    col_lucro_liquido="lucro_liquido",
-)
+print(f"[INFO] Lendo {len(files)} arquivo(s) em lotes de {LOTE_LINHAS:,} linhas...")
+dataset = ds.dataset([str(f) for f in files], format="parquet")
 
-# Salva parquet enriquecido
-ENR_DIR = DATA_DIR / "processed_enriched"
-ENR_DIR.mkdir(parents=True, exist_ok=True)
-out_parquet = ENR_DIR / "dataset_enriquecido.parquet"
-df.to_parquet(out_parquet, engine="pyarrow", index=False, compression="snappy")
-print(f"[OK] Parquet enriquecido salvo em: {out_parquet}")
-
-# ==================== APRESENTAÇÃO ====================
+# ==================== ENRIQUECIMENTO (LOTE A LOTE) ====================
+DIMENSOES_TEXTO = ["regiao_pais", "estado", "responsavelpedido", "centro_distribuicao", "Cod_pedido"]
+MEDIDAS = ["valor_comissao", "lucro_liquido", "valor_total"]
 CAMPOS_CHAVE = [
     "regiao_pais","estado","responsavelpedido","centro_distribuicao",
     "Cod_pedido","valor_comissao","lucro_liquido",
 ]
-presentes = [c for c in CAMPOS_CHAVE if c in df.columns]
-faltando   = [c for c in CAMPOS_CHAVE if c not in df.columns]
+TAM_AMOSTRA = 500
+
+def enriquecer_lote(df: pd.DataFrame) -> pd.DataFrame:
+    # Normaliza cabeçalhos “truncados” e enriquece (in-place)
+    df = rename_truncated_columns(df)
+    return enriquecer_para_mapas_e_dimensoes(
+        df,
+        col_pais="pais",
+        col_uf="uf",                     # se não houver, ele tenta col_estado_nome
+        col_estado_nome="estado_nome",   # será ignorado se não existir
+        col_resp="responsavelpedido",
+        col_cd="centro_distribuicao",
+        col_cod_pedido="cod_pedido",
+        col_valor_comissao="valor_comissao",
+        col_lucro_liquido="lucro_liquido",
+    )
+
+def schema_saida(tabela: pa.Table) -> pa.Schema:
+    """Schema do parquet enriquecido, fixado no 1º lote: colunas que passam direto
+    mantêm o tipo do Parquet de origem (senão um lote com nulos viraria float64 e
+    outro int64); dimensões são texto e medidas float64 (float32 do esquema tipado
+    continua float32)."""
+    nomes = rename_truncated_columns(pd.DataFrame(columns=dataset.schema.names)).columns
+    origem = dict(zip(nomes, dataset.schema))
+    campos = []
+    for f in tabela.schema:
+        if f.name in DIMENSOES_TEXTO:
+            tipo = pa.large_string() if pa.types.is_null(f.type) else f.type
+        elif f.name in MEDIDAS:
+            tipo = f.type if pa.types.is_float32(f.type) else pa.float64()
+        else:
+            tipo = origem[f.name].type if f.name in origem else f.type
+        campos.append(pa.field(f.name, tipo))
+    return pa.schema(campos, metadata=tabela.schema.metadata)   # dtypes do pandas na releitura
 
-print("\n[APRESENTAÇÃO] Campos-chave esperados:")
-print(" - Encontrados :", presentes)
-print(" - Faltando    :", faltando if faltando else "Nenhum")
+ENR_DIR = DATA_DIR / "processed_enriched"
+ENR_DIR.mkdir(parents=True, exist_ok=True)
+out_parquet = ENR_DIR / "dataset_enriquecido.parquet"
+out_campos_csv = ENR_DIR / "dataset_campos_chave.csv"
 
-if presentes:
-    print("\n[PREVIEW] Top 10 linhas dos campos-chave:")
-    print(df[presentes].head(10).to_string(index=False))
+# Uma varredura: cada lote é enriquecido e já sai para o parquet, o CSV de campos-chave,
+# os somatórios e a amostra; memória ~ um lote, não a base inteira
+writer = schema_parquet = None
+presentes = []
+somas: dict[str, float] = {}
+amostra: list[pd.DataFrame] = []
+n_amostra = 0
+try:
+    for batch in lotes(dataset.to_batches(batch_size=LOTE_LINHAS), "ler_parquet"):
+        with etapa("enriquecer", entrada=batch.num_rows):
+            df = enriquecer_lote(batch.to_pandas())
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+        primeiro = writer is None
+        if primeiro:
+            schema_parquet = schema_saida(tabela)
+            writer = pq.ParquetWriter(out_parquet, schema_parquet, compression="snappy")
+
+            # ==================== APRESENTAÇÃO ====================
+            presentes = [c for c in CAMPOS_CHAVE if c in df.columns]
+            faltando   = [c for c in CAMPOS_CHAVE if c not in df.columns]
+            print("\n[APRESENTAÇÃO] Campos-chave esperados:")
+            print(" - Encontrados :", presentes)
+            print(" - Faltando    :", faltando if faltando else "Nenhum")
+            if presentes:
+                print("\n[PREVIEW] Top 10 linhas dos campos-chave:")
+                print(df[presentes].head(10).to_string(index=False))
+
+        with etapa("gravar_parquet", entrada=len(df)):
+            writer.write_table(tabela.cast(schema_parquet))
+            if presentes:
+                df[presentes].to_csv(out_campos_csv, mode="w" if primeiro else "a", header=primeiro,
+                                     index=False, encoding="utf-8-sig" if primeiro else "utf-8")
+
+        for m in ["valor_comissao","lucro_liquido"]:
+            if m in df.columns:
+                somas[m] = somas.get(m, 0.0) + float(normalizar_medida(pd.to_numeric(df[m], errors="coerce")).sum())
+        if n_amostra < TAM_AMOSTRA:
+            amostra.append(df.head(TAM_AMOSTRA - n_amostra))
+            n_amostra += len(amostra[-1])
+finally:
+    if writer is not None:
+        writer.close()
+if writer is None:
+    raise ValueError(f"Nenhuma linha para enriquecer em: {[str(f) for f in files]}")
 
-out_campos_csv = ENR_DIR / "dataset_campos_chave.csv"
+print(f"[OK] Parquet enriquecido salvo em: {out_parquet}")
 if presentes:
-    df[presentes].to_csv(out_campos_csv, index=False, encoding="utf-8-sig")
     print(f"[OK] CSV de campos-chave salvo em: {out_campos_csv}")
 
+# Perfil de todas as colunas em uma única passada (row groups do parquet salvo).
+# Aproximado (sketch KMV + top-k limitado): memória não cresce com as linhas; só as
+# dimensões de baixa cardinalidade impressas abaixo têm contagem exata
+DIMS_CONTAGEM = ["regiao_pais", "estado", "responsavelpedido", "centro_distribuicao"]
+with etapa("perfil_colunas"):
+    perfis = perfilar_parquet(out_parquet, modo="aproximado", exatas=DIMS_CONTAGEM)
+
 def _print_contagem(col):
-    if col in df.columns:
-        nun = df[col].nunique(dropna=True)
-        top = df[col].value_counts(dropna=True).head(5).to_string()
-        print(f"\n[DIM] {col} — distintos: {nun}\nTOP 5:\n{top}")
+    if col in perfis:
+        p = perfis[col]
+        top = pd.Series(dict(p.top(5)), name="count").to_string()
+        print(f"\n[DIM] {col} — distintos: {p.n_distintos}\nTOP 5:\n{top}")
 
-for dim in ["regiao_pais","estado","responsavelpedido","centro_distribuicao"]:
+for dim in DIMS_CONTAGEM:
     _print_contagem(dim)
 
-somas = {}
-for m in ["valor_comissao","lucro_liquido"]:
-    if m in df.columns:
-        somas[m] = float(pd.to_numeric(df[m], errors="coerce").sum())
 if somas:
     print("\n[MÉTRICAS] Somatórios numéricos dos campos-chave:")
     for k, v in somas.items():
         print(f" - {k}: {v:,.2f}")
 
 # ==================== KPIs MENSAIS (ROBUSTO) ====================
-# Detecta coluna de data
-date_candidates = [c for c in ["date","data","data_pedido"] if c in df.columns]
-if date_candidates:
-    date_col = date_candidates[0]
-    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-        df[date_col] = pd.to_datetime(df[date_col], errors="coerce", dayfirst=True)
-    df["yyyymm"] = df[date_col].dt.to_period("M").astype(str)
-else:
-    df["yyyymm"] = "N/A"
-
-# revenue
-if "revenue" not in df.columns:
-    if "valor_total" in df.columns:
-        df["revenue"] = pd.to_numeric(df["valor_total"], errors="coerce")
-    elif all(c in df.columns for c in ["preco_unitario","quantidade"]):
-        df["revenue"] = (
-            pd.to_numeric(df["preco_unitario"], errors="coerce") *
-            pd.to_numeric(df["quantidade"], errors="coerce")
-        )
-    elif "lucro_liquido" in df.columns:
-        df["revenue"] = pd.to_numeric(df["lucro_liquido"], errors="coerce")
-    else:
-        df["revenue"] = pd.NA
-
-# agg
-agg_dict = {"revenue": ("revenue","sum")}
-if "Cod_pedido" in df.columns:
-    agg_dict["orders"] = ("Cod_pedido","nunique")
-else:
-    df["_ones_"] = 1
-    agg_dict["orders"] = ("_ones_","sum")
-
-if "valor_comissao" in df.columns:
-    agg_dict["valor_comissao"] = ("valor_comissao","sum")
-if "lucro_liquido" in df.columns:
-    agg_dict["lucro_liquido"] = ("lucro_liquido","sum")
-
-kpi = df.groupby("yyyymm", as_index=False).agg(**agg_dict)
-kpi["ticket_medio"] = kpi["revenue"] / kpi["orders"].clip(lower=1)
+# Streaming sobre o parquet enriquecido: só as colunas necessárias, lote a lote
+# (somas correntes + pedidos distintos por mês; ver kpi_mensal.py)
+with etapa("kpi_mensal"):
+    kpi = kpi_mensal_parquet(out_parquet, dayfirst=True)
 
 print("\n[KPIs - últimos 6 meses]")
 print(kpi.tail(6))
 
-# Outliers
-q1 = kpi["revenue"].quantile(0.25)
-q3 = kpi["revenue"].quantile(0.75)
-iqr = q3 - q1
-limite_sup = q3 + 1.5 * iqr
-outliers = kpi[kpi["revenue"] > limite_sup].copy()
-meses_zero = kpi[kpi["revenue"].fillna(0) == 0].copy()
+# Outliers (IQR) e meses zerados — gravados junto com o KPI mensal
+OUT_DIR = DATA_DIR / "audit"
+outliers, meses_zero = salvar_kpis(kpi, OUT_DIR)
 
 print("\n[OUTLIERS] Meses com receita acima do padrão (IQR):")
 print(outliers if not outliers.empty else "Nenhum.")
 print("\n[ALERTA] Meses com receita zero:")
 print(meses_zero if not meses_zero.empty else "Nenhum.")
 
-OUT_DIR = DATA_DIR / "audit"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
-kpi.to_csv(OUT_DIR / "kpi_mensal.csv", index=False)
-outliers.to_csv(OUT_DIR / "kpi_outliers.csv", index=False)
-meses_zero.to_csv(OUT_DIR / "kpi_receita_zero.csv", index=False)
 print(f"\n[OK] Arquivos salvos em: {OUT_DIR}")
 
 # ==================== EXPORTS ====================
-preview_csv = ENR_DIR / "dataset_enriquecido_preview.csv"
+# CSV completo não é mais gravado aqui (base inteira); gere sob demanda a partir do Parquet:
+#   python src/export_stream.py --input data/processed_enriched/dataset_enriquecido.parquet --out <arquivo.csv>
 schema_csv  = ENR_DIR / "dataset_enriquecido_schema.csv"
 sample_csv  = ENR_DIR / "dataset_enriquecido_sample_500.csv"
 
 print(f"[INFO] Exportando CSVs de análise em: {ENR_DIR}")
-df.to_csv(preview_csv, index=False, encoding="utf-8-sig")
-df.head(500).to_csv(sample_csv, index=False, encoding="utf-8-sig")
-
-schema = (
-    pd.DataFrame({
-        "coluna": df.columns,
-        "dtype": [str(df[c].dtype) for c in df.columns],
-        "n_nulos": [int(df[c].isna().sum()) for c in df.columns],
-        "n_distintos": [int(df[c].nunique(dropna=True)) for c in df.columns],
-        "exemplo": [df[c].dropna().iloc[0] if df[c].notna().any() else "" for c in df.columns],
-    })
-    .sort_values("coluna")
-)
+pd.concat(amostra, ignore_index=True).to_csv(sample_csv, index=False, encoding="utf-8-sig")
+
+# perfil já calculado sobre o parquet enriquecido (nulos, distintos, exemplo, min/max, top-5)
+schema = para_dataframe(perfis)
 schema.to_csv(schema_csv, index=False, encoding="utf-8-sig")
-print(f"[OK] CSV completo: {preview_csv}")
+print(f"[INFO] CSV completo sob demanda: python src/export_stream.py --input {out_parquet} --out <arquivo.csv>")
 print(f"[OK] Amostra 500:  {sample_csv}")
 print(f"[OK] Estrutura:    {schema_csv}")
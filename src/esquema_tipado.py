@@ -0,0 +1,186 @@
+# src/esquema_tipado.py
+import os
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from conversao_numerica import numero
+
+# ==============================================
+# Esquema tipado das partições (etapa final do prepare_data.py)
+# - o CSV é lido com dtype=str: valor, comissão, lucro e cod_pedido chegavam ao
+#   Parquet como texto e cada leitor (eda, KPIs, dashboard) reconvertia a cada carga
+# - ESQUEMA declara o papel de cada coluna:
+#     moeda      -> float32 se todo valor tem até 2 casas e |x| < 131.072 (abaixo disso
+#                   o float32 distingue centavos: arredondar o float64 a 2 casas devolve
+#                   o valor exato); senão float64. int64 em centavos ocuparia os mesmos
+#                   8 bytes do float64 -> não compensa
+#     quantidade -> menor inteiro que cabe (Int8/Int16/Int32); fracionária -> como moeda
+#     id         -> Int32/Int64 se todos são dígitos sem zero à esquerda; senão texto
+# - 2 passadas: (1) perfil de TODAS as partes (só as colunas do esquema, em Arrow)
+#   -> um tipo por coluna, igual em todas as partes; (2) cada parte convertida e
+#   regravada + parquet combinado gravado parte a parte (ParquetWriter)
+# - relatório por coluna: memória pandas / Arrow e bytes no Parquet, antes x depois
+# - leitores somam com conversao_numerica.normalizar_medida(): float32 -> float64 exato, IntN -> Int64
+#
+# Uso:
+#   tipos, relatorio = tipar_partes(partes, PROC / "vendas_completo.parquet")
+# ==============================================
+
+ESQUEMA = {
+    "valor": "moeda",
+    "valor_total_bruto": "moeda",
+    "valor_comissao": "moeda",
+    "lucro_liquido": "moeda",
+    "quantidade": "quantidade",
+    "cod_pedido": "id",
+}
+LIMITE_FLOAT32 = 131_072          # 2**17: acima, o espaçamento do float32 passa de 1 centavo
+LOTE_LINHAS = 256_000
+_RE_ID = r"^(0|[1-9]\d{0,17})$"
+_INTEIROS = [("Int8", np.int8), ("Int16", np.int16), ("Int32", np.int32), ("Int64", np.int64)]
+
+def _menor_inteiro(minimo, maximo) -> str:
+    return next(nome for nome, t in _INTEIROS if np.iinfo(t).min <= minimo and maximo <= np.iinfo(t).max)
+
+@dataclass
+class PerfilColuna:
+    """O que a 1ª passada sabe de uma coluna depois de ver todas as partes."""
+    papel: str
+    tipo_antes: str = ""
+    invalidos: int = 0          # texto preenchido que não vira número (vai a nulo)
+    centavos: bool = True
+    inteiro: bool = True
+    id_ok: bool = True
+    minimo: float = np.inf
+    maximo: float = -np.inf
+
+    def consumir(self, arr):
+        self.tipo_antes = self.tipo_antes or str(arr.type)
+        if self.papel == "id":
+            self._consumir_id(arr)
+            return
+        x = numero(arr).to_numpy(zero_copy_only=False)
+        ok = ~np.isnan(x)
+        if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+            preenchido = pc.fill_null(pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(arr)), 0), False)
+            self.invalidos += int((preenchido.to_numpy(zero_copy_only=False) & ~ok).sum())
+        v = x[ok]
+        if len(v):
+            cent = v * 100
+            self.centavos &= bool(np.all(np.abs(cent - np.round(cent)) < 1e-6))
+            self.inteiro &= bool(np.all(v == np.floor(v)))
+            self.minimo, self.maximo = min(self.minimo, v.min()), max(self.maximo, v.max())
+
+    def _consumir_id(self, arr):
+        if pa.types.is_integer(arr.type):
+            v = arr.drop_null().to_numpy()
+        else:
+            txt = pc.utf8_trim_whitespace(pc.cast(arr, pa.string()) if pa.types.is_null(arr.type) else arr)
+            preenchido = pc.fill_null(pc.greater(pc.utf8_length(txt), 0), False)
+            casou = pc.fill_null(pc.match_substring_regex(txt, _RE_ID), False)
+            if pc.any(pc.and_(preenchido, pc.invert(casou))).as_py():
+                self.id_ok = False
+                return
+            v = pc.cast(pc.filter(txt, casou), pa.int64()).to_numpy()
+        if len(v):
+            self.minimo, self.maximo = min(self.minimo, v.min()), max(self.maximo, v.max())
+
+    def decidir(self) -> str | None:
+        """Tipo pandas de destino (None = mantém a coluna como está)."""
+        vazio = self.minimo > self.maximo
+        if self.papel == "id":
+            if not self.id_ok or vazio:
+                return None
+            return "Int32" if _menor_inteiro(self.minimo, self.maximo) in ("Int8", "Int16", "Int32") else "Int64"
+        if self.papel == "quantidade" and self.inteiro:
+            return "Int8" if vazio else _menor_inteiro(self.minimo, self.maximo)
+        if vazio:
+            return "float32"
+        return "float32" if self.centavos and max(abs(self.minimo), abs(self.maximo)) < LIMITE_FLOAT32 else "float64"
+
+def converter(arr, papel: str, tipo: str) -> pd.Series:
+    """Coluna Arrow -> Series pandas no tipo decidido (texto inválido -> nulo)."""
+    if papel == "id" and not pa.types.is_integer(arr.type):
+        txt = pc.utf8_trim_whitespace(arr)
+        arr = pc.if_else(pc.fill_null(pc.match_substring_regex(txt, _RE_ID), False), txt, pa.scalar(None, txt.type))
+    x = pc.cast(arr, pa.int64()) if papel == "id" else numero(arr)
+    if tipo.startswith("Int"):
+        nulo = pc.is_null(x).to_numpy(zero_copy_only=False)
+        valores = pc.fill_null(x, 0).to_numpy(zero_copy_only=False).astype(dict(_INTEIROS)[tipo])
+        return pd.Series(pd.arrays.IntegerArray(valores, nulo))
+    return pd.Series(x.to_numpy(zero_copy_only=False).astype(tipo))
+
+def _bytes_parquet(meta) -> Counter:
+    tam = Counter()
+    for i in range(meta.num_row_groups):
+        rg = meta.row_group(i)
+        for j in range(rg.num_columns):
+            tam[rg.column(j).path_in_schema] += rg.column(j).total_compressed_size
+    return tam
+
+def perfilar(partes, esquema=ESQUEMA) -> dict[str, PerfilColuna]:
+    nomes = pq.ParquetFile(partes[0]).schema_arrow.names
+    perfis = {c: PerfilColuna(papel) for c, papel in esquema.items() if c in nomes}
+    for p in partes:
+        for batch in pq.ParquetFile(p).iter_batches(batch_size=LOTE_LINHAS, columns=list(perfis)):
+            for c, perfil in perfis.items():
+                perfil.consumir(batch.column(c))
+    return perfis
+
+def tipar_partes(partes, combinado, esquema=ESQUEMA) -> tuple[dict, pd.DataFrame]:
+    """Converte as partes no lugar e grava o parquet combinado.
+    -> ({coluna: tipo}, relatório de memória por coluna)."""
+    partes = [Path(p) for p in partes]
+    perfis = perfilar(partes, esquema)
+    tipos = {c: t for c, p in perfis.items() if (t := p.decidir())}
+
+    medidas = {c: Counter() for c in tipos}
+    writer = None
+    try:
+        for p in partes:
+            tab = pq.read_table(p)
+            if tipos:
+                df = tab.to_pandas()
+                antes = _bytes_parquet(pq.ParquetFile(p).metadata)
+                for c, t in tipos.items():
+                    m = medidas[c]
+                    m["pandas_antes"] += df[c].memory_usage(deep=True, index=False)
+                    m["arrow_antes"] += tab.column(c).nbytes
+                    m["parquet_antes"] += antes[c]
+                    df[c] = converter(tab.column(c), perfis[c].papel, t).set_axis(df.index)
+                    m["pandas_depois"] += df[c].memory_usage(deep=True, index=False)
+                tab = pa.Table.from_pandas(df, preserve_index=False)
+                tmp = p.with_suffix(".tmp")
+                pq.write_table(tab, tmp)
+                depois = _bytes_parquet(pq.ParquetFile(tmp).metadata)
+                os.replace(tmp, p)
+                for c in tipos:
+                    medidas[c]["arrow_depois"] += tab.column(c).nbytes
+                    medidas[c]["parquet_depois"] += depois[c]
+            if writer is None:
+                writer = pq.ParquetWriter(combinado, tab.schema)
+            writer.write_table(tab.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    mb = lambda b: round(b / 1e6, 3)
+    linhas = []
+    for c, t in tipos.items():
+        m = medidas[c]
+        linhas.append({
+            "coluna": c, "papel": perfis[c].papel, "tipo_antes": perfis[c].tipo_antes, "tipo_depois": t,
+            "invalidos": perfis[c].invalidos,
+            "pandas_antes_mb": mb(m["pandas_antes"]), "pandas_depois_mb": mb(m["pandas_depois"]),
+            "arrow_antes_mb": mb(m["arrow_antes"]), "arrow_depois_mb": mb(m["arrow_depois"]),
+            "parquet_antes_mb": mb(m["parquet_antes"]), "parquet_depois_mb": mb(m["parquet_depois"]),
+            "economia_pandas_pct": round(100 * (1 - m["pandas_depois"] / m["pandas_antes"]), 1) if m["pandas_antes"] else None,
+        })
+    return tipos, pd.DataFrame(linhas)
@@ -0,0 +1,194 @@
+# src/esteira.py
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+# ==============================================
+# Esteira ler -> transformar -> gravar com filas limitadas
+# - uma thread leitora busca os próximos lotes (prefetch) enquanto o lote atual é transformado
+# - N threads gravadoras drenam as gravações (parquet, amostras) em paralelo
+# - filas com tamanho máximo = contrapressão: no máximo
+#   prefetch + 1 + fila_gravacao + gravadores lotes em memória ao mesmo tempo
+# - por etapa: tempo trabalhando, "faminta" (esperando entrada) e "bloqueada"
+#   (esperando espaço na fila seguinte) -> mostra qual etapa dimensionar
+#
+# Uso:
+#   stats, saidas = executar_esteira(reader, transformar, gravar, prefetch=2, gravadores=2)
+#   print(formatar_estatisticas(stats))
+# gravadores=0 executa tudo em sequência na thread atual (mesmo código, sem overlap).
+# ==============================================
+
+_FIM = object()
+
+@dataclass
+class EstatisticaEtapa:
+    nome: str
+    threads: int = 1
+    itens: int = 0
+    trabalho_s: float = 0.0
+    faminta_s: float = 0.0
+    bloqueada_s: float = 0.0
+    _trava: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def somar(self, trabalho=0.0, faminta=0.0, bloqueada=0.0, itens=0):
+        with self._trava:
+            self.trabalho_s += trabalho
+            self.faminta_s += faminta
+            self.bloqueada_s += bloqueada
+            self.itens += itens
+
+    def como_dict(self) -> dict:
+        return {"etapa": self.nome, "threads": self.threads, "itens": self.itens,
+                "trabalho_s": round(self.trabalho_s, 4), "faminta_s": round(self.faminta_s, 4),
+                "bloqueada_s": round(self.bloqueada_s, 4)}
+
+class _Cancelada(Exception):
+    pass
+
+class _Controle:
+    """Erro de qualquer thread cancela as demais (as esperas em fila acordam periodicamente)."""
+
+    def __init__(self):
+        self.erro: BaseException | None = None
+        self.parar = threading.Event()
+
+    def falhar(self, e: BaseException):
+        if self.erro is None:
+            self.erro = e
+        self.parar.set()
+
+    def put(self, fila: queue.Queue, item) -> float:
+        t0 = time.perf_counter()
+        while True:
+            if self.parar.is_set():
+                raise _Cancelada
+            try:
+                fila.put(item, timeout=0.1)
+                return time.perf_counter() - t0
+            except queue.Full:
+                continue
+
+    def get(self, fila: queue.Queue):
+        t0 = time.perf_counter()
+        while True:
+            if self.parar.is_set():
+                raise _Cancelada
+            try:
+                return fila.get(timeout=0.1), time.perf_counter() - t0
+            except queue.Empty:
+                continue
+
+def _sequencial(fonte, transformar, gravar, stats) -> list:
+    ler, trans, grav = stats
+    saidas = []
+    it = iter(fonte)
+    i = 0
+    while True:
+        t0 = time.perf_counter()
+        lote = next(it, _FIM)
+        ler.somar(trabalho=time.perf_counter() - t0, itens=lote is not _FIM)
+        if lote is _FIM:
+            return saidas
+        i += 1
+        t0 = time.perf_counter()
+        lote = transformar(i, lote)
+        trans.somar(trabalho=time.perf_counter() - t0, itens=1)
+        t0 = time.perf_counter()
+        saidas.append((i, gravar(i, lote)))
+        grav.somar(trabalho=time.perf_counter() - t0, itens=1)
+
+def executar_esteira(fonte, transformar, gravar, prefetch: int = 2, fila_gravacao: int = 2,
+                     gravadores: int = 2) -> tuple[list[EstatisticaEtapa], list]:
+    """fonte: iterável de lotes; transformar(i, lote) -> lote (thread atual);
+    gravar(i, lote) -> resultado (threads gravadoras). Índices começam em 1.
+    Retorna (estatísticas [ler, transformar, gravar], [(i, resultado)] em ordem de i)."""
+    ler = EstatisticaEtapa("ler")
+    trans = EstatisticaEtapa("transformar")
+    grav = EstatisticaEtapa("gravar", threads=max(gravadores, 1))
+    stats = [ler, trans, grav]
+    if gravadores <= 0:
+        return stats, _sequencial(fonte, transformar, gravar, stats)
+
+    ctl = _Controle()
+    fila_lida: queue.Queue = queue.Queue(maxsize=max(prefetch, 1))
+    fila_grav: queue.Queue = queue.Queue(maxsize=max(fila_gravacao, 1))
+    saidas: list = []
+    trava_saidas = threading.Lock()
+
+    def _leitor():
+        try:
+            it = iter(fonte)
+            i = 0
+            while True:
+                t0 = time.perf_counter()
+                lote = next(it, _FIM)
+                ler.somar(trabalho=time.perf_counter() - t0)
+                if lote is _FIM:
+                    break
+                i += 1
+                ler.somar(bloqueada=ctl.put(fila_lida, (i, lote)), itens=1)
+            ctl.put(fila_lida, _FIM)
+        except _Cancelada:
+            pass
+        except BaseException as e:
+            ctl.falhar(e)
+
+    def _gravador():
+        try:
+            while True:
+                item, espera = ctl.get(fila_grav)
+                grav.somar(faminta=espera)
+                if item is _FIM:
+                    ctl.put(fila_grav, _FIM)   # repassa o fim para as outras gravadoras
+                    return
+                i, lote = item
+                t0 = time.perf_counter()
+                r = gravar(i, lote)
+                grav.somar(trabalho=time.perf_counter() - t0, itens=1)
+                with trava_saidas:
+                    saidas.append((i, r))
+        except _Cancelada:
+            pass
+        except BaseException as e:
+            ctl.falhar(e)
+
+    threads = [threading.Thread(target=_leitor, name="esteira-ler", daemon=True)]
+    threads += [threading.Thread(target=_gravador, name=f"esteira-gravar-{k}", daemon=True)
+                for k in range(gravadores)]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item, espera = ctl.get(fila_lida)
+            trans.somar(faminta=espera)
+            if item is _FIM:
+                ctl.put(fila_grav, _FIM)
+                break
+            i, lote = item
+            t0 = time.perf_counter()
+            lote = transformar(i, lote)
+            trans.somar(trabalho=time.perf_counter() - t0, itens=1)
+            trans.somar(bloqueada=ctl.put(fila_grav, (i, lote)))
+    except _Cancelada:
+        pass
+    except BaseException as e:
+        ctl.falhar(e)
+    finally:
+        for t in threads:
+            t.join()
+
+    if ctl.erro is not None:
+        raise ctl.erro
+    return stats, sorted(saidas, key=lambda s: s[0])
+
+def formatar_estatisticas(stats: list[EstatisticaEtapa], parede_s: float | None = None) -> str:
+    linhas = [f"{'etapa':<12} {'threads':>7} {'itens':>6} {'trabalho(s)':>12} {'faminta(s)':>11} {'bloqueada(s)':>13}"]
+    for s in stats:
+        linhas.append(f"{s.nome:<12} {s.threads:>7} {s.itens:>6} {s.trabalho_s:>12.3f} "
+                      f"{s.faminta_s:>11.3f} {s.bloqueada_s:>13.3f}")
+    gargalo = max(stats, key=lambda s: s.trabalho_s / max(s.threads, 1))
+    extra = f" | parede {parede_s:.2f}s vs. soma do trabalho {sum(s.trabalho_s for s in stats):.2f}s" if parede_s else ""
+    linhas.append(f"gargalo provável: {gargalo.nome}{extra}")
+    return "\n".join(linhas)
@@ -1,21 +1,25 @@
 from pathlib import Path
-import pandas as pd
+import pyarrow.parquet as pq
+
+from export_stream import exportar_csv_stream
+from instrumentacao import etapa, iniciar
 
 # Sobe 1 nível a partir de src
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 # Caminhos corretos
 parquet_path = BASE_DIR / "data" / "processed_enriched" / "dataset_enriquecido.parquet"
-csv_path = BASE_DIR / "data" / "processed_enriquecido" / "dataset_enriquecido_preview.csv"
+csv_path = BASE_DIR / "data" / "processed_enriched" / "dataset_enriquecido_preview.csv"
 
-# Leitura do parquet
-df = pd.read_parquet(parquet_path)
+iniciar("export_enriquecido")
 
-# Exporta para CSV
-df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+# Exporta para CSV lote a lote (sem carregar o parquet inteiro)
+with etapa("exportar_csv") as m:
+    saidas = exportar_csv_stream(parquet_path, csv_path)
+    m.saida(sum(n for _, n in saidas))
 
-print(f"[OK] CSV gerado em: {csv_path}")
+print(f"[OK] CSV gerado em: {csv_path} ({sum(n for _, n in saidas)} linhas)")
 print("\nEstrutura da base:")
-print(df.dtypes)
+print(pq.read_schema(parquet_path))
 print("\nAmostra dos dados:")
-print(df.head(10))
+print(pq.ParquetFile(parquet_path).read_row_group(0).slice(0, 10).to_pandas())
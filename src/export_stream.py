@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+export_stream.py
+
+Exporta CSV sob demanda a partir de Parquet, lote a lote (sem carregar a base inteira).
+- Seleção de colunas (--colunas)
+- Filtros simples empurrados para a leitura (--filtro "estado=SP,RJ", --filtro "quantidade>=2")
+- Arquivos em partes (--linhas-por-arquivo)
+- Compressão gzip opcional (--gzip)
+
+Substitui os CSVs completos que os scripts do pipeline gravavam sempre
+(vendas_completo.csv, vendas_completo_enriquecido.csv, dataset_enriquecido_preview.csv).
+
+Exemplo:
+  python src/export_stream.py ^
+    --input data/processed_enriched/dataset_enriquecido.parquet ^
+    --out data/exports/vendas_sp.csv ^
+    --colunas cod_pedido,data,estado,valor_total_bruto ^
+    --filtro "estado=SP" ^
+    --linhas-por-arquivo 1000000 --gzip
+"""
+
+import argparse
+import operator
+import re
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+from instrumentacao import etapa, iniciar
+
+BOM_UTF8 = b"\xef\xbb\xbf"   # mantém compatibilidade com os CSVs "utf-8-sig" do projeto
+LOTE_LINHAS = 128_000        # linhas por lote lido do Parquet
+OPCOES_CSV = pacsv.WriteOptions(quoting_style="needed")  # aspas só quando necessário (igual ao pandas)
+
+_OPERADORES = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+_RE_FILTRO = re.compile(r"^\s*([^<>!=]+?)\s*(>=|<=|!=|=|>|<)\s*(.*)$")
+
+# Layout de vendas dos exports (export_to_csv / gera_modelo_SAP_analytics):
+# nome de saída -> colunas candidatas, na ordem (layout em inglês, depois o do prepare_data)
+COLUNAS_VENDAS = {
+    "date": ["date", "data", "data_pedido"],
+    "order_id": ["order_id", "cod_pedido", "Cod_pedido"],
+    "sku": ["sku", "produto"],
+    "category": ["category", "categoria", "categoriaprod"],
+    "channel": ["channel", "formapagto", "forma_pagamento"],
+    "orders": ["orders"],                 # sem a coluna: 1 por linha (ver projetar_vendas)
+    "revenue": ["revenue", "valor_total_bruto", "valor_total"],
+}
+DATAS_DIA_PRIMEIRO = {"data", "data_pedido"}   # layout em português: dd/mm/aaaa
+
+# =====================
+# Utilitários
+# =====================
+
+def listar_parquets(origem) -> list[Path]:
+    """Arquivo único ou diretório. Em diretórios, prefere as partições part_*.parquet
+    para não somar o combinado junto com as partes."""
+    origem = Path(origem)
+    if origem.is_file():
+        return [origem]
+    parts = sorted(origem.glob("part_*.parquet"))
+    return parts or sorted(origem.glob("*.parquet"))
+
+def abrir_dataset(origem) -> ds.Dataset:
+    files = listar_parquets(origem)
+    if not files:
+        raise FileNotFoundError(f"Nenhum parquet encontrado em: {origem}")
+    return ds.dataset([str(f) for f in files], format="parquet")
+
+def _choose_col(nomes, options: list[str]) -> str | None:
+    """Retorna o primeiro nome de coluna existente na ordem dada."""
+    return next((c for c in options if c in nomes), None)
+
+def projetar_vendas(schema: pa.Schema, saidas: list[str], obrigatorias: list[str]) -> tuple[dict, bool]:
+    """Projeção {saída: ds.field(origem)} das colunas de COLUNAS_VENDAS presentes no
+    Parquet, na ordem de `saidas`, e se a data vem com o dia primeiro. Sem coluna de
+    pedidos, cada linha conta 1 (o mesmo que a coluna orders do layout em inglês)."""
+    projecao, origens = {}, {}
+    for saida in saidas:
+        origem = _choose_col(schema.names, COLUNAS_VENDAS[saida])
+        if origem is not None:
+            projecao[saida], origens[saida] = ds.field(origem), origem
+        elif saida == "orders":
+            projecao[saida] = ds.scalar(1)
+    faltando = {c: COLUNAS_VENDAS[c] for c in obrigatorias if c not in projecao}
+    if faltando:
+        raise KeyError(f"Colunas obrigatórias não encontradas no Parquet (candidatas): {faltando}")
+    return projecao, origens.get("date") in DATAS_DIA_PRIMEIRO
+
+def _valor_tipado(valor: str, tipo: pa.DataType):
+    """Converte o texto do filtro para o tipo da coluna (ex.: '2022' -> int64)."""
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        return valor
+    return pa.scalar(valor).cast(tipo)
+
+def montar_filtro(filtros: list[str] | None, schema: pa.Schema):
+    """Traduz ["col=a,b", "col2>=10"] em uma expressão do pyarrow.dataset (AND entre filtros)."""
+    expr = None
+    for texto in filtros or []:
+        m = _RE_FILTRO.match(texto)
+        if not m:
+            raise ValueError(f"Filtro inválido: {texto!r} (use col=valor, col>=valor, ...)")
+        col, op, valor = m.group(1), m.group(2), m.group(3).strip()
+        if col not in schema.names:
+            raise KeyError(f"Coluna de filtro '{col}' não existe no Parquet.")
+        tipo = schema.field(col).type
+
+        if op == "=" and "," in valor:
+            vals = [_valor_tipado(v.strip(), tipo) for v in valor.split(",")]
+            cond = ds.field(col).isin(vals)
+        else:
+            cond = _OPERADORES[op](ds.field(col), _valor_tipado(valor, tipo))
+        expr = cond if expr is None else (expr & cond)
+    return expr
+
+def _caminho_parte(destino: Path, idx: int | None, usar_gzip: bool) -> Path:
+    nome = destino.name
+    for suf in (".gz", ".csv"):
+        if nome.endswith(suf):
+            nome = nome[: -len(suf)]
+    if idx is not None:
+        nome = f"{nome}_part{idx:03d}"
+    nome += ".csv.gz" if usar_gzip else ".csv"
+    return destino.with_name(nome)
+
+def _abrir_saida(path: Path, usar_gzip: bool, bom: bool):
+    sink = pa.CompressedOutputStream(str(path), "gzip") if usar_gzip else pa.OSFile(str(path), "wb")
+    if bom:
+        sink.write(BOM_UTF8)
+    return sink
+
+# =====================
+# Export
+# =====================
+
+def exportar_csv_stream(
+    origem,
+    destino,
+    colunas: list[str] | None = None,
+    filtros: list[str] | None = None,
+    linhas_por_arquivo: int | None = None,
+    usar_gzip: bool = False,
+    bom: bool = True,
+    lote: int = LOTE_LINHAS,
+) -> list[tuple[Path, int]]:
+    """Grava o CSV lote a lote. Retorna [(arquivo, linhas), ...]."""
+    dataset = abrir_dataset(origem)
+    if colunas:
+        faltando = [c for c in colunas if c not in dataset.schema.names]
+        if faltando:
+            raise KeyError(f"Colunas inexistentes no Parquet: {faltando}")
+
+    scanner = dataset.scanner(
+        columns=colunas or None,
+        filter=montar_filtro(filtros, dataset.schema),
+        batch_size=lote,
+    )
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    particionar = bool(linhas_por_arquivo and linhas_por_arquivo > 0)
+
+    saidas: list[tuple[Path, int]] = []
+    sink = writer = None
+    linhas_arquivo = 0
+
+    def _fechar():
+        if writer is not None:
+            writer.close()
+            sink.close()
+
+    try:
+        for batch in scanner.to_batches():
+            inicio = 0
+            while inicio < batch.num_rows:
+                if writer is None:
+                    path = _caminho_parte(destino, len(saidas) + 1 if particionar else None, usar_gzip)
+                    sink = _abrir_saida(path, usar_gzip, bom)
+                    writer = pacsv.CSVWriter(sink, scanner.projected_schema, write_options=OPCOES_CSV)
+                    saidas.append((path, 0))
+                    linhas_arquivo = 0
+
+                n = batch.num_rows - inicio
+                if particionar:
+                    n = min(n, linhas_por_arquivo - linhas_arquivo)
+                writer.write_batch(batch.slice(inicio, n))
+                inicio += n
+                linhas_arquivo += n
+                saidas[-1] = (saidas[-1][0], linhas_arquivo)
+
+                if particionar and linhas_arquivo >= linhas_por_arquivo:
+                    _fechar()
+                    sink = writer = None
+
+        # consulta sem resultado: grava ao menos o cabeçalho
+        if not saidas:
+            path = _caminho_parte(destino, 1 if particionar else None, usar_gzip)
+            sink = _abrir_saida(path, usar_gzip, bom)
+            writer = pacsv.CSVWriter(sink, scanner.projected_schema, write_options=OPCOES_CSV)
+            saidas.append((path, 0))
+    finally:
+        _fechar()
+
+    return saidas
+
+# =====================
+# CLI
+# =====================
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Exporta CSV sob demanda a partir de Parquet (streaming).")
+    ap.add_argument("--input", required=True, help="Arquivo parquet ou diretório com partições.")
+    ap.add_argument("--out", required=True, help="CSV de saída (ex.: data/exports/vendas.csv).")
+    ap.add_argument("--colunas", default=None, help="Lista de colunas separadas por vírgula (padrão: todas).")
+    ap.add_argument("--filtro", action="append", default=[],
+                    help="Filtro 'col=valor', 'col=v1,v2', 'col>=valor' (pode repetir; combina com AND).")
+    ap.add_argument("--linhas-por-arquivo", type=int, default=None, help="Divide a saída em partes de N linhas.")
+    ap.add_argument("--gzip", action="store_true", help="Comprime a saída (.csv.gz).")
+    ap.add_argument("--sem-bom", action="store_true", help="Não grava o BOM UTF-8 no início do arquivo.")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    iniciar("export_stream")
+    colunas = [c.strip() for c in args.colunas.split(",")] if args.colunas else None
+    with etapa("exportar_csv") as m:
+        saidas = exportar_csv_stream(
+            origem=args.input,
+            destino=args.out,
+            colunas=colunas,
+            filtros=args.filtro,
+            linhas_por_arquivo=args.linhas_por_arquivo,
+            usar_gzip=args.gzip,
+            bom=not args.sem_bom,
+        )
+        total = sum(n for _, n in saidas)
+        m.saida(total)
+    print(f"[OK] CSV exportado ({total} linhas):")
+    for path, n in saidas:
+        print(f" - {path} ({n} linhas)")
+
+if __name__ == "__main__":
+    main()
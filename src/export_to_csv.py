@@ -1,5 +1,15 @@
+from collections import deque
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from datas_rapidas import converter_datas_arrow
+from export_stream import abrir_dataset, projetar_vendas, BOM_UTF8, OPCOES_CSV
+from instrumentacao import etapa, iniciar, lotes
 
 # Paths independentes do working dir
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -8,30 +18,206 @@ PROC_DIR = DATA_DIR / "processed"
 OUT_DIR = DATA_DIR / "exports"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# Lê todos os parquets processados
-files = list(PROC_DIR.glob("*.parquet"))
-if not files:
-    raise FileNotFoundError("Nenhum parquet encontrado em data/processed/")
+# "ano" -> vendas_2023.csv | "mes" -> vendas_2023-01.csv | None -> vendas_full.csv
+SPLIT_BY = "ano"
+MAX_WORKERS = 4          # threads de escrita compartilhadas por todos os arquivos
+MAX_PENDENTES = 2 * MAX_WORKERS   # lotes na fila (todos os arquivos); acima disso a leitura espera
+LOTE_LINHAS = 256_000
+FMT_DATA, FMT_DATA_HORA = "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"
+
+# colunas de saída; a origem de cada uma vem de export_stream.COLUNAS_VENDAS
+# (layout em inglês ou o do prepare_data: data, cod_pedido, produto, categoriaprod, ...)
+COLS = ["date", "order_id", "sku", "category", "channel", "orders", "revenue"]
+OBRIGATORIAS = ["date", "revenue"]
+
+# =====================
+# Helpers (operam em lotes Arrow, sem materializar a base inteira)
+# =====================
+
+def _numerico(arr: pa.ChunkedArray | pa.Array, tipo: pa.DataType) -> pa.Array:
+    """Equivalente ao pd.to_numeric(errors='coerce') para colunas que chegam como texto."""
+    if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type):
+        return pc.cast(arr, tipo)
+    s = pd.to_numeric(pd.Series(arr.to_pandas()), errors="coerce")
+    return pa.array(s, type=tipo, from_pandas=True)
+
+def _datas(arr, dayfirst: bool) -> pa.Array:
+    # cada data distinta convertida uma vez; layout em inglês: dayfirst=False, o padrão
+    # do pd.to_datetime usado antes; layout em português (dd/mm/aaaa): dayfirst=True
+    return converter_datas_arrow(arr, dayfirst=dayfirst)
+
+def formato_datas(dataset, projecao: dict, dayfirst: bool) -> str:
+    """Formato como o pandas faria no to_csv da coluna inteira: só a data quando
+    nenhuma linha tem horário. Decidido antes da varredura, lendo só a coluna de data
+    (para no 1º lote com horário): todos os arquivos no mesmo formato, sem truncar horas."""
+    for batch in dataset.to_batches(columns={"date": projecao["date"]}, batch_size=LOTE_LINHAS):
+        arr = _datas(batch.column(0), dayfirst)
+        if pa.types.is_date(arr.type):
+            return FMT_DATA
+        so_data = pc.cast(pc.cast(arr, pa.date32()), arr.type)
+        if pc.any(pc.not_equal(arr, so_data)).as_py():
+            return FMT_DATA_HORA
+    return FMT_DATA
+
+def preparar_lote(batch: pa.RecordBatch, dayfirst: bool) -> pa.Table:
+    """Normaliza tipos do lote: datas, orders inteiro (nulo -> 0), revenue float e
+    colunas dictionary decodificadas (o writer de CSV não aceita dictionary)."""
+    t = pa.Table.from_batches([batch])
+    for i, name in enumerate(t.column_names):
+        col = t.column(i)
+        if pa.types.is_dictionary(col.type):
+            t = t.set_column(i, name, pc.cast(col, col.type.value_type))
+    if "date" in t.column_names:
+        t = t.set_column(t.column_names.index("date"), "date", _datas(t.column("date"), dayfirst))
+    if "orders" in t.column_names:
+        orders = pc.fill_null(_numerico(t.column("orders"), pa.int64()), 0)
+        t = t.set_column(t.column_names.index("orders"), "orders", orders)
+    if "revenue" in t.column_names:
+        t = t.set_column(t.column_names.index("revenue"), "revenue", _numerico(t.column("revenue"), pa.float64()))
+    return t
+
+def chave_arquivo(t: pa.Table) -> pa.Array:
+    """Chave inteira do arquivo de destino: ano (2023) ou ano*100+mes (202301)."""
+    if SPLIT_BY == "mes":
+        return pc.add(pc.multiply(pc.year(t["date"]), 100), pc.month(t["date"]))
+    return pc.year(t["date"])
+
+def nome_arquivo(chave: int | None) -> Path:
+    if chave is None:
+        return OUT_DIR / "vendas_full.csv"
+    if SPLIT_BY == "mes":
+        return OUT_DIR / f"vendas_{chave // 100}-{chave % 100:02d}.csv"
+    return OUT_DIR / f"vendas_{chave}.csv"
+
+class EscritorCSV:
+    """Um arquivo de saída por ano/mês. Os lotes entram na fila do escritor e UM
+    worker do pool compartilhado por vez a esvazia: os lotes de um arquivo saem em
+    ordem e arquivos diferentes são formatados/gravados em paralelo (até MAX_WORKERS
+    threads no total). `vagas` limita os lotes pendentes somando todos os arquivos."""
+
+    def __init__(self, path: Path, schema: pa.Schema, pool: ThreadPoolExecutor, vagas: threading.Semaphore):
+        self.path = path
+        self.linhas = 0
+        self._pool, self._vagas = pool, vagas
+        self._fila = deque()
+        self._lock = threading.Lock()
+        self._ocioso = threading.Event()
+        self._ocioso.set()
+        self._erro = None
+        self._sink = pa.OSFile(str(path), "wb")
+        self._sink.write(BOM_UTF8)
+        self._writer = pacsv.CSVWriter(self._sink, schema, write_options=OPCOES_CSV)
+
+    def escrever(self, tabela: pa.Table):
+        self._vagas.acquire()           # fila cheia: a varredura espera a escrita
+        self.linhas += tabela.num_rows
+        with self._lock:
+            self._fila.append(tabela)
+            if not self._ocioso.is_set():
+                return                  # já há um worker esvaziando esta fila
+            self._ocioso.clear()
+        self._pool.submit(self._esvaziar)
+
+    def _esvaziar(self):
+        while True:
+            with self._lock:
+                if not self._fila:
+                    self._ocioso.set()
+                    return
+                tabela = self._fila.popleft()
+            try:
+                if self._erro is None:
+                    self._writer.write_table(tabela)
+            except Exception as e:      # guardado para o fechar(); a fila continua liberando vagas
+                self._erro = e
+            finally:
+                self._vagas.release()
+
+    def fechar(self):
+        self._ocioso.wait()
+        try:
+            self._writer.close()
+        finally:
+            self._sink.close()
+        if self._erro is not None:
+            raise self._erro
+
+def fechar_todos(escritores):
+    """Fecha todos os arquivos mesmo que um falhe; relança o 1º erro no fim."""
+    erro = None
+    for e in escritores:
+        try:
+            e.fechar()
+        except Exception as ex:
+            erro = erro or ex
+    if erro is not None:
+        raise erro
+
+# =====================
+# Export em uma única varredura: arquivos por ano/mês + KPI mensal
+# =====================
+
+iniciar("export_to_csv")
+dataset = abrir_dataset(PROC_DIR)
+projecao, dayfirst = projetar_vendas(dataset.schema, COLS, OBRIGATORIAS)
+print(f"[INFO] Lendo {len(dataset.files)} arquivo(s) parquet (colunas: {list(projecao)})…")
+with etapa("formato_datas"):
+    fmt_data = formato_datas(dataset, projecao, dayfirst)   # igual em todos os arquivos
+
+kpi_parts = []
+escritores: dict[int | None, EscritorCSV] = {}
+pool_escrita = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+vagas = threading.Semaphore(MAX_PENDENTES)
 
-print(f"[INFO] Lendo {len(files)} arquivo(s) parquet…")
-df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+try:
+    for batch in lotes(dataset.to_batches(columns=projecao, batch_size=LOTE_LINHAS), "ler_parquet"):
+        with etapa("preparar_lote", entrada=batch.num_rows):
+            t = preparar_lote(batch, dayfirst)
 
-# Garante datetime e colunas esperadas
-if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-cols = [c for c in ["date","order_id","sku","category","channel","orders","revenue"] if c in df.columns]
-df = df[cols].copy()
+        # ---------- KPI mensal: agregação parcial do lote ----------
+        anomes = pc.add(pc.multiply(pc.year(t["date"]), 100), pc.month(t["date"]))
+        parcial = (
+            pa.table({"anomes": anomes, "revenue": t["revenue"], "orders": t["orders"]})
+              .group_by("anomes")
+              .aggregate([("revenue", "sum"), ("orders", "sum")])
+        )
+        kpi_parts.append(parcial.to_pandas())
 
-# Formata numéricos no padrão ponto decimal (Power BI/SAC entendem bem)
-df["orders"] = pd.to_numeric(df["orders"], errors="coerce").fillna(0).astype("Int64")
-df["revenue"] = pd.to_numeric(df["revenue"], errors="coerce")
+        # ---------- Transações: distribui o lote entre os arquivos ----------
+        chaves = chave_arquivo(t) if SPLIT_BY else None
+        t = t.set_column(t.column_names.index("date"), "date", pc.strftime(t["date"], fmt_data))
+        if SPLIT_BY:
+            for chave in pc.unique(chaves).to_pylist():
+                if chave is None:
+                    continue  # datas inválidas ficam fora dos arquivos por período
+                parte = t.filter(pc.equal(chaves, chave))
+                if chave not in escritores:
+                    escritores[chave] = EscritorCSV(nome_arquivo(chave), t.schema, pool_escrita, vagas)
+                escritores[chave].escrever(parte)
+        else:
+            if None not in escritores:
+                escritores[None] = EscritorCSV(nome_arquivo(None), t.schema, pool_escrita, vagas)
+            escritores[None].escrever(t)
+finally:
+    # aguarda a fila de cada arquivo e fecha (todos, mesmo que um falhe)
+    with etapa("fechar_escritores"):
+        try:
+            fechar_todos(escritores.values())
+        finally:
+            pool_escrita.shutdown()
 
 # ---------- Export 1: KPIs mensais ----------
-df["yyyymm"] = df["date"].dt.to_period("M").astype(str)
-kpi = (
-    df.groupby("yyyymm", as_index=False)
-      .agg(revenue=("revenue","sum"), orders=("orders","sum"))
-)
+with etapa("kpi_mensal"):
+    kpi = (
+        pd.concat(kpi_parts, ignore_index=True)
+          .dropna(subset=["anomes"])
+          .groupby("anomes", as_index=False)
+          .agg(revenue=("revenue_sum", "sum"), orders=("orders_sum", "sum"))
+          .sort_values("anomes")
+    )
+kpi.insert(0, "yyyymm", [f"{int(k) // 100}-{int(k) % 100:02d}" for k in kpi["anomes"]])
+kpi = kpi.drop(columns="anomes")
+kpi["revenue"] = kpi["revenue"].round(2)  # soma em lotes: elimina ruído de ponto flutuante
 kpi["ticket_medio"] = kpi["revenue"] / kpi["orders"].clip(lower=1)
 
 kpi_path = OUT_DIR / "kpi_mensal.csv"
@@ -39,19 +225,6 @@ kpi.to_csv(kpi_path, index=False, encoding="utf-8-sig")
 print(f"[OK] KPI mensal exportado: {kpi_path}")
 
 # ---------- Export 2: Transações completas ----------
-# Se ficar muito grande, exportar por ano
-df["year"] = df["date"].dt.year
-
-# Troque para False se quiser tudo num único arquivo
-SPLIT_BY_YEAR = True
-
-if SPLIT_BY_YEAR and "year" in df.columns:
-    for y, part in df.groupby("year", dropna=True):
-        out = OUT_DIR / f"vendas_{int(y)}.csv"
-        (part.drop(columns=["year","yyyymm"], errors="ignore")
-             .to_csv(out, index=False, encoding="utf-8-sig"))
-        print(f"[OK] Exportado: {out} ({len(part)} linhas)")
-else:
-    full_path = OUT_DIR / "vendas_full.csv"
-    df.drop(columns=["year","yyyymm"], errors="ignore").to_csv(full_path, index=False, encoding="utf-8-sig")
-    print(f"[OK] Transações exportadas: {full_path} ({len(df)} linhas)")
+for chave in sorted(escritores, key=lambda k: (k is None, k)):
+    e = escritores[chave]
+    print(f"[OK] Exportado: {e.path} ({e.linhas} linhas)")
@@ -1,5 +1,14 @@
 from pathlib import Path
+import calendar
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from datas_rapidas import converter_datas_arrow
+from export_stream import abrir_dataset, projetar_vendas, BOM_UTF8, OPCOES_CSV
+from instrumentacao import etapa, iniciar, lotes
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
@@ -7,55 +16,161 @@ PROC_DIR = DATA_DIR / "processed"
 EXPORT_DIR = DATA_DIR / "exports_sac"
 EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
-# Lê todos os parquets processados
-files = list(PROC_DIR.glob("*.parquet"))
-if not files:
-    raise FileNotFoundError("Nenhum parquet encontrado em data/processed/")
+LOTE_LINHAS = 256_000
+# colunas usadas; a origem de cada uma vem de export_stream.COLUNAS_VENDAS (layout
+# em inglês ou o do prepare_data); sem coluna de pedidos, cada linha conta 1
+COLS = ["date", "sku", "category", "channel", "orders", "revenue"]
+
+# =====================
+# Dimensão construída em streaming (hash map membro -> chave inteira)
+# =====================
+
+class DimensaoStream:
+    """Atribui chaves inteiras (1..N) na ordem em que os membros aparecem.
+    Cada lote é dictionary-encoded: só os valores distintos do lote passam pelo
+    dict Python; as linhas recebem a chave por indexação NumPy."""
+
+    def __init__(self):
+        self.chaves: dict = {}
+
+    def chaves_do_lote(self, arr) -> pa.Array:
+        enc = pc.dictionary_encode(arr).combine_chunks() if isinstance(arr, pa.ChunkedArray) else pc.dictionary_encode(arr)
+        valores = enc.dictionary.to_pylist()
+        lookup = np.empty(len(valores), dtype=np.int32)
+        for i, v in enumerate(valores):
+            k = self.chaves.get(v)
+            if k is None:
+                k = self.chaves[v] = len(self.chaves) + 1
+            lookup[i] = k
+        idx = enc.indices
+        validos = pc.is_valid(idx)
+        chaves = lookup[pc.fill_null(idx, 0).to_numpy(zero_copy_only=False)] if len(valores) else np.zeros(len(idx), np.int32)
+        return pa.array(chaves, mask=~validos.to_numpy(zero_copy_only=False))
+
+    def membros(self) -> list:
+        return list(self.chaves)
+
+def _texto(arr):
+    if pa.types.is_dictionary(arr.type):
+        return pc.cast(arr, arr.type.value_type)
+    return arr
+
+def _numerico(arr, tipo):
+    if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type):
+        return pc.cast(arr, tipo)
+    return pa.array(pd.to_numeric(pd.Series(arr.to_pandas()), errors="coerce"), type=tipo, from_pandas=True)
+
+def _datas(arr, dayfirst: bool):
+    return converter_datas_arrow(arr, dayfirst=dayfirst)
 
-df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+# =====================
+# Varredura única: dimensões + fato com chaves inteiras
+# =====================
 
-# Garante datetime
-df["date"] = pd.to_datetime(df["date"], errors="coerce")
+iniciar("gera_modelo_SAP_analytics")
+dataset = abrir_dataset(PROC_DIR)
+projecao, dayfirst = projetar_vendas(dataset.schema, COLS, obrigatorias=COLS)
 
-# DIM PRODUTO
-dim_produto = df[["sku", "category"]].drop_duplicates().rename(columns={
-    "sku": "ProdutoID",
-    "category": "CategoriaID"
+dim_prod, dim_cat, dim_canal = DimensaoStream(), DimensaoStream(), DimensaoStream()
+categoria_do_produto: dict[int, int] = {}   # ProdutoKey -> CategoriaKey da 1ª linha do produto na varredura
+data_min = data_max = None
+
+schema_fato = pa.schema([
+    ("DataKey", pa.int32()),
+    ("ProdutoKey", pa.int32()),
+    ("CategoriaKey", pa.int32()),
+    ("CanalKey", pa.int32()),
+    ("Pedidos", pa.int64()),
+    ("Receita", pa.float64()),
+])
+fato_path = EXPORT_DIR / "fato_vendas.csv"
+linhas_fato = 0
+
+with etapa("fato_vendas") as medicao, pa.OSFile(str(fato_path), "wb") as sink:
+    sink.write(BOM_UTF8)
+    with pacsv.CSVWriter(sink, schema_fato, write_options=OPCOES_CSV) as writer:
+        for batch in lotes(dataset.to_batches(columns=projecao, batch_size=LOTE_LINHAS), "ler_parquet"):
+            datas = _datas(batch.column("date"), dayfirst)
+            k_prod = dim_prod.chaves_do_lote(_texto(batch.column("sku")))
+            k_cat = dim_cat.chaves_do_lote(_texto(batch.column("category")))
+            k_canal = dim_canal.chaves_do_lote(_texto(batch.column("channel")))
+
+            # categoria de cada produto = a da 1ª linha em que ele aparece (group_by ordenado,
+            # nulo conta); produtos já vistos em lotes anteriores são ignorados
+            pares = pa.table({"p": k_prod, "c": k_cat}).group_by("p", use_threads=False).aggregate(
+                [("c", "first", pc.ScalarAggregateOptions(skip_nulls=False))])
+            for p, c in zip(pares["p"].to_pylist(), pares["c_first"].to_pylist()):
+                if p is not None and p not in categoria_do_produto:
+                    categoria_do_produto[p] = c
+
+            mm = pc.min_max(datas)
+            lo, hi = mm["min"].as_py(), mm["max"].as_py()
+            if lo is not None:
+                data_min = lo if data_min is None else min(data_min, lo)
+                data_max = hi if data_max is None else max(data_max, hi)
+
+            data_key = pc.add(pc.add(pc.multiply(pc.year(datas), 10_000),
+                                     pc.multiply(pc.month(datas), 100)), pc.day(datas))
+            writer.write_batch(pa.record_batch([
+                pc.cast(data_key, pa.int32()),
+                k_prod,
+                k_cat,
+                k_canal,
+                pc.fill_null(_numerico(batch.column("orders"), pa.int64()), 0),
+                _numerico(batch.column("revenue"), pa.float64()),
+            ], schema=schema_fato))
+            linhas_fato += batch.num_rows
+    medicao.saida(linhas_fato)
+
+# DIM PRODUTO: uma linha por SKU (chave ProdutoKey), com a categoria da 1ª ocorrência.
+# Antes era uma linha por par (sku, category); um SKU em várias categorias segue
+# com a categoria de cada venda no CategoriaKey do fato.
+prod_membros = dim_prod.membros()
+cat_membros = dim_cat.membros()
+dim_produto = pd.DataFrame({
+    "ProdutoKey": np.arange(1, len(prod_membros) + 1),
+    "ProdutoID": prod_membros,
 })
+dim_produto["CategoriaKey"] = dim_produto["ProdutoKey"].map(categoria_do_produto).astype("Int32")
+dim_produto["CategoriaID"] = dim_produto["CategoriaKey"].map(dict(enumerate(cat_membros, 1)))
 dim_produto.to_csv(EXPORT_DIR / "dim_produto.csv", index=False, encoding="utf-8-sig")
 
 # DIM CATEGORIA
-dim_categoria = df[["category"]].drop_duplicates().rename(columns={
-    "category": "CategoriaID"
+dim_categoria = pd.DataFrame({
+    "CategoriaKey": np.arange(1, len(cat_membros) + 1),
+    "CategoriaID": cat_membros,
 })
 dim_categoria["CategoriaDescricao"] = dim_categoria["CategoriaID"]
 dim_categoria.to_csv(EXPORT_DIR / "dim_categoria.csv", index=False, encoding="utf-8-sig")
 
 # DIM CANAL
-dim_canal = df[["channel"]].drop_duplicates().rename(columns={
-    "channel": "CanalID"
+canal_membros = dim_canal.membros()
+dim_canal_df = pd.DataFrame({
+    "CanalKey": np.arange(1, len(canal_membros) + 1),
+    "CanalID": canal_membros,
 })
-dim_canal["CanalDescricao"] = dim_canal["CanalID"]
-dim_canal.to_csv(EXPORT_DIR / "dim_canal.csv", index=False, encoding="utf-8-sig")
-
-# DIM TEMPO
-dim_tempo = df[["date"]].drop_duplicates().rename(columns={"date": "Data"})
-dim_tempo["Ano"] = dim_tempo["Data"].dt.year
-dim_tempo["Mes"] = dim_tempo["Data"].dt.month
-dim_tempo["AnoMes"] = dim_tempo["Data"].dt.strftime("%Y-%m")
-dim_tempo["MesNome"] = dim_tempo["Data"].dt.strftime("%B")
-dim_tempo["Trimestre"] = dim_tempo["Data"].dt.quarter
-dim_tempo.to_csv(EXPORT_DIR / "dim_tempo.csv", index=False, encoding="utf-8-sig")
+dim_canal_df["CanalDescricao"] = dim_canal_df["CanalID"]
+dim_canal_df.to_csv(EXPORT_DIR / "dim_canal.csv", index=False, encoding="utf-8-sig")
 
-# FATO VENDAS
-fato_vendas = df[["date", "sku", "category", "channel", "orders", "revenue"]].rename(columns={
-    "date": "Data",
-    "sku": "ProdutoID",
-    "category": "CategoriaID",
-    "channel": "CanalID",
-    "orders": "Pedidos",
-    "revenue": "Receita"
-})
-fato_vendas.to_csv(EXPORT_DIR / "fato_vendas.csv", index=False, encoding="utf-8-sig")
+# DIM TEMPO — calendário contínuo entre a menor e a maior data do fato
+if data_min is not None:
+    dias = pd.date_range(pd.Timestamp(data_min).normalize(), pd.Timestamp(data_max).normalize(), freq="D")
+    ano, mes, dia = dias.year.to_numpy(), dias.month.to_numpy(), dias.day.to_numpy()
+    nomes_mes = np.array(calendar.month_name)   # 13 posições (índice 0 vazio)
+    dim_tempo = pd.DataFrame({
+        "DataKey": ano * 10_000 + mes * 100 + dia,
+        "Data": dias.date,
+        "Ano": ano,
+        "Mes": mes,
+        "AnoMes": pd.Series(ano * 100 + mes).map(lambda k: f"{k // 100}-{k % 100:02d}").to_numpy(),
+        "MesNome": nomes_mes[mes],
+        "Trimestre": (mes - 1) // 3 + 1,
+    })
+else:
+    dim_tempo = pd.DataFrame(columns=["DataKey", "Data", "Ano", "Mes", "AnoMes", "MesNome", "Trimestre"])
+dim_tempo.to_csv(EXPORT_DIR / "dim_tempo.csv", index=False, encoding="utf-8-sig")
 
 print(f"[OK] Arquivos gerados em: {EXPORT_DIR}")
+print(f" - fato_vendas.csv: {linhas_fato} linhas")
+print(f" - dim_produto: {len(dim_produto)} | dim_categoria: {len(dim_categoria)} | "
+      f"dim_canal: {len(dim_canal_df)} | dim_tempo: {len(dim_tempo)} dias")
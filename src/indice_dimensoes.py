@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+indice_dimensoes.py
+
+Índice de lookup pré-calculado de cada dimensão, gravado ao lado dos dim_*:
+  data/dimensoes/dim_produto.idx.arrow
+- Arrow IPC sem compressão (abre com memory-map, sem cópia nem parse de CSV)
+- chave normalizada (já calculada pelo builder) -> id + atributos
+- metadados: coluna id, colunas de atributo e QUAL normalização gerou a chave
+  (o fato é normalizado do mesmo jeito, só nos valores distintos)
+
+Usado por build_dimensoes.py / build_dim_produto.py (gravação) e
+build_fato_enriquecido.py (junção sem reler CSV nem re-normalizar a dimensão).
+
+  python src/indice_dimensoes.py --dir data/dimensoes          # lista os índices
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+from unidecode import unidecode
+
+SUFIXO = ".idx.arrow"
+COL_CHAVE = "__chave"
+
+# definição ÚNICA: builders das dimensões, build_fato_enriquecido e resolver_nao_casados
+# importam daqui (dimensão e fato normalizados do mesmo jeito, senão a junção não casa)
+def norm(s: str) -> str:
+    if s is None or (not isinstance(s, str) and pd.isna(s)):   # None, NaN, pd.NA, NaT -> ""
+        return ""
+    s = unidecode(str(s)).lower().strip()
+    return " ".join(s.split())
+
+def strip(s) -> str:
+    return str(s).strip()
+
+NORMALIZADORES = {"norm": norm, "strip": strip}
+
+# =====================
+# Gravação
+# =====================
+
+def caminho_indice(out_dir, arquivo: str) -> Path:
+    return Path(out_dir) / f"{arquivo}{SUFIXO}"
+
+def salvar_indice(dim: pd.DataFrame, out_dir, arquivo: str, col_chave: str, id_col: str,
+                  atributos: list[str], normalizacao: str) -> Path:
+    """Grava chave normalizada -> id + atributos (uma linha por chave, a primeira vence)."""
+    if normalizacao not in NORMALIZADORES:
+        raise ValueError(f"normalizacao deve ser uma de {list(NORMALIZADORES)}.")
+    cols = [c for c in dict.fromkeys([id_col, *atributos]) if c in dim.columns]
+    base = dim.dropna(subset=[col_chave])
+    dup = base[col_chave].duplicated()
+    if dup.any():
+        print(f"[AVISO] {arquivo}: {int(dup.sum())} chave(s) duplicada(s) no índice; mantida a primeira.")
+        base = base[~dup]
+
+    tabela = pa.Table.from_pandas(
+        base[[col_chave, *cols]].rename(columns={col_chave: COL_CHAVE}).astype(object),
+        preserve_index=False,
+    )
+    meta = {
+        "arquivo": arquivo,
+        "col_chave": col_chave,
+        "id_col": id_col,
+        "atributos": json.dumps(cols, ensure_ascii=False),
+        "normalizacao": normalizacao,
+    }
+    tabela = tabela.replace_schema_metadata({k: str(v) for k, v in meta.items()})
+
+    destino = caminho_indice(out_dir, arquivo)
+    with pa.OSFile(str(destino), "wb") as sink, ipc.new_file(sink, tabela.schema) as w:
+        w.write_table(tabela)
+    return destino
+
+# =====================
+# Leitura / lookup
+# =====================
+
+class IndiceDimensao:
+    def __init__(self, tabela: pa.Table):
+        meta = {k.decode(): v.decode() for k, v in (tabela.schema.metadata or {}).items()}
+        self.tabela = tabela
+        self.arquivo = meta.get("arquivo", "")
+        self.col_chave = meta.get("col_chave", COL_CHAVE)
+        self.id_col = meta["id_col"]
+        self.atributos = json.loads(meta.get("atributos", "[]"))
+        self.normalizar = NORMALIZADORES[meta.get("normalizacao", "strip")]
+        self._chaves = tabela.column(COL_CHAVE).combine_chunks()
+
+    @classmethod
+    def abrir(cls, path) -> "IndiceDimensao":
+        """Memory-map do arquivo IPC: nada é copiado até alguém tocar nas colunas."""
+        fonte = pa.memory_map(str(path), "r")
+        return cls(ipc.open_file(fonte).read_all())
+
+    def __len__(self):
+        return self.tabela.num_rows
+
+    def posicoes(self, valores: pd.Series, normalizar: bool = True, aliases: dict | None = None) -> np.ndarray:
+        """Linha do índice para cada valor (-1 = não casou). Normaliza só os distintos.
+        `aliases` (chave normalizada -> chave da dimensão) vem do resolver de não-casados."""
+        codes, uniques = pd.factorize(valores)
+        chaves = [self.normalizar(u) for u in uniques] if normalizar else list(uniques)
+        if aliases:
+            chaves = [aliases.get(c, c) for c in chaves]
+        pos_u = pc.index_in(pa.array(chaves, type=pa.string()), value_set=self._chaves)
+        pos_u = np.append(pos_u.to_numpy(zero_copy_only=False), np.nan)  # código -1 (nulo) -> nan
+        pos = pos_u[codes]
+        return np.where(np.isnan(pos), -1, pos).astype(np.int64)
+
+    def coluna(self, nome: str, posicoes: np.ndarray) -> np.ndarray:
+        valores = self.tabela.column(nome).to_numpy(zero_copy_only=False).astype(object)
+        valores = np.append(valores, None)        # posição -1 -> None
+        return valores[posicoes]
+
+    def ids(self, valores: pd.Series) -> np.ndarray:
+        return self.coluna(self.id_col, self.posicoes(valores))
+
+    def chaves(self) -> np.ndarray:
+        return self._chaves.to_numpy(zero_copy_only=False)
+
+def carregar_indices(dim_dir) -> dict[str, IndiceDimensao]:
+    """{arquivo: índice} para todos os *.idx.arrow do diretório."""
+    out = {}
+    for p in sorted(Path(dim_dir).glob(f"*{SUFIXO}")):
+        idx = IndiceDimensao.abrir(p)
+        out[idx.arquivo or p.name[: -len(SUFIXO)]] = idx
+    return out
+
+def enriquecer(fato: pd.DataFrame, indice: IndiceDimensao, col_fato: str,
+               keep_cols: list[str], col_relatorio: str | None = None,
+               aliases: dict | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Equivalente ao safe_merge_left de build_fato_enriquecido.py, por lookup no índice:
+    - acrescenta id + keep_cols (col -> col+'_dim' se já existir no fato, exceto o id)
+    - retorna (fato, nao_casados) com as chaves normalizadas que não casaram
+      (coluna `col_relatorio`, padrão '<col_fato>_normalizado')."""
+    pos = indice.posicoes(fato[col_fato], aliases=aliases)
+    cols = [c for c in dict.fromkeys([indice.id_col, *keep_cols])
+            if c == indice.id_col or c in indice.atributos]
+    for c in cols:
+        destino = f"{c}_dim" if (c in fato.columns and c != indice.id_col) else c
+        fato[destino] = indice.coluna(c, pos)
+
+    faltou = pos < 0
+    chaves = fato.loc[faltou, col_fato].map(indice.normalizar).drop_duplicates()
+    nao_casados = pd.DataFrame({col_relatorio or f"{col_fato}_normalizado": chaves.to_numpy()})
+    return fato, nao_casados
+
+# =====================
+# CLI
+# =====================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lista os índices de dimensão (*.idx.arrow).")
+    ap.add_argument("--dir", default=str(Path(__file__).resolve().parents[1] / "data" / "dimensoes"))
+    args = ap.parse_args(argv)
+    indices = carregar_indices(args.dir)
+    if not indices:
+        print(f"[INFO] Nenhum índice em {args.dir}. Rode src/build_dimensoes.py.")
+    for nome, idx in indices.items():
+        print(f"[OK] {nome}: {len(idx)} chaves | id={idx.id_col} | atributos={idx.atributos} "
+              f"| normalização={idx.normalizar.__name__}")
+
+if __name__ == "__main__":
+    main()
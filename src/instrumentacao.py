@@ -0,0 +1,340 @@
+# src/instrumentacao.py
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# ==============================================
+# Instrumentação por etapa (e por chunk)
+# - tempo de parede, tempo de CPU do processo, pico de RSS e linhas entrada/saída
+# - etapas aninhadas: "prepare_data > process_chunk > _to_number"
+# - no fim da execução: relatório JSON + resumo legível em data/.pipeline/relatorios/
+# - perfil opcional: PERF_PROFILE=cprofile (cProfile) ou PERF_PROFILE=amostragem
+#   (amostrador de pilha, sem dependências) -> funções mais quentes no relatório
+#
+# Uso:
+#   from instrumentacao import iniciar, etapa
+#   iniciar("prepare_data")                         # grava o relatório ao sair
+#   with etapa("process_chunk", entrada=len(chunk)) as m:
+#       chunk = process_chunk(chunk)
+#       m.saida(len(chunk))
+#   for batch in lotes(dataset.to_batches()):       # tempo de leitura de cada lote
+#       ...
+# Sem iniciar(), as medições continuam sendo coletadas, mas nada é gravado.
+# ==============================================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RELATORIOS_DIR = Path(os.environ.get("PERF_RELATORIO_DIR", BASE_DIR / "data" / ".pipeline" / "relatorios"))
+INTERVALO_RSS = 0.02        # s entre leituras de RSS
+INTERVALO_AMOSTRA = 0.005   # s entre amostras de pilha (perfil por amostragem)
+TOP_FUNCOES = 25
+
+# =====================
+# Memória
+# =====================
+
+try:
+    import psutil
+    _PROC = psutil.Process()
+except Exception:  # psutil é opcional
+    _PROC = None
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_atual() -> int | None:
+    """RSS atual em bytes (psutil > /proc > None)."""
+    if _PROC is not None:
+        return _PROC.memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except OSError:
+        return None
+
+def rss_pico_processo() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows: só com psutil
+        return getattr(_PROC.memory_info(), "peak_wset", None) if _PROC is not None else None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024   # Linux: kB
+
+# =====================
+# Registro das etapas
+# =====================
+
+class Medicao:
+    def __init__(self, caminho: str, entrada: int | None):
+        self.caminho = caminho
+        self.linhas_entrada = entrada
+        self.linhas_saida = None
+        self.rss_inicio = rss_atual()
+        self.rss_pico = self.rss_inicio
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        self.segundos = None
+        self.cpu_segundos = None
+
+    def entrada(self, n: int):
+        self.linhas_entrada = (self.linhas_entrada or 0) + int(n)
+
+    def saida(self, n: int):
+        self.linhas_saida = (self.linhas_saida or 0) + int(n)
+
+    def _ver_rss(self, rss):
+        if rss is not None and (self.rss_pico is None or rss > self.rss_pico):
+            self.rss_pico = rss
+
+    def _fechar(self):
+        self._ver_rss(rss_atual())
+        self.segundos = time.perf_counter() - self._t0
+        self.cpu_segundos = time.process_time() - self._c0
+
+    def como_dict(self) -> dict:
+        return {
+            "etapa": self.caminho,
+            "segundos": round(self.segundos, 6),
+            "cpu_segundos": round(self.cpu_segundos, 6),
+            "rss_inicio_mb": _mb(self.rss_inicio),
+            "rss_pico_mb": _mb(self.rss_pico),
+            "linhas_entrada": self.linhas_entrada,
+            "linhas_saida": self.linhas_saida,
+        }
+
+def _mb(b):
+    return None if b is None else round(b / 2**20, 1)
+
+class _Execucao:
+    def __init__(self):
+        self.nome = None
+        self.inicio = None
+        self.medicoes: list[Medicao] = []
+        self.extras: dict = {}
+        self._ativas: set[Medicao] = set()
+        self._trava = threading.Lock()
+        self._pilha = threading.local()
+        self._monitor = None
+        self._perfil = None
+        self._amostras_self = Counter()
+        self._amostras_incl = Counter()
+        self._n_amostras = 0
+
+    # ---------- pilha de etapas (por thread) ----------
+    def _stack(self) -> list[str]:
+        if not hasattr(self._pilha, "nomes"):
+            self._pilha.nomes = []
+        return self._pilha.nomes
+
+    def abrir(self, nome: str, entrada) -> Medicao:
+        stack = self._stack()
+        stack.append(nome)
+        m = Medicao(" > ".join(stack), entrada)
+        with self._trava:
+            self._ativas.add(m)
+        self._garantir_monitor()
+        return m
+
+    def fechar(self, m: Medicao):
+        m._fechar()
+        with self._trava:
+            self._ativas.discard(m)
+            self.medicoes.append(m)
+        self._stack().pop()
+
+    # ---------- monitor de RSS (thread daemon) ----------
+    def _garantir_monitor(self):
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._monitorar, name="perf-rss", daemon=True)
+            self._monitor.start()
+
+    def _monitorar(self):
+        while True:
+            time.sleep(INTERVALO_RSS)
+            with self._trava:
+                ativas = list(self._ativas)
+            if ativas:
+                rss = rss_atual()
+                for m in ativas:
+                    m._ver_rss(rss)
+
+    # ---------- perfis opcionais ----------
+    def ligar_perfil(self, modo: str):
+        if modo == "cprofile":
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        elif modo == "amostragem":
+            alvo = threading.main_thread().ident
+            threading.Thread(target=self._amostrar, args=(alvo,), name="perf-amostra", daemon=True).start()
+        elif modo:
+            print(f"[AVISO] PERF_PROFILE='{modo}' desconhecido (use cprofile ou amostragem).")
+
+    def _amostrar(self, alvo: int):
+        while True:
+            time.sleep(INTERVALO_AMOSTRA)
+            frame = sys._current_frames().get(alvo)
+            if frame is None:
+                continue
+            self._n_amostras += 1
+            vistos = set()
+            topo = True
+            while frame is not None:
+                co = frame.f_code
+                chave = f"{Path(co.co_filename).name}:{co.co_firstlineno}({co.co_name})"
+                if topo:
+                    self._amostras_self[chave] += 1
+                    topo = False
+                if chave not in vistos:
+                    self._amostras_incl[chave] += 1
+                    vistos.add(chave)
+                frame = frame.f_back
+
+    def _funcoes_quentes(self, destino_prof: Path) -> list[dict]:
+        if self._perfil is not None:
+            self._perfil.disable()
+            self._perfil.dump_stats(destino_prof)
+            st = pstats.Stats(self._perfil, stream=io.StringIO()).sort_stats("cumulative")
+            linhas = []
+            for (arq, linha, func), (cc, nc, tt, ct, _) in st.stats.items():
+                linhas.append({"funcao": f"{Path(arq).name}:{linha}({func})", "chamadas": nc,
+                               "tottime": round(tt, 4), "cumtime": round(ct, 4)})
+            return sorted(linhas, key=lambda d: d["cumtime"], reverse=True)[:TOP_FUNCOES]
+        if self._n_amostras:
+            n = self._n_amostras
+            return [{"funcao": f, "amostras_inclusivas": c, "pct_inclusivo": round(100 * c / n, 1),
+                     "pct_proprio": round(100 * self._amostras_self.get(f, 0) / n, 1)}
+                    for f, c in self._amostras_incl.most_common(TOP_FUNCOES)]
+        return []
+
+    # ---------- relatório ----------
+    def resumo(self) -> list[dict]:
+        """Agrega por etapa (chunks repetidos viram uma linha com n, soma e máximo)."""
+        grupos: dict[str, dict] = {}
+        for m in self.medicoes:
+            g = grupos.setdefault(m.caminho, {"etapa": m.caminho, "n": 0, "segundos": 0.0, "cpu_segundos": 0.0,
+                                              "seg_max": 0.0, "rss_pico_mb": None,
+                                              "linhas_entrada": None, "linhas_saida": None})
+            g["n"] += 1
+            g["segundos"] += m.segundos
+            g["cpu_segundos"] += m.cpu_segundos
+            g["seg_max"] = max(g["seg_max"], m.segundos)
+            if m.rss_pico is not None:
+                g["rss_pico_mb"] = max(g["rss_pico_mb"] or 0, _mb(m.rss_pico))
+            for k, v in (("linhas_entrada", m.linhas_entrada), ("linhas_saida", m.linhas_saida)):
+                if v is not None:
+                    g[k] = (g[k] or 0) + v
+        for g in grupos.values():
+            for k in ("segundos", "cpu_segundos", "seg_max"):
+                g[k] = round(g[k], 4)
+        return sorted(grupos.values(), key=lambda g: g["etapa"])
+
+    def finalizar(self):
+        if self.nome is None:
+            return
+        RELATORIOS_DIR.mkdir(parents=True, exist_ok=True)
+        carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = RELATORIOS_DIR / f"{self.nome}_{carimbo}"
+        funcoes = self._funcoes_quentes(base.with_suffix(".prof"))
+        resumo = self.resumo()
+        relatorio = {
+            "script": self.nome,
+            "inicio": self.inicio,
+            "segundos_total": round(time.perf_counter() - self._t0_total, 3),
+            "cpu_segundos_total": round(time.process_time() - self._c0_total, 3),
+            "rss_pico_processo_mb": _mb(rss_pico_processo()),
+            "resumo": resumo,
+            "medicoes": [m.como_dict() for m in self.medicoes],
+            "funcoes_quentes": funcoes,
+        }
+        if self.extras:
+            relatorio["extras"] = self.extras
+        base.with_suffix(".json").write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+        texto = formatar_resumo(relatorio)
+        base.with_suffix(".txt").write_text(texto, encoding="utf-8")
+        print(texto)
+        print(f"[OK] Relatório de desempenho: {base.with_suffix('.json')}")
+        self.nome = None
+
+_EXEC = _Execucao()
+
+def formatar_resumo(rel: dict) -> str:
+    linhas = [f"=== Desempenho: {rel['script']} ({rel['segundos_total']:.2f}s parede, "
+              f"{rel['cpu_segundos_total']:.2f}s CPU, pico RSS {rel['rss_pico_processo_mb']} MB) ===",
+              f"{'etapa':<58} {'n':>5} {'parede(s)':>10} {'CPU(s)':>9} {'máx(s)':>8} {'RSS MB':>8} "
+              f"{'linhas in':>12} {'linhas out':>12}"]
+    for g in rel["resumo"]:
+        fmt = lambda v: "-" if v is None else f"{v:,}"
+        linhas.append(f"{g['etapa'][-58:]:<58} {g['n']:>5} {g['segundos']:>10.3f} {g['cpu_segundos']:>9.3f} "
+                      f"{g['seg_max']:>8.3f} {fmt(g['rss_pico_mb']):>8} {fmt(g['linhas_entrada']):>12} "
+                      f"{fmt(g['linhas_saida']):>12}")
+    if rel["funcoes_quentes"]:
+        linhas.append("--- funções mais quentes ---")
+        for f in rel["funcoes_quentes"][:10]:
+            if "cumtime" in f:
+                linhas.append(f"  {f['cumtime']:>9.3f}s cum  {f['tottime']:>9.3f}s próprio  {f['funcao']}")
+            else:
+                linhas.append(f"  {f['pct_inclusivo']:>6.1f}% incl  {f['pct_proprio']:>6.1f}% próprio  {f['funcao']}")
+    return "\n".join(linhas)
+
+# =====================
+# API
+# =====================
+
+def iniciar(nome: str, perfil: str | None = None):
+    """Marca o início do script; o relatório é gravado na saída do processo.
+    perfil: None | "cprofile" | "amostragem" (padrão: variável PERF_PROFILE)."""
+    _EXEC.nome = nome
+    _EXEC.inicio = datetime.now().isoformat(timespec="seconds")
+    _EXEC._t0_total = time.perf_counter()
+    _EXEC._c0_total = time.process_time()
+    _EXEC.ligar_perfil(perfil if perfil is not None else os.environ.get("PERF_PROFILE", "").strip().lower())
+    atexit.register(_EXEC.finalizar)
+
+def finalizar():
+    """Grava o relatório agora (normalmente feito automaticamente na saída)."""
+    _EXEC.finalizar()
+
+@contextmanager
+def etapa(nome: str, entrada: int | None = None):
+    m = _EXEC.abrir(nome, entrada)
+    try:
+        yield m
+    finally:
+        _EXEC.fechar(m)
+
+def anexar(chave: str, dados):
+    """Dados extras (JSON-serializáveis) gravados no relatório, ex.: estatísticas da esteira."""
+    _EXEC.extras[chave] = dados
+
+def lotes(iteravel, nome: str = "ler_lote"):
+    """Envolve um iterador de lotes (RecordBatch/DataFrame): mede o tempo de leitura de cada um."""
+    it = iter(iteravel)
+    while True:
+        with etapa(nome) as m:
+            lote = next(it, None)
+            if lote is not None:
+                m.saida(lote.num_rows if hasattr(lote, "num_rows") else len(lote))
+        if lote is None:
+            return
+        yield lote
+
+def medir(nome: str | None = None):
+    """Decorador: mede cada chamada da função como uma etapa."""
+    def deco(func):
+        rotulo = nome or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with etapa(rotulo):
+                return func(*args, **kwargs)
+        return wrapper
+    return deco
@@ -0,0 +1,169 @@
+# src/kpi_mensal.py
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from conversao_numerica import normalizar_medida
+from datas_rapidas import converter_datas
+
+# ==============================================
+# KPIs mensais em streaming
+# - Consome lotes (DataFrame) e mantém, por mês (yyyymm):
+#     * somas correntes (revenue, valor_comissao, lucro_liquido)
+#     * conjunto de pedidos distintos (hash 64 bits, arrays ordenados)
+# - No final: KPI mensal, outliers de receita (IQR) e meses com receita zero
+# - Memória proporcional a meses × pedidos distintos, nunca à base inteira
+# Usado por eda_quick.py
+# ==============================================
+
+COLS_DATA = ["date", "data", "data_pedido"]
+COLS_PEDIDO = ["Cod_pedido", "cod_pedido", "order_id"]
+COLS_RECEITA = ["revenue", "valor_total", "valor_total_bruto"]
+COLS_SOMA = ["valor_comissao", "lucro_liquido"]
+LOTE_LINHAS = 256_000
+
+def _primeira(cols, opcoes):
+    return next((c for c in opcoes if c in cols), None)
+
+def _numero(s: pd.Series) -> pd.Series:
+    # float32 / inteiros pequenos do esquema tipado -> 64 bits antes de somar
+    return normalizar_medida(pd.to_numeric(s, errors="coerce"))
+
+def colunas_necessarias(cols) -> list[str]:
+    """Projeção mínima para o cálculo (lida do Parquet)."""
+    cols = list(cols)
+    usar = [_primeira(cols, COLS_DATA), _primeira(cols, COLS_PEDIDO), _primeira(cols, COLS_RECEITA)]
+    if usar[2] is None:
+        usar += ["preco_unitario", "quantidade", "lucro_liquido"]
+    if usar[1] is None:
+        usar.append("orders")
+    usar += COLS_SOMA
+    return list(dict.fromkeys(c for c in usar if c and c in cols))
+
+class AcumuladorKPIMensal:
+    def __init__(self, dayfirst: bool = True):
+        self.dayfirst = dayfirst
+        self._somas: dict[str, dict[str, float]] = {}       # medida -> {yyyymm: soma}
+        self._pedidos: dict[str, np.ndarray] = {}           # yyyymm -> hashes ordenados
+        self._contagem: dict[str, int] = {}                 # yyyymm -> pedidos (sem id de pedido)
+        self._medidas_extra: list[str] = []
+        self._inteiras: dict[str, bool] = {}                # medida -> todos os lotes inteiros?
+        self.linhas = 0
+
+    # ---------- por lote ----------
+    def _yyyymm(self, lote: pd.DataFrame) -> pd.Series:
+        col = _primeira(lote.columns, COLS_DATA)
+        if col is None:
+            return pd.Series("N/A", index=lote.index)
+        d = lote[col]
+        d = converter_datas(d, dayfirst=self.dayfirst)   # cada data distinta do lote convertida uma vez
+        chave = (d.dt.year * 100 + d.dt.month).astype("Float64")
+        # formata só os meses distintos; NaT -> "NaT" (mesmo rótulo do to_period().astype(str))
+        rotulos = {k: ("NaT" if pd.isna(k) else f"{int(k) // 100}-{int(k) % 100:02d}")
+                   for k in chave.unique()}
+        return chave.map(rotulos).astype(object).fillna("NaT")
+
+    @staticmethod
+    def _receita(lote: pd.DataFrame) -> pd.Series:
+        col = _primeira(lote.columns, COLS_RECEITA)
+        if col:
+            return _numero(lote[col])
+        if all(c in lote.columns for c in ["preco_unitario", "quantidade"]):
+            return _numero(lote["preco_unitario"]) * _numero(lote["quantidade"])
+        if "lucro_liquido" in lote.columns:
+            return _numero(lote["lucro_liquido"])
+        return pd.Series(np.nan, index=lote.index)
+
+    def _somar(self, medida: str, parcial: pd.Series):
+        acc = self._somas.setdefault(medida, {})
+        for mes, v in parcial.items():
+            acc[mes] = acc.get(mes, 0.0) + float(v)
+
+    def consumir(self, lote: pd.DataFrame):
+        self.linhas += len(lote)
+        mes = self._yyyymm(lote)
+        valores = {"revenue": self._receita(lote)}
+        for c in COLS_SOMA:
+            if c in lote.columns:
+                valores[c] = _numero(lote[c])
+                if c not in self._medidas_extra:
+                    self._medidas_extra.append(c)
+        # preserva o tipo inteiro da soma (como no groupby().sum() da base inteira)
+        for c, v in valores.items():
+            self._inteiras[c] = self._inteiras.get(c, True) and pd.api.types.is_integer_dtype(v)
+        medidas = pd.DataFrame({"yyyymm": mes.to_numpy(),
+                                **{c: v.to_numpy(dtype=float, na_value=np.nan) for c, v in valores.items()}})
+
+        g = medidas.groupby("yyyymm", sort=False)
+        soma = g.sum()
+        for c in soma.columns:
+            self._somar(c, soma[c])
+
+        col_ped = _primeira(lote.columns, COLS_PEDIDO)
+        if col_ped:
+            hashes = pd.util.hash_array(lote[col_ped].astype("string").to_numpy(dtype=object, na_value=""))
+            validos = lote[col_ped].notna().to_numpy()
+            por_mes = pd.DataFrame({"yyyymm": mes.to_numpy()[validos], "h": hashes[validos]})
+            for m, grupo in por_mes.groupby("yyyymm", sort=False)["h"]:
+                novos = np.unique(grupo.to_numpy())
+                atual = self._pedidos.get(m)
+                self._pedidos[m] = novos if atual is None else np.union1d(atual, novos)
+            for m in soma.index:              # meses sem nenhum pedido válido
+                self._pedidos.setdefault(m, np.empty(0, dtype=np.uint64))
+        else:
+            if "orders" in lote.columns:
+                cont = pd.to_numeric(lote["orders"], errors="coerce").groupby(mes.to_numpy()).sum()
+            else:
+                cont = mes.value_counts(sort=False)
+            for m, n in cont.items():
+                self._contagem[m] = self._contagem.get(m, 0) + int(n)
+
+    # ---------- resultado ----------
+    def finalizar(self) -> pd.DataFrame:
+        meses = sorted(self._somas.get("revenue", {}))
+        kpi = pd.DataFrame({"yyyymm": meses})
+        kpi["revenue"] = [self._somas["revenue"][m] for m in meses]
+        if self._pedidos:
+            kpi["orders"] = [len(self._pedidos.get(m, ())) for m in meses]
+        else:
+            kpi["orders"] = [self._contagem.get(m, 0) for m in meses]
+        for c in self._medidas_extra:
+            kpi[c] = [self._somas[c].get(m, 0.0) for m in meses]
+        for c in ["revenue", *self._medidas_extra]:
+            if self._inteiras.get(c):
+                kpi[c] = kpi[c].round().astype("int64")
+        kpi["ticket_medio"] = kpi["revenue"] / kpi["orders"].clip(lower=1)
+        return kpi
+
+# =====================
+# Outliers / meses zerados
+# =====================
+
+def outliers_iqr(kpi: pd.DataFrame, col: str = "revenue", fator: float = 1.5) -> pd.DataFrame:
+    q1 = kpi[col].quantile(0.25)
+    q3 = kpi[col].quantile(0.75)
+    limite_sup = q3 + fator * (q3 - q1)
+    return kpi[kpi[col] > limite_sup].copy()
+
+def meses_receita_zero(kpi: pd.DataFrame, col: str = "revenue") -> pd.DataFrame:
+    return kpi[kpi[col].fillna(0) == 0].copy()
+
+def salvar_kpis(kpi: pd.DataFrame, out_dir: Path) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Grava kpi_mensal.csv, kpi_outliers.csv e kpi_receita_zero.csv."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    outliers = outliers_iqr(kpi)
+    meses_zero = meses_receita_zero(kpi)
+    kpi.to_csv(out_dir / "kpi_mensal.csv", index=False)
+    outliers.to_csv(out_dir / "kpi_outliers.csv", index=False)
+    meses_zero.to_csv(out_dir / "kpi_receita_zero.csv", index=False)
+    return outliers, meses_zero
+
+def kpi_mensal_parquet(paths, dayfirst: bool = True, lote: int = LOTE_LINHAS) -> pd.DataFrame:
+    """Lê só as colunas necessárias, lote a lote, e devolve o KPI mensal."""
+    dataset = ds.dataset([str(p) for p in paths] if isinstance(paths, (list, tuple)) else str(paths), format="parquet")
+    acc = AcumuladorKPIMensal(dayfirst=dayfirst)
+    for batch in dataset.to_batches(columns=colunas_necessarias(dataset.schema.names), batch_size=lote):
+        acc.consumir(batch.to_pandas())
+    return acc.finalizar()
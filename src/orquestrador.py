@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+orquestrador.py
+
+Roda o pipeline como um DAG de etapas com entradas/saídas explícitas:
+  prepare_data -> contrato_dados (gate) -> dimensoes (as 4, numa leitura) -> fato_enriquecido -> eda_quick -> exports
+- Impressão digital (fingerprint) de cada etapa = código do script (+ módulos
+  auxiliares e CODIGO_COMUM) + argumentos + tamanho/mtime de cada arquivo de entrada.
+  Se não mudou e as saídas existem, a etapa é PULADA.
+- Etapas independentes rodam em paralelo (subprocessos).
+- Tempo de cada etapa vai para o resumo e para data/.pipeline/execucoes.jsonl.
+
+Uso:
+  python src/orquestrador.py                       # tudo (pulando o que está em dia)
+  python src/orquestrador.py --alvo fato_enriquecido
+  python src/orquestrador.py --forcar dimensoes    # refaz a etapa (e as dependentes)
+  python src/orquestrador.py --listar
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / "src"
+ESTADO_DIR = BASE_DIR / "data" / ".pipeline"
+ESTADO_PATH = ESTADO_DIR / "estado.json"
+HISTORICO_PATH = ESTADO_DIR / "execucoes.jsonl"
+
+# =====================
+# DAG
+# =====================
+# script   : em src/
+# args     : argumentos do script
+# codigo   : módulos de src/ que também entram na impressão digital
+# entradas : arquivos/globs (relativos a BASE_DIR) lidos pela etapa
+# saidas   : arquivos/globs gerados (pelo menos um precisa existir para pular)
+# depende  : etapas que precisam terminar antes
+
+# módulos importados por todas as etapas (direto ou via export_stream): entram em toda impressão digital
+CODIGO_COMUM = ["instrumentacao.py"]
+
+ETAPAS = {
+    "prepare_data": {
+        "script": "prepare_data.py",
+        "codigo": ["regioes.py", "dedup_pedidos.py", "esteira.py", "esquema_tipado.py", "conversao_numerica.py"],
+        "entradas": ["data/raw/vendas.csv"],
+        "saidas": ["data/processed/vendas_completo.parquet", "data/processed/part_*.parquet"],
+    },
+    "contrato_dados": {
+        "script": "contrato_dados.py",
+        "codigo": ["datas_rapidas.py", "export_stream.py", "regioes.py", "conversao_numerica.py"],
+        "entradas": ["data/processed/part_*.parquet"],
+        "saidas": ["data/audit/contrato_resumo.csv"],
+        "depende": ["prepare_data"],
+    },
+    # as 4 dimensões numa só execução: uma leitura projetada do fato para todas
+    "dimensoes": {
+        "script": "build_dimensoes.py",
+        "args": ["--input", "data/processed", "--out-dir", "data/dimensoes"],
+        "codigo": ["build_dim_produto.py", "export_stream.py", "indice_dimensoes.py"],
+        "entradas": ["data/processed/part_*.parquet"],
+        "saidas": [f"data/dimensoes/{arquivo}.{ext}"
+                   for arquivo in ("dim_produto", "dim_centro_distribuicao", "dim_formapagto",
+                                   "dim_responsavelpedido")
+                   for ext in ("parquet", "idx.arrow")],
+        "depende": ["contrato_dados"],
+    },
+    "fato_enriquecido": {
+        "script": "build_fato_enriquecido.py",
+        "args": ["--fato", "data/processed/vendas_completo.parquet",
+                 "--dim-dir", "data/dimensoes", "--out-dir", "data/enriquecido"],
+        "codigo": ["indice_dimensoes.py", "resolver_nao_casados.py", "catalogo_dados.py", "datas_rapidas.py",
+                   "assinatura_parquet.py"],
+        "entradas": ["data/processed/vendas_completo.parquet", "data/dimensoes/dim_*.idx.arrow",
+                     "data/dimensoes/dim_*.csv"],
+        "saidas": ["data/enriquecido/vendas_completo_enriquecido.parquet",
+                   "data/enriquecido/vendas_completo_enriquecido.catalogo.json"],
+        "depende": ["dimensoes"],
+    },
+    "eda_quick": {
+        "script": "eda_quick.py",
+        "codigo": ["regioes.py", "perfil_colunar.py", "kpi_mensal.py", "datas_rapidas.py", "conversao_numerica.py",
+                   "export_stream.py"],
+        "entradas": ["data/enriquecido/vendas_completo_enriquecido.parquet"],   # uma entrada só: o fato enriquecido
+        "saidas": ["data/processed_enriched/dataset_enriquecido.parquet", "data/audit/kpi_mensal.csv"],
+        "depende": ["fato_enriquecido"],
+    },
+    # exports: leem o layout que o contrato_dados valida (colunas por candidatas em
+    # export_stream.COLUNAS_VENDAS, inglês ou o do prepare_data)
+    "export_csv": {
+        "script": "export_to_csv.py",
+        "codigo": ["export_stream.py", "datas_rapidas.py"],
+        "entradas": ["data/processed/part_*.parquet"],
+        "saidas": ["data/exports/*.csv"],
+        "depende": ["contrato_dados"],
+    },
+    "export_sac": {
+        "script": "gera_modelo_SAP_analytics.py",
+        "codigo": ["export_stream.py", "datas_rapidas.py"],
+        "entradas": ["data/processed/part_*.parquet"],
+        "saidas": ["data/exports_sac/fato_vendas.csv"],
+        "depende": ["contrato_dados"],
+    },
+    "export_enriquecido": {
+        "script": "export_enriquecido.py",
+        "codigo": ["export_stream.py"],
+        "entradas": ["data/processed_enriched/dataset_enriquecido.parquet"],
+        "saidas": ["data/processed_enriched/dataset_enriquecido_preview.csv"],
+        "depende": ["eda_quick"],
+    },
+    "roi_publicidade": {
+        "script": "roi_publicidade.py",
+        "entradas": ["data/audit/kpi_mensal.csv", "sample/Gastos_Publicidade_MelhoresCompras.csv"],
+        "saidas": ["data/insights/roi_publicidade_*.csv"],
+        "depende": ["eda_quick"],
+    },
+    "outliers_series": {
+        "script": "1_detectar_out_rec_mensal.py",
+        "codigo": ["datas_rapidas.py", "conversao_numerica.py"],
+        "entradas": ["data/enriquecido/vendas_completo_enriquecido.parquet"],
+        "saidas": ["data/audit/outliers_receita_series.csv"],
+        "depende": ["fato_enriquecido"],
+    },
+}
+
+# =====================
+# Impressões digitais
+# =====================
+
+def _arquivos(padroes: list[str]) -> list[Path]:
+    achados = set()
+    for p in padroes:
+        achados.update(BASE_DIR.glob(p))
+    return sorted(a for a in achados if a.is_file())
+
+def fingerprint(nome: str) -> str:
+    """Código + argumentos + (caminho, tamanho, mtime) das entradas. Não lê o conteúdo dos dados."""
+    etapa = ETAPAS[nome]
+    h = hashlib.sha256()
+    for mod in [etapa["script"], *CODIGO_COMUM, *etapa.get("codigo", [])]:
+        p = SRC_DIR / mod
+        h.update(mod.encode())
+        h.update(p.read_bytes() if p.exists() else b"<ausente>")
+    h.update(json.dumps(etapa.get("args", [])).encode())
+    for a in _arquivos(etapa["entradas"]):
+        st = a.stat()
+        h.update(f"{a.relative_to(BASE_DIR).as_posix()}|{st.st_size}|{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+def saidas_existem(nome: str) -> bool:
+    return all(_arquivos([p]) for p in ETAPAS[nome]["saidas"])
+
+def carregar_estado() -> dict:
+    if ESTADO_PATH.exists():
+        return json.loads(ESTADO_PATH.read_text(encoding="utf-8"))
+    return {}
+
+def salvar_estado(estado: dict):
+    ESTADO_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ESTADO_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(estado, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(ESTADO_PATH)
+
+# =====================
+# Seleção de etapas
+# =====================
+
+def ancestrais(alvos: list[str]) -> set[str]:
+    vistos, pilha = set(), list(alvos)
+    while pilha:
+        n = pilha.pop()
+        if n in vistos:
+            continue
+        vistos.add(n)
+        pilha.extend(ETAPAS[n].get("depende", []))
+    return vistos
+
+def descendentes(origens: list[str]) -> set[str]:
+    out = set(origens)
+    mudou = True
+    while mudou:
+        mudou = False
+        for n, e in ETAPAS.items():
+            if n not in out and out & set(e.get("depende", [])):
+                out.add(n)
+                mudou = True
+    return out
+
+def ordem_topologica(etapas: set[str]) -> list[str]:
+    ordem, feitos = [], set()
+    while len(ordem) < len(etapas):
+        prontos = [n for n in ETAPAS if n in etapas and n not in feitos
+                   and set(ETAPAS[n].get("depende", [])) & etapas <= feitos]
+        if not prontos:
+            raise ValueError(f"Ciclo no DAG entre: {sorted(etapas - feitos)}")
+        ordem += prontos
+        feitos.update(prontos)
+    return ordem
+
+# =====================
+# Execução
+# =====================
+
+def _rodar(nome: str) -> dict:
+    etapa = ETAPAS[nome]
+    cmd = [sys.executable, str(SRC_DIR / etapa["script"]), *etapa.get("args", [])]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+    return {
+        "etapa": nome,
+        "status": "ok" if proc.returncode == 0 else "erro",
+        "segundos": round(time.perf_counter() - t0, 3),
+        "codigo_saida": proc.returncode,
+        "stdout": proc.stdout,
+        "stderr": proc.stderr,
+    }
+
+def executar(alvos=None, forcar=None, workers: int = 4, dry_run: bool = False, verboso: bool = False) -> list[dict]:
+    desconhecidas = (set(alvos or []) | set(forcar or [])) - ETAPAS.keys()
+    if desconhecidas:
+        raise ValueError(f"Etapas desconhecidas: {sorted(desconhecidas)}. Opções: {list(ETAPAS)}")
+    selecionadas = ancestrais(alvos or list(ETAPAS))
+    forcadas = descendentes(forcar or []) & selecionadas
+    ordem = ordem_topologica(selecionadas)
+
+    estado = carregar_estado()
+    resultados: dict[str, dict] = {}
+    execucao = datetime.now().isoformat(timespec="seconds")
+
+    def _pode_pular(nome: str) -> tuple[bool, str]:
+        fp = fingerprint(nome)
+        anterior = estado.get(nome, {})
+        if nome in forcadas:
+            return False, fp
+        return anterior.get("fingerprint") == fp and saidas_existem(nome), fp
+
+    pendentes = list(ordem)
+    rodando = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pendentes or rodando:
+            # dispara tudo o que já tem as dependências resolvidas
+            for nome in list(pendentes):
+                deps = [d for d in ETAPAS[nome].get("depende", []) if d in selecionadas]
+                if any(d not in resultados for d in deps):
+                    continue
+                pendentes.remove(nome)
+                falhas = [d for d in deps if resultados[d]["status"] in ("erro", "bloqueada")]
+                if falhas:
+                    resultados[nome] = {"etapa": nome, "status": "bloqueada", "segundos": 0.0,
+                                        "motivo": f"dependência com erro: {', '.join(falhas)}"}
+                    print(f"[PULO] {nome}: bloqueada ({', '.join(falhas)})")
+                    continue
+                pular, fp = _pode_pular(nome)
+                if dry_run and any(resultados[d]["status"] == "rodaria" for d in deps):
+                    pular = False          # a dependência mudaria as entradas desta etapa
+                if pular or dry_run:
+                    status = "em_dia" if pular else "rodaria"
+                    resultados[nome] = {"etapa": nome, "status": status, "segundos": 0.0, "fingerprint": fp}
+                    print(f"[{'PULO' if pular else 'PLANO'}] {nome}: {'em dia' if pular else 'seria executada'}")
+                    continue
+                print(f"[INFO] {nome}: iniciando")
+                rodando[pool.submit(_rodar, nome)] = (nome, fp)
+
+            if not rodando:
+                continue
+            prontos, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for fut in prontos:
+                nome, fp_inicio = rodando.pop(fut)
+                r = fut.result()
+                if verboso or r["status"] == "erro":
+                    print(r["stdout"].rstrip())
+                    print(r["stderr"].rstrip(), file=sys.stderr)
+                if r["status"] == "ok":
+                    # fingerprint do INÍCIO: entrada alterada durante a execução => roda de novo
+                    estado[nome] = {"fingerprint": fp_inicio, "ultima_execucao": execucao,
+                                    "segundos": r["segundos"]}
+                    salvar_estado(estado)
+                print(f"[{'OK' if r['status'] == 'ok' else 'ERRO'}] {nome}: {r['segundos']:.1f}s")
+                resultados[nome] = r
+
+    saida = [resultados[n] for n in ordem]
+    if not dry_run:
+        ESTADO_DIR.mkdir(parents=True, exist_ok=True)
+        with open(HISTORICO_PATH, "a", encoding="utf-8") as f:
+            for r in saida:
+                f.write(json.dumps({"execucao": execucao, **{k: v for k, v in r.items()
+                                                             if k not in ("stdout", "stderr")}},
+                                   ensure_ascii=False) + "\n")
+    imprimir_resumo(saida)
+    return saida
+
+def imprimir_resumo(resultados: list[dict]):
+    print("\n=== Resumo do pipeline ===")
+    for r in resultados:
+        print(f"  {r['etapa']:<26} {r['status']:<10} {r.get('segundos', 0.0):>8.1f}s")
+    total = sum(r.get("segundos", 0.0) for r in resultados)
+    print(f"  {'soma das etapas':<26} {'':<10} {total:>8.1f}s")
+
+# =====================
+# CLI
+# =====================
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Orquestrador do pipeline (DAG com cache por fingerprint).")
+    ap.add_argument("--alvo", nargs="*", default=None, help="Etapa(s) final(is); roda também as dependências.")
+    ap.add_argument("--forcar", nargs="*", default=None, help="Refaz estas etapas (e as que dependem delas).")
+    ap.add_argument("--workers", type=int, default=4, help="Etapas simultâneas.")
+    ap.add_argument("--dry-run", action="store_true", help="Só mostra o que seria executado.")
+    ap.add_argument("--verboso", action="store_true", help="Mostra a saída de cada script.")
+    ap.add_argument("--listar", action="store_true", help="Lista as etapas e dependências.")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.listar:
+        for n in ordem_topologica(set(ETAPAS)):
+            deps = ", ".join(ETAPAS[n].get("depende", [])) or "-"
+            print(f"{n:<26} <- {deps}")
+        return
+    resultados = executar(args.alvo, args.forcar, args.workers, args.dry_run, args.verboso)
+    if any(r["status"] in ("erro", "bloqueada") for r in resultados):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
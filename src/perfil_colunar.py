@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+perfil_colunar.py
+
+Perfil de colunas (nulos, distintos, top-k, min/max, exemplo) em UMA passada,
+usando kernels do Arrow (value_counts, min_max) lote a lote.
+- Lê row groups do Parquet e combina perfis parciais (merge) à medida que
+  ficam prontos, inclusive em paralelo.
+- Distintos exatos (contagem completa: memória cresce com os valores distintos)
+  ou aproximados (sketch KMV + top-k limitado: memória limitada, serve para bases
+  maiores que a memória). `exatas` = colunas de baixa cardinalidade contadas
+  exatamente mesmo no modo aproximado.
+
+Uso:
+  python src/perfil_colunar.py --input data/processed_enriched/dataset_enriquecido.parquet ^
+    --out data/processed_enriched/dataset_enriquecido_schema.csv --modo aproximado --exatas estado,regiao_pais
+"""
+
+import argparse
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+TOP_K = 5
+KMV_K = 4096             # tamanho do sketch de distintos aproximados
+MAX_CONTAGENS = 50_000   # modo aproximado: mantém só os N valores mais frequentes
+
+# =====================
+# Perfil parcial de uma coluna
+# =====================
+
+def _hash64(valores: list) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(valores, dtype=object)).astype(np.uint64)
+
+class PerfilColuna:
+    def __init__(self, nome: str, tipo: pa.DataType, modo: str = "exato"):
+        if modo not in ("exato", "aproximado"):
+            raise ValueError("modo deve ser 'exato' ou 'aproximado'.")
+        self.nome = nome
+        self.tipo = tipo
+        self.modo = modo
+        self.n_linhas = 0
+        self.n_nulos = 0
+        self.minimo = None
+        self.maximo = None
+        self.exemplo = None
+        self.contagens: dict = {}
+        self._kmv: list[int] = []      # heap de máximos (negativos) com os K menores hashes
+        self._kmv_set: set[int] = set()
+
+    # ---------- atualização por lote ----------
+    def atualizar(self, arr):
+        if isinstance(arr, pa.ChunkedArray):
+            arr = arr.combine_chunks()
+        if pa.types.is_dictionary(arr.type):
+            arr = arr.cast(arr.type.value_type)
+
+        self.n_linhas += len(arr)
+        self.n_nulos += arr.null_count
+        validos = len(arr) - arr.null_count
+        if validos == 0:
+            return
+
+        if self.exemplo is None:
+            self.exemplo = pc.drop_null(arr.slice(0, min(len(arr), arr.null_count + 1))).to_pylist()[0]
+
+        try:
+            mm = pc.min_max(arr)
+            self._min_max(mm["min"].as_py(), mm["max"].as_py())
+        except (pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            pass  # tipos sem ordem (struct, list...)
+
+        vc = pc.value_counts(arr)
+        valores = vc.field("values").to_pylist()
+        contagens = vc.field("counts").to_pylist()
+        self._somar(zip(valores, contagens))
+        if self.modo == "aproximado":
+            self._kmv_add(_hash64([v for v in valores if v is not None]))
+
+    def _min_max(self, lo, hi):
+        if lo is None:
+            return
+        self.minimo = lo if self.minimo is None else min(self.minimo, lo)
+        self.maximo = hi if self.maximo is None else max(self.maximo, hi)
+
+    def _somar(self, pares):
+        c = self.contagens
+        for v, n in pares:
+            if v is not None:
+                c[v] = c.get(v, 0) + n
+        if self.modo == "aproximado" and len(c) > 2 * MAX_CONTAGENS:
+            self.contagens = dict(heapq.nlargest(MAX_CONTAGENS, c.items(), key=lambda kv: kv[1]))
+
+    def _kmv_add(self, hashes: np.ndarray):
+        if hashes.size == 0:
+            return
+        hashes = np.unique(hashes)[:KMV_K]
+        heap, vistos = self._kmv, self._kmv_set
+        for h in hashes.tolist():
+            if h in vistos:
+                continue
+            if len(heap) < KMV_K:
+                heapq.heappush(heap, -h)
+                vistos.add(h)
+            elif h < -heap[0]:
+                vistos.discard(-heapq.heappushpop(heap, -h))
+                vistos.add(h)
+
+    # ---------- combinação de perfis parciais ----------
+    def merge(self, outro: "PerfilColuna") -> "PerfilColuna":
+        self.n_linhas += outro.n_linhas
+        self.n_nulos += outro.n_nulos
+        if self.exemplo is None:
+            self.exemplo = outro.exemplo
+        self._min_max(outro.minimo, outro.maximo)
+        self._somar(outro.contagens.items())
+        if self.modo == "aproximado":
+            self._kmv_add(np.array([-h for h in outro._kmv], dtype=np.uint64))
+        return self
+
+    # ---------- resultados ----------
+    @property
+    def n_distintos(self) -> int:
+        if self.modo == "exato":
+            return len(self.contagens)
+        if len(self._kmv) < KMV_K:
+            return len(self._kmv)  # menos distintos que o sketch: contagem exata
+        kth = -self._kmv[0] / float(2**64)
+        return int(round((KMV_K - 1) / kth))
+
+    def top(self, k: int = TOP_K) -> list[tuple]:
+        return heapq.nlargest(k, self.contagens.items(), key=lambda kv: kv[1])
+
+    def resumo(self) -> dict:
+        return {
+            "coluna": self.nome,
+            "dtype": str(self.tipo),
+            "n_linhas": self.n_linhas,
+            "n_nulos": self.n_nulos,
+            "n_distintos": self.n_distintos,
+            "exemplo": "" if self.exemplo is None else self.exemplo,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "top": "; ".join(f"{v} ({n})" for v, n in self.top()),
+        }
+
+# =====================
+# Perfil de tabelas / Parquet
+# =====================
+
+def perfilar_lotes(lotes, schema: pa.Schema, modo: str = "exato", exatas=()) -> dict[str, PerfilColuna]:
+    """Perfil de uma sequência de RecordBatch/Table com o mesmo schema."""
+    perfis = {f.name: PerfilColuna(f.name, f.type, "exato" if f.name in exatas else modo) for f in schema}
+    for lote in lotes:
+        for nome in lote.schema.names:
+            perfis[nome].atualizar(lote.column(nome))
+    return perfis
+
+def combinar(parciais: list[dict[str, PerfilColuna]]) -> dict[str, PerfilColuna]:
+    total = None
+    for p in parciais:
+        if total is None:
+            total = p
+            continue
+        for nome, perfil in p.items():
+            if nome in total:
+                total[nome].merge(perfil)
+            else:
+                total[nome] = perfil
+    return total or {}
+
+def perfilar_parquet(paths, colunas=None, modo: str = "exato", workers: int | None = None,
+                     exatas=()) -> dict[str, PerfilColuna]:
+    """Perfila um ou mais Parquet lendo row group a row group (em paralelo) e combinando os parciais."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    tarefas = []
+    schema = None
+    for p in paths:
+        meta = pq.ParquetFile(p)
+        sch = meta.schema_arrow if colunas is None else pa.schema([meta.schema_arrow.field(c) for c in colunas
+                                                                  if c in meta.schema_arrow.names])
+        schema = schema or sch
+        tarefas += [(p, rg, sch) for rg in range(meta.num_row_groups)]
+
+    def _um_row_group(tarefa):
+        path, rg, sch = tarefa
+        tabela = pq.ParquetFile(path).read_row_group(rg, columns=sch.names)
+        return perfilar_lotes([tabela], sch, modo, exatas)
+
+    # cada parcial é combinado assim que sai (não guarda um perfil por row group)
+    total = None
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for parcial in pool.map(_um_row_group, tarefas):
+            total = combinar([total, parcial]) if total is not None else parcial
+    if total is None and schema is not None:
+        return perfilar_lotes([], schema, modo, exatas)
+    return total or {}
+
+def para_dataframe(perfis: dict[str, PerfilColuna]) -> pd.DataFrame:
+    return pd.DataFrame([p.resumo() for p in perfis.values()]).sort_values("coluna")
+
+# =====================
+# CLI
+# =====================
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Perfil de colunas de Parquet em uma única passada.")
+    ap.add_argument("--input", required=True, nargs="+", help="Arquivo(s) parquet.")
+    ap.add_argument("--out", default=None, help="CSV de saída com o perfil (opcional).")
+    ap.add_argument("--colunas", default=None, help="Colunas separadas por vírgula (padrão: todas).")
+    ap.add_argument("--modo", choices=["exato", "aproximado"], default="exato",
+                    help="Distintos exatos ou aproximados (sketch KMV).")
+    ap.add_argument("--exatas", default=None,
+                    help="Colunas contadas exatamente mesmo no modo aproximado (vírgula).")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    colunas = [c.strip() for c in args.colunas.split(",")] if args.colunas else None
+    exatas = [c.strip() for c in args.exatas.split(",")] if args.exatas else ()
+    perfil = para_dataframe(perfilar_parquet(args.input, colunas=colunas, modo=args.modo, exatas=exatas))
+    print(perfil.to_string(index=False))
+    if args.out:
+        perfil.to_csv(args.out, index=False, encoding="utf-8-sig")
+        print(f"[OK] Perfil salvo em: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 # src/prepare_data.py
 from pathlib import Path
-import re
+import time
 import pandas as pd
-from unidecode import unidecode
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dedup_pedidos import DeduplicadorPedidos
+from esquema_tipado import tipar_partes
+from esteira import executar_esteira, formatar_estatisticas
+from instrumentacao import anexar, etapa, iniciar, lotes, medir
+from regioes import nome_para_uf, derivar_regiao_pais
 
 # ==============================================
 # Objetivo
@@ -13,7 +20,10 @@ from unidecode import unidecode
 #     * regiao_pais (a partir de UF/pais)
 #     * garantir: centro_distribuicao, responsavelpedido, cod_pedido
 # - Calcular quantidade e total quando ausentes
+# - Remover linhas repetidas ENTRE chunks (dedup_pedidos.py; relatório em data/audit)
+# - Tipar medidas e IDs no fim (esquema_tipado.py): float32/inteiros pequenos no Parquet
 # - Salvar em chunks (part_XXX.parquet) e também um único arquivo combinado
+# - CSV completo apenas sob demanda (src/export_stream.py)
 # ==============================================
 
 # --- Paths independentes do working dir ---
@@ -22,58 +32,30 @@ DATA_DIR = BASE_DIR / "data"
 RAW = DATA_DIR / "raw" / "vendas.csv"  # ajuste se necessário
 PROC = DATA_DIR / "processed"
 SAMP = DATA_DIR / "sample"
+AUDIT = DATA_DIR / "audit"
 PROC.mkdir(parents=True, exist_ok=True)
 SAMP.mkdir(parents=True, exist_ok=True)
 
 ENCODING = "latin1"    # ajuste se necessário
 CHUNKSIZE = 500_000    # ajuste conforme memória disponível
+DEDUP = "remover"      # linhas idênticas já vistas: "remover" | "marcar" | "desligado"
 
-# =====================
-# Mapeamentos auxiliares
-# =====================
-REGIOES_BRASIL_POR_UF = {
-    "AC":"Norte","AP":"Norte","AM":"Norte","PA":"Norte","RO":"Norte","RR":"Norte","TO":"Norte",
-    "AL":"Nordeste","BA":"Nordeste","CE":"Nordeste","MA":"Nordeste","PB":"Nordeste","PE":"Nordeste",
-    "PI":"Nordeste","RN":"Nordeste","SE":"Nordeste",
-    "DF":"Centro-Oeste","GO":"Centro-Oeste","MT":"Centro-Oeste","MS":"Centro-Oeste",
-    "ES":"Sudeste","MG":"Sudeste","RJ":"Sudeste","SP":"Sudeste",
-    "PR":"Sul","RS":"Sul","SC":"Sul",
-}
-
-UF_POR_ESTADO = {
-    "acre":"AC","amapa":"AP","amazonas":"AM","para":"PA","rondonia":"RO","roraima":"RR","tocantins":"TO",
-    "alagoas":"AL","bahia":"BA","ceara":"CE","maranhao":"MA","paraiba":"PB","pernambuco":"PE",
-    "piaui":"PI","rio grande do norte":"RN","sergipe":"SE",
-    "distrito federal":"DF","goias":"GO","mato grosso":"MT","mato grosso do sul":"MS",
-    "espirito santo":"ES","minas gerais":"MG","rio de janeiro":"RJ","sao paulo":"SP",
-    "parana":"PR","rio grande do sul":"RS","santa catarina":"SC",
-}
-
-REGIOES_POR_PAIS = {
-    "brazil": "LATAM", "brasil": "LATAM",
-    "argentina": "LATAM", "chile": "LATAM", "uruguay": "LATAM", "uruguai": "LATAM",
-    "united states": "NA", "usa": "NA", "eua": "NA",
-    "germany": "EMEA", "deutschland": "EMEA", "alemanha": "EMEA",
-}
+# Esteira ler -> process_chunk -> gravar (ver esteira.py); GRAVADORES = 0 -> sequencial
+PREFETCH = 2           # chunks lidos à frente do process_chunk
+FILA_GRAVACAO = 2      # chunks processados aguardando gravação
+GRAVADORES = 2         # threads gravando parquet + amostra
 
 # =====================
 # Funções utilitárias
 # =====================
 
-def _normalize_spaces_text(text: str) -> str:
-    """Troca NBSP por espaço, colapsa múltiplos espaços e aplica strip."""
-    if text is None or (isinstance(text, float) and pd.isna(text)):
-        return text
-    s = str(text).replace("\u00A0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
 def _normalize_series(s: pd.Series) -> pd.Series:
     s = s.astype("string")
     s = s.str.replace("\u00A0", " ", regex=False)
     s = s.str.replace(r"\s+", " ", regex=True).str.strip()
     return s
 
+@medir()
 def _clean_all_text_cols(df: pd.DataFrame) -> pd.DataFrame:
     """Normaliza **todas** as colunas de texto do chunk (NBSP, espaços duplicados, trim)."""
     for c in df.columns:
@@ -81,6 +63,7 @@ def _clean_all_text_cols(df: pd.DataFrame) -> pd.DataFrame:
             df[c] = _normalize_series(df[c])
     return df
 
+@medir()
 def _to_number(s: pd.Series) -> pd.Series:
     """Converte strings monetárias/numéricas para float.
     - remove símbolos (R$, $), espaços e NBSP
@@ -100,14 +83,7 @@ def _to_number(s: pd.Series) -> pd.Series:
 
     return pd.to_numeric(s, errors="coerce")
 
-def _nome_to_uf(nome: str):
-    """Mapeia nome do estado -> UF, com unidecode e colapso de espaços."""
-    if pd.isna(nome):
-        return pd.NA
-    key = unidecode(str(nome))
-    key = re.sub(r"\s+", " ", key).strip().lower()
-    return UF_POR_ESTADO.get(key, pd.NA)
-
+@medir()
 def _derive_estado(df: pd.DataFrame) -> pd.Series:
     """Produz coluna 'estado' usando prioridade: UF -> nome do estado."""
     uf_col = None
@@ -126,15 +102,17 @@ def _derive_estado(df: pd.DataFrame) -> pd.Series:
                 nome_col = c
                 break
         if nome_col is not None:
-            nomes_norm = df[nome_col].map(_normalize_spaces_text)
-            est = nomes_norm.map(_nome_to_uf).astype("string")
+            # normaliza só os nomes distintos (unidecode + colapso de espaços)
+            est = nome_para_uf(df[nome_col])
         else:
             est = pd.Series(pd.NA, index=df.index, dtype="string")
     # higieniza (mesmo sendo UF)
     est = _normalize_series(est)
     return est
 
+@medir()
 def _derive_regiao_pais(df: pd.DataFrame, estado_series: pd.Series) -> pd.Series:
+    """regiao_pais a partir de UF/pais (vetorizado, ver regioes.py)."""
     # Detecta coluna de país
     pais_col = None
     for c in ["pais", "Pais", "country", "Country"]:
@@ -145,25 +123,11 @@ def _derive_regiao_pais(df: pd.DataFrame, estado_series: pd.Series) -> pd.Series
     if pais_col is None and estado_series.isna().all():
         return pd.Series("N/A", index=df.index, dtype="string")
 
-    # normaliza texto do país para evitar ruído de espaço
-    pais_vals = df[pais_col].map(_normalize_spaces_text) if pais_col else None
-
-    def _calc(i):
-        uf = estado_series.iat[i]
-        pais_val = pais_vals.iat[i] if pais_col else None
-        pais_key = unidecode(str(pais_val)).strip().lower() if pd.notna(pais_val) else None
-
-        if pais_key in ("brazil", "brasil"):
-            if pd.notna(uf):
-                return REGIOES_BRASIL_POR_UF.get(str(uf), "Brasil - Desconhecida")
-            return "Brasil - N/A"
-        if pais_key:
-            return REGIOES_POR_PAIS.get(pais_key, "Outras Regiões")
-        return "N/A"
-
-    reg = pd.Series([_calc(i) for i in range(len(df))], index=df.index, dtype="string")
-    reg = _normalize_series(reg)
-    return reg
+    return derivar_regiao_pais(
+        df.index,
+        pais=df[pais_col] if pais_col else None,
+        uf=estado_series,
+    )
 
 def _choose_col(df: pd.DataFrame, options: list[str]) -> str | None:
     """Retorna o primeiro nome de coluna existente na ordem dada."""
@@ -247,51 +211,91 @@ def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 # Main
 # =====================
 
-def main():
-    if not RAW.exists():
-        raise FileNotFoundError(f"Arquivo CSV não encontrado: {RAW}")
-
+def abrir_leitor(path=RAW, chunksize: int = CHUNKSIZE):
+    """Leitor em chunks do CSV bruto (também usado por bench/bench_pipeline.py)."""
     # Lê TODAS as colunas (sep=None tenta detectar ; ou ,)
-    reader = pd.read_csv(
-        RAW,
+    return pd.read_csv(
+        path,
         encoding=ENCODING,
         sep=None,
         engine="python",
-        chunksize=CHUNKSIZE,
+        chunksize=chunksize,
         on_bad_lines="skip",
         dtype=str,   # preserva valores como string; conversões ficam para etapas posteriores
     )
 
-    parts = []
-    for i, chunk in enumerate(reader, 1):
-        chunk = process_chunk(chunk)
+def main():
+    iniciar("prepare_data")
+    if not RAW.exists():
+        raise FileNotFoundError(f"Arquivo CSV não encontrado: {RAW}")
+
+    reader = abrir_leitor(RAW)
+    dedup = DeduplicadorPedidos(modo=DEDUP)
 
+    def _transformar(i, chunk):
+        with etapa("process_chunk", entrada=len(chunk)) as m:
+            chunk = process_chunk(chunk)
+            m.saida(len(chunk))
+        # transformar roda na thread atual, na ordem dos chunks -> "já visto" é determinístico
+        with etapa("dedup", entrada=len(chunk)) as m:
+            chunk = dedup.processar(i, chunk)
+            m.saida(len(chunk))
+        return chunk
+
+    def _gravar(i, chunk):
         # salva partições
         out_part = PROC / f"part_{i:03d}.parquet"
-        chunk.to_parquet(out_part, index=False, engine="pyarrow")
-        parts.append(out_part)
+        with etapa("gravar_parte", entrada=len(chunk)):
+            chunk.to_parquet(out_part, index=False, engine="pyarrow")
 
         # salva também uma amostra
         if len(chunk) > 0:
-            amostra = chunk.sample(min(10_000, len(chunk)), random_state=42)
-            amostra.to_parquet(SAMP / f"vendas_sample_{i:03d}.parquet", index=False)
-
-    # Gera um único parquet combinado
+            with etapa("gravar_amostra"):
+                amostra = chunk.sample(min(10_000, len(chunk)), random_state=42)
+                amostra.to_parquet(SAMP / f"vendas_sample_{i:03d}.parquet", index=False)
+        return out_part
+
+    # leitura, transformação e gravação sobrepostas (filas limitadas = no máx. ~6 chunks em memória)
+    t0 = time.perf_counter()
+    try:
+        stats, saidas = executar_esteira(lotes(reader, "ler_csv"), _transformar, _gravar,
+                                         prefetch=PREFETCH, fila_gravacao=FILA_GRAVACAO, gravadores=GRAVADORES)
+    finally:
+        dedup.fechar()
+    parede = time.perf_counter() - t0
+    anexar("esteira", {"parede_s": round(parede, 4), "etapas": [s.como_dict() for s in stats]})
+    print("[INFO] Esteira (faminta = esperando entrada; bloqueada = esperando fila cheia):")
+    print(formatar_estatisticas(stats, parede))
+    parts = [p for _, p in saidas]
+
+    if DEDUP != "desligado":
+        resumo = dedup.resumo()
+        anexar("dedup", {"modo": DEDUP, **resumo.drop(columns="chunk").sum().astype(int).to_dict()})
+        dedup.salvar_relatorio(AUDIT)
+        print(f"[INFO] Duplicatas ({DEDUP}): {int(resumo['linhas_duplicadas'].sum()):,} linhas idênticas, "
+              f"{int(resumo['chaves_repetidas'].sum()):,} chaves cod_pedido+produto repetidas -> {AUDIT}")
+
+    # Tipa as partes (tipo único por coluna em todas) e grava o parquet combinado parte a parte
     if parts:
-        dfs = [pd.read_parquet(p) for p in parts]
-        combinado = pd.concat(dfs, ignore_index=True)
         combinado_path = PROC / "vendas_completo.parquet"
-        combinado.to_parquet(combinado_path, index=False, engine="pyarrow")
-        # salva também como CSV completo
-        csv_path = PROC / "vendas_completo.csv"
-        combinado.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        with etapa("tipar_combinar") as m:
+            tipos, relatorio = tipar_partes(parts, combinado_path)
+            m.saida(pq.ParquetFile(combinado_path).metadata.num_rows)
+        if len(relatorio):
+            AUDIT.mkdir(parents=True, exist_ok=True)
+            relatorio.to_csv(AUDIT / "tipos_compactos.csv", index=False, encoding="utf-8-sig")
+            print("[INFO] Esquema tipado (memória por coluna, MB):")
+            print(relatorio[["coluna", "tipo_antes", "tipo_depois", "invalidos", "pandas_antes_mb", "pandas_depois_mb",
+                             "parquet_antes_mb", "parquet_depois_mb"]].to_string(index=False))
+        # CSV completo não é mais gravado aqui: gere sob demanda com src/export_stream.py
         # amostra geral
-        combinado.head(50_000).to_parquet(SAMP / "vendas_sample.parquet", index=False)
-        combinado.head(50_000).to_csv(SAMP / "vendas_sample.csv", index=False, encoding="utf-8-sig")
+        amostra = ds.dataset(combinado_path, format="parquet").head(50_000).to_pandas()
+        amostra.to_parquet(SAMP / "vendas_sample.parquet", index=False)
+        amostra.to_csv(SAMP / "vendas_sample.csv", index=False, encoding="utf-8-sig")
         print("[OK] Processamento concluído.")
         print(f" - Partições: {PROC}")
         print(f" - Parquet combinado: {combinado_path}")
-        print(f" - CSV combinado: {csv_path}")
+        print(f" - CSV sob demanda: python src/export_stream.py --input {combinado_path} --out <arquivo.csv>")
         print(f" - Amostras: {SAMP}")
     else:
         print("[WARN] Nenhum chunk processado.")
@@ -0,0 +1,100 @@
+# src/regioes.py
+import re
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+# ==============================================
+# Derivação vetorizada de UF e regiao_pais
+# - Compartilhada por prepare_data.py e eda_quick.py
+# - Normaliza apenas os valores DISTINTOS (factorize) e devolve por índice:
+#   o custo é O(distintos) em Python + O(linhas) em NumPy
+# ==============================================
+
+REGIOES_BRASIL_POR_UF = {
+    "AC":"Norte","AP":"Norte","AM":"Norte","PA":"Norte","RO":"Norte","RR":"Norte","TO":"Norte",
+    "AL":"Nordeste","BA":"Nordeste","CE":"Nordeste","MA":"Nordeste","PB":"Nordeste","PE":"Nordeste",
+    "PI":"Nordeste","RN":"Nordeste","SE":"Nordeste",
+    "DF":"Centro-Oeste","GO":"Centro-Oeste","MT":"Centro-Oeste","MS":"Centro-Oeste",
+    "ES":"Sudeste","MG":"Sudeste","RJ":"Sudeste","SP":"Sudeste",
+    "PR":"Sul","RS":"Sul","SC":"Sul",
+}
+
+UF_POR_ESTADO = {
+    "acre":"AC","amapa":"AP","amazonas":"AM","para":"PA","rondonia":"RO","roraima":"RR","tocantins":"TO",
+    "alagoas":"AL","bahia":"BA","ceara":"CE","maranhao":"MA","paraiba":"PB","pernambuco":"PE",
+    "piaui":"PI","rio grande do norte":"RN","sergipe":"SE",
+    "distrito federal":"DF","goias":"GO","mato grosso":"MT","mato grosso do sul":"MS",
+    "espirito santo":"ES","minas gerais":"MG","rio de janeiro":"RJ","sao paulo":"SP",
+    "parana":"PR","rio grande do sul":"RS","santa catarina":"SC",
+}
+
+# chaves já normalizadas (unidecode + minúsculas)
+REGIOES_POR_PAIS = {
+    "brazil": "LATAM", "brasil": "LATAM",
+    "argentina": "LATAM", "chile": "LATAM", "uruguay": "LATAM", "uruguai": "LATAM",
+    "united states": "NA", "usa": "NA", "eua": "NA",
+    "germany": "EMEA", "deutschland": "EMEA", "alemanha": "EMEA",
+}
+
+PAISES_BRASIL = ("brazil", "brasil")
+
+def _chave(txt) -> str:
+    """NBSP/espaços colapsados, sem acento, minúsculo."""
+    s = unidecode(str(txt).replace("\u00A0", " "))
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+def mapear_distintos(s: pd.Series, func) -> pd.Series:
+    """Aplica `func` só nos valores distintos não nulos de `s` e espalha o resultado."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    valores = np.array([func(u) for u in uniques] + [pd.NA], dtype=object)
+    return pd.Series(valores[codes], index=s.index, dtype="string")  # código -1 -> pd.NA
+
+def nome_para_uf(nomes: pd.Series) -> pd.Series:
+    """Nome do estado por extenso -> UF (pd.NA quando não reconhecido)."""
+    return mapear_distintos(nomes, lambda n: UF_POR_ESTADO.get(_chave(n), pd.NA))
+
+def _regiao(pais_key, uf, assumir_brasil_sem_pais: bool) -> str:
+    """Regra para UM par (país normalizado, UF maiúscula)."""
+    if pais_key in PAISES_BRASIL:
+        if uf is not None:
+            return REGIOES_BRASIL_POR_UF.get(uf, "Brasil - Desconhecida")
+        return "Brasil - N/A"
+    if pais_key:
+        return REGIOES_POR_PAIS.get(pais_key, "Outras Regiões")
+    if uf is not None and assumir_brasil_sem_pais:
+        return REGIOES_BRASIL_POR_UF.get(uf, "Brasil - Desconhecida")
+    return "N/A"
+
+def derivar_regiao_pais(
+    index: pd.Index,
+    pais: pd.Series | None = None,
+    uf: pd.Series | None = None,
+    *,
+    assumir_brasil_sem_pais: bool = False,
+) -> pd.Series:
+    """Região por linha:
+    - país Brasil -> região da UF ("Brasil - Desconhecida" se UF fora do mapa, "Brasil - N/A" sem UF)
+    - outro país  -> REGIOES_POR_PAIS ("Outras Regiões" se não mapeado)
+    - sem país    -> "N/A" (ou a região da UF, se assumir_brasil_sem_pais=True)
+    A regra roda uma vez por par distinto (país, UF); as linhas recebem o resultado por índice.
+    """
+    n = len(index)
+    vazio = (np.zeros(n, dtype=np.intp), np.array([], dtype=object))
+    cod_p, pais_u = pd.factorize(pais, use_na_sentinel=True) if pais is not None else vazio
+    cod_u, uf_u = pd.factorize(uf, use_na_sentinel=True) if uf is not None else vazio
+
+    # normaliza só os distintos; posição extra (-1) = nulo
+    pais_keys = [_chave(p) or None for p in pais_u] + [None]
+    ufs = [str(u).strip().upper() or None for u in uf_u] + [None]
+    cod_p = np.where(cod_p < 0, len(pais_u), cod_p)
+    cod_u = np.where(cod_u < 0, len(uf_u), cod_u)
+
+    # pares distintos (país, UF) -> região
+    par = cod_p.astype(np.int64) * (len(uf_u) + 1) + cod_u
+    pares, inverso = np.unique(par, return_inverse=True)
+    regioes = np.array(
+        [_regiao(pais_keys[p // (len(uf_u) + 1)], ufs[p % (len(uf_u) + 1)], assumir_brasil_sem_pais) for p in pares],
+        dtype=object,
+    )
+    return pd.Series(regioes[inverso.reshape(-1)] if n else [], index=index, dtype="string")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+resolver_nao_casados.py
+
+Casamento aproximado (fuzzy) dos nomes de produto do fato que não casaram com
+dim_produto (acentos, palavras a mais, gramatura...).
+- Índice de blocagem por trigramas de caracteres sobre produto_nome_normalizado
+  (listas invertidas em NumPy), salvo em data/dimensoes/dim_produto.ngram.npz
+  e reaproveitado enquanto a dimensão não mudar (assinatura das chaves).
+- Similaridade de Jaccard entre conjuntos de trigramas, calculada para TODOS os
+  pares (consulta, candidato) que compartilham trigramas de uma vez (np.unique),
+  sem laço O(n×m) em Python.
+- Score >= limiar_auto  -> "auto" (aplicado no enriquecimento)
+  Score >= limiar_sug   -> "sugerido" (só vai para o relatório)
+  Números/unidades diferentes ("1kg" x "15kg") são outro produto: no máximo "sugerido".
+- Resoluções ficam em cache (data/dimensoes/resolucoes_produto.csv): consultas já
+  vistas não são pontuadas de novo. Linhas editadas à mão com status "manual"
+  (aceita) ou "rejeitado" são respeitadas para sempre.
+
+Uso:
+  python src/resolver_nao_casados.py ^
+    --dim data/dimensoes/dim_produto.parquet ^
+    --nao-casados data/enriquecido/nao_casados_produto.csv ^
+    --out data/enriquecido/nao_casados_produto_sugestoes.csv
+"""
+
+import argparse
+import hashlib
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indice_dimensoes import norm
+
+N_GRAMA = 3
+TOP_K = 3
+LIMIAR_AUTO = 0.75
+LIMIAR_SUGESTAO = 0.40
+PISO_SCORE = 0.20        # pares abaixo disso nem entram no ranking
+LOTE_CONSULTAS = 2_000
+STATUS_ACEITOS = ("auto", "manual")
+STATUS_FIXOS = ("manual", "rejeitado")   # decisões humanas: nunca recalculadas
+COLS_CACHE = ["consulta", "chave_dim", "id", "score", "status", "assinatura_dim"]
+# número com a unidade colada ou separada ("1kg", "1,5 kg", "250 ml", "2 a 10 kg")
+_RE_MEDIDA = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kg|g|gr|mg|ml|l|lt|un|und|cm|mm|m)?\b")
+_UNIDADES = {"gr": "g", "lt": "l", "und": "un"}
+
+def _gramas(chave: str, n: int = N_GRAMA) -> set[str]:
+    s = f" {chave} "
+    return {s[i:i + n] for i in range(max(1, len(s) - n + 1))}
+
+def medidas(chave: str) -> tuple:
+    """Números e unidades da chave normalizada, ordenados: ("1kg" -> (("1", "kg"),))."""
+    return tuple(sorted((n.replace(",", "."), _UNIDADES.get(u, u)) for n, u in _RE_MEDIDA.findall(chave or "")))
+
+def assinatura(chaves) -> str:
+    return hashlib.md5("\n".join(map(str, chaves)).encode("utf-8")).hexdigest()
+
+# =====================
+# Índice de blocagem (trigramas -> linhas da dimensão)
+# =====================
+
+class IndiceNgramas:
+    def __init__(self, chaves, n: int = N_GRAMA):
+        self.chaves = np.asarray(list(chaves), dtype=object)
+        self.n = n
+        self.assinatura = assinatura(self.chaves)
+        vocab: dict[str, int] = {}
+        linhas, gramas = [], []
+        for i, ch in enumerate(self.chaves):
+            for g in _gramas(ch, n):
+                linhas.append(i)
+                gramas.append(vocab.setdefault(g, len(vocab)))
+        self._montar(vocab, np.asarray(linhas, dtype=np.int64), np.asarray(gramas, dtype=np.int64))
+
+    def _montar(self, vocab: dict, linhas: np.ndarray, gramas: np.ndarray):
+        self.vocab = vocab
+        ordem = np.argsort(gramas, kind="stable")
+        self.postings = linhas[ordem]                                  # linhas agrupadas por trigrama
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(gramas, minlength=len(vocab)))])
+        self.tamanhos = np.bincount(linhas, minlength=len(self.chaves))  # nº de trigramas por chave
+
+    # ---------- persistência ----------
+    def salvar(self, path):
+        np.savez(path, gramas=np.asarray(list(self.vocab), dtype=str),
+                 postings=self.postings, indptr=self.indptr, tamanhos=self.tamanhos,
+                 n=np.array([self.n]), assinatura=np.array([self.assinatura]))
+
+    @classmethod
+    def carregar_ou_construir(cls, chaves, path=None) -> "IndiceNgramas":
+        """Reaproveita o índice salvo se as chaves da dimensão forem as mesmas."""
+        chaves = list(chaves)
+        if path and Path(path).exists():
+            z = np.load(path, allow_pickle=False)
+            if str(z["assinatura"][0]) == assinatura(chaves) and int(z["n"][0]) == N_GRAMA:
+                idx = cls.__new__(cls)
+                idx.chaves = np.asarray(chaves, dtype=object)
+                idx.n = N_GRAMA
+                idx.assinatura = str(z["assinatura"][0])
+                idx.vocab = {g: i for i, g in enumerate(z["gramas"].tolist())}
+                idx.postings, idx.indptr, idx.tamanhos = z["postings"], z["indptr"], z["tamanhos"]
+                return idx
+        idx = cls(chaves)
+        if path:
+            idx.salvar(path)
+        return idx
+
+    # ---------- busca ----------
+    def buscar(self, consultas, k: int = TOP_K, piso: float = PISO_SCORE) -> pd.DataFrame:
+        """Top-k candidatos por consulta: DataFrame [consulta, linha, score] (Jaccard de trigramas >= piso)."""
+        consultas = list(consultas)
+        partes = [self._buscar_lote(consultas[i:i + LOTE_CONSULTAS], k, piso)
+                  for i in range(0, len(consultas), LOTE_CONSULTAS)]
+        if not partes:
+            return pd.DataFrame({"consulta": [], "linha": [], "score": []})
+        return pd.concat(partes, ignore_index=True)
+
+    def _buscar_lote(self, consultas: list[str], k: int, piso: float) -> pd.DataFrame:
+        q_ids, g_ids, tam_q = [], [], np.zeros(len(consultas), dtype=np.int64)
+        for qi, c in enumerate(consultas):
+            gs = _gramas(c, self.n)
+            tam_q[qi] = len(gs)
+            for g in gs:
+                gid = self.vocab.get(g)
+                if gid is not None:
+                    q_ids.append(qi)
+                    g_ids.append(gid)
+        vazio = pd.DataFrame({"consulta": [], "linha": [], "score": []})
+        if not g_ids:
+            return vazio
+        q_ids = np.asarray(q_ids, dtype=np.int64)
+        g_ids = np.asarray(g_ids, dtype=np.int64)
+
+        # expande cada (consulta, trigrama) nas linhas da lista invertida
+        ini, fim = self.indptr[g_ids], self.indptr[g_ids + 1]
+        tam = fim - ini
+        q_rep = np.repeat(q_ids, tam)
+        deslocamento = np.arange(tam.sum()) - np.repeat(np.cumsum(tam) - tam, tam)
+        linhas = self.postings[np.repeat(ini, tam) + deslocamento]
+
+        # interseção = quantas vezes cada par (consulta, linha) apareceu
+        par = q_rep * len(self.chaves) + linhas
+        pares, inter = np.unique(par, return_counts=True)
+        q, l = pares // len(self.chaves), pares % len(self.chaves)
+        score = inter / (tam_q[q] + self.tamanhos[l] - inter)
+        forte = score >= piso            # descarta o ruído (trigramas comuns) antes de ordenar
+        q, l, score = q[forte], l[forte], score[forte]
+
+        # top-k por consulta: ordena por (consulta, -score, linha)
+        ordem = np.lexsort((l, -score, q))
+        q, l, score = q[ordem], l[ordem], score[ordem]
+        primeiro = np.r_[True, q[1:] != q[:-1]]
+        rank = np.arange(len(q)) - np.maximum.accumulate(np.where(primeiro, np.arange(len(q)), 0))
+        manter = rank < k
+        return pd.DataFrame({
+            "consulta": np.asarray(consultas, dtype=object)[q[manter]],
+            "linha": l[manter],
+            "score": score[manter].round(4),
+        })
+
+# =====================
+# Cache de resoluções
+# =====================
+
+def carregar_cache(path) -> pd.DataFrame:
+    if path and Path(path).exists():
+        cache = pd.read_csv(path, encoding="utf-8-sig", dtype={"consulta": str, "chave_dim": str, "id": str})
+        return cache.reindex(columns=COLS_CACHE)
+    return pd.DataFrame(columns=COLS_CACHE)
+
+def resolver(consultas, chaves_dim, ids_dim, cache_path=None, indice_path=None,
+             limiar_auto: float = LIMIAR_AUTO, limiar_sugestao: float = LIMIAR_SUGESTAO,
+             k: int = TOP_K) -> pd.DataFrame:
+    """Resolve chaves normalizadas sem par na dimensão.
+    Retorna uma linha por consulta: [consulta, chave_dim, id, score, status, assinatura_dim]
+    (status: auto | sugerido | sem_candidato | manual | rejeitado)."""
+    chaves_dim = pd.Series(chaves_dim, dtype=object).reset_index(drop=True)
+    ids_dim = pd.Series(ids_dim, dtype=object).reset_index(drop=True)
+    existentes = set(chaves_dim)
+    consultas = pd.unique(pd.Series([c for c in consultas if c is not None and c not in existentes], dtype=object))
+
+    cache = carregar_cache(cache_path)
+    idx = IndiceNgramas.carregar_ou_construir(chaves_dim, indice_path)
+
+    # reaproveita: decisões humanas sempre; automáticas se a dimensão não mudou
+    reuso = cache["status"].isin(STATUS_FIXOS) | (cache["assinatura_dim"] == idx.assinatura)
+    cache_valido = cache[reuso & cache["consulta"].isin(consultas)]
+    vistas = set(cache_valido["consulta"])
+    pendentes = [c for c in consultas if c not in vistas]
+
+    cand = idx.buscar(pendentes, k=k, piso=min(PISO_SCORE, limiar_sugestao))
+    melhor = cand.drop_duplicates(subset=["consulta"], keep="first").set_index("consulta")
+    novos = pd.DataFrame({"consulta": pendentes}, dtype=object)
+    linha = novos["consulta"].map(melhor["linha"])
+    novos["score"] = novos["consulta"].map(melhor["score"]).fillna(0.0)
+    tem = linha.notna()
+    novos["chave_dim"] = None
+    novos["id"] = None
+    novos.loc[tem, "chave_dim"] = chaves_dim.to_numpy()[linha[tem].astype(int)]
+    novos.loc[tem, "id"] = ids_dim.to_numpy()[linha[tem].astype(int)]
+    novos["status"] = np.select(
+        [novos["score"] >= limiar_auto, novos["score"] >= limiar_sugestao],
+        ["auto", "sugerido"], default="sem_candidato",
+    )
+    novos.loc[novos["status"] == "sem_candidato", ["chave_dim", "id"]] = None
+    novos["assinatura_dim"] = idx.assinatura
+
+    resultado = pd.concat([cache_valido, novos[COLS_CACHE]], ignore_index=True)
+    # gramatura/tamanho diferente não é variação de escrita: fica só como sugestão
+    auto = resultado.index[resultado["status"] == "auto"]
+    outra_medida = [medidas(c) != medidas(d) for c, d in
+                    zip(resultado.loc[auto, "consulta"], resultado.loc[auto, "chave_dim"])]
+    resultado.loc[auto[outra_medida], "status"] = "sugerido"
+    if cache_path:
+        # guarda tudo o que já foi visto (inclusive consultas que não apareceram nesta rodada)
+        fora = cache[~cache["consulta"].isin(resultado["consulta"])]
+        pd.concat([fora, resultado], ignore_index=True).sort_values("consulta").to_csv(
+            cache_path, index=False, encoding="utf-8-sig")
+    return resultado.sort_values(["status", "score"], ascending=[True, False]).reset_index(drop=True)
+
+def aliases(resolucoes: pd.DataFrame) -> dict[str, str]:
+    """consulta -> chave_dim das resoluções aceitas (auto/manual)."""
+    ok = resolucoes[resolucoes["status"].isin(STATUS_ACEITOS) & resolucoes["chave_dim"].notna()]
+    return dict(zip(ok["consulta"], ok["chave_dim"]))
+
+# =====================
+# CLI
+# =====================
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Casamento aproximado de produtos não casados com dim_produto.")
+    ap.add_argument("--dim", required=True, help="dim_produto (.parquet ou .csv).")
+    ap.add_argument("--nao-casados", required=True, help="CSV de não-casados (1ª coluna = nome/chave).")
+    ap.add_argument("--out", default=None, help="CSV de sugestões (padrão: <nao-casados>_sugestoes.csv).")
+    ap.add_argument("--cache", default=None, help="Cache de resoluções (padrão: resolucoes_produto.csv ao lado da dim).")
+    ap.add_argument("--limiar-auto", type=float, default=LIMIAR_AUTO)
+    ap.add_argument("--limiar-sugestao", type=float, default=LIMIAR_SUGESTAO)
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    dim_path = Path(args.dim)
+    dim = pd.read_parquet(dim_path) if dim_path.suffix == ".parquet" else pd.read_csv(dim_path, encoding="utf-8-sig")
+    if "produto_nome_normalizado" not in dim.columns:
+        dim["produto_nome_normalizado"] = dim["produto_nome"].map(norm)
+    nc = pd.read_csv(args.nao_casados, encoding="utf-8-sig")
+    consultas = nc.iloc[:, 0].dropna().map(norm).unique()
+
+    res = resolver(
+        consultas, dim["produto_nome_normalizado"], dim["produto_id"],
+        cache_path=args.cache or dim_path.with_name("resolucoes_produto.csv"),
+        indice_path=dim_path.with_name("dim_produto.ngram.npz"),
+        limiar_auto=args.limiar_auto, limiar_sugestao=args.limiar_sugestao,
+    )
+    out = Path(args.out) if args.out else Path(args.nao_casados).with_name(
+        Path(args.nao_casados).stem + "_sugestoes.csv")
+    res.to_csv(out, index=False, encoding="utf-8-sig")
+    print(res["status"].value_counts().to_string())
+    print(f"[OK] Sugestões salvas em: {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# src/roi_publicidade.py
+import argparse
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa, iniciar
+
+# ==============================================
+# ROI de publicidade: gastos por mídia x receita mensal
+# - entrada de vendas = rollup mensal já calculado (data/audit/kpi_mensal.csv do
+#   eda_quick, ou a série mensal do dashboard) -> nada relê o fato
+# - gastos: sample/Gastos_Publicidade_MelhoresCompras.csv (Ano, Mes, Tipo de Midia,
+#   gasto em R$, previsão de aumento de vendas em mil unidades)
+# - por mídia e defasagem (gasto em t-lag x receita em t), num único cubo
+#   lags x meses x mídias, sem laços por combinação; eixo de meses CONTÍNUO (união
+#   de gastos e vendas, como comparativos.montar_cubo) -> deslocar 1 linha = mês
+#   anterior mesmo com meses faltando; mês sem receita fica fora dos pares:
+#     * correlação de Pearson
+#     * elasticidade (inclinação log-log: % receita por % gasto)
+#     * receita por real (inclinação em nível: R$ de receita por R$ de gasto)
+# - "Todas as mídias" = gasto total do mês, como mais uma coluna do cubo
+#
+# Uso:
+#   python src/roi_publicidade.py --kpi data/audit/kpi_mensal.csv --out-dir data/insights
+# ==============================================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+GASTOS_PATH = BASE_DIR / "sample" / "Gastos_Publicidade_MelhoresCompras.csv"
+KPI_PATH = BASE_DIR / "data" / "audit" / "kpi_mensal.csv"
+OUT_DIR = BASE_DIR / "data" / "insights"
+
+LAGS = (0, 1, 2, 3)
+MIN_MESES = 6            # menos pares que isso -> estatísticas NaN
+TODAS = "Todas as mídias"
+
+@dataclass
+class ResultadoROI:
+    mensal: pd.DataFrame     # yyyymm, midia, gasto, receita (meses em comum)
+    lags: pd.DataFrame       # midia, lag, n_meses, correlacao, elasticidade, receita_por_real
+    resumo: pd.DataFrame     # por mídia: gasto, participação, melhor lag e suas estatísticas
+
+def _norm(txt: str) -> str:
+    return unicodedata.normalize("NFKD", str(txt)).encode("ascii", "ignore").decode("ascii").strip().lower()
+
+def ler_gastos(path=GASTOS_PATH) -> pd.DataFrame:
+    """CSV de gastos -> yyyymm ("AAAA-MM"), midia, gasto, previsao_mil_unid."""
+    g = pd.read_csv(path, encoding="utf-8-sig")
+    cols = {_norm(c): c for c in g.columns}
+    pega = lambda prefixo: next(orig for n, orig in cols.items() if n.startswith(prefixo))
+    ano, mes = g[pega("ano")].astype(int), g[pega("mes")].astype(int)
+    return pd.DataFrame({
+        "yyyymm": [f"{a:04d}-{m:02d}" for a, m in zip(ano, mes)],
+        "midia": g[pega("tipo de midia")].astype(str).str.strip(),
+        "gasto": pd.to_numeric(g[pega("gastos")], errors="coerce"),
+        "previsao_mil_unid": pd.to_numeric(g[pega("previsao")], errors="coerce"),
+    })
+
+def rollup_vendas(rollup: pd.DataFrame) -> pd.DataFrame:
+    """Aceita o kpi_mensal.csv (yyyymm, revenue, orders) ou a série do dashboard
+    (mes, Receita, Pedidos) -> yyyymm, receita."""
+    mes = next(c for c in ["yyyymm", "mes"] if c in rollup.columns)
+    rec = next(c for c in ["receita", "revenue", "Receita"] if c in rollup.columns)
+    r = pd.DataFrame({"yyyymm": rollup[mes].astype(str), "receita": pd.to_numeric(rollup[rec], errors="coerce")})
+    return r[r["yyyymm"].str.match(r"^\d{4}-\d{2}$")].groupby("yyyymm", as_index=False)["receita"].sum()
+
+def _eixo_mensal(*meses) -> list[str]:
+    """Todos os "AAAA-MM" do primeiro ao último mês vistos em qualquer das listas."""
+    k = [int(m[:4]) * 12 + int(m[5:7]) - 1 for lista in meses for m in lista]
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(min(k), max(k) + 1)] if k else []
+
+def _defasar(G: np.ndarray, lags: np.ndarray) -> np.ndarray:
+    """G (meses, mídias) -> (lags, meses, mídias) com X[l, t] = G[t - lag]; antes do início = NaN."""
+    idx = np.arange(G.shape[0])[None, :] - lags[:, None]
+    return np.where((idx >= 0)[..., None], G[np.clip(idx, 0, None)], np.nan)
+
+def _inclinacao_corr(X: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Regressão/correlação de y (meses,) contra cada X[l, :, m], ignorando pares com NaN."""
+    Y = np.broadcast_to(y[None, :, None], X.shape)
+    ok = ~np.isnan(X) & ~np.isnan(Y)
+    n = ok.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx = np.where(ok, X, 0).sum(axis=1) / n
+        my = np.where(ok, Y, 0).sum(axis=1) / n
+        dx = np.where(ok, X - mx[:, None, :], 0)
+        dy = np.where(ok, Y - my[:, None, :], 0)
+        cov, vx, vy = (dx * dy).sum(axis=1), (dx * dx).sum(axis=1), (dy * dy).sum(axis=1)
+        corr = cov / np.sqrt(vx * vy)
+        inclinacao = cov / vx
+    invalido = (n < MIN_MESES) | (vx == 0)
+    return n, np.where(invalido, np.nan, corr), np.where(invalido, np.nan, inclinacao)
+
+def analisar(gastos: pd.DataFrame, rollup: pd.DataFrame, lags=LAGS) -> ResultadoROI:
+    vendas = rollup_vendas(rollup)
+    G = gastos.pivot_table(index="yyyymm", columns="midia", values="gasto", aggfunc="sum")
+    G[TODAS] = G.sum(axis=1, min_count=1)
+    # gasto antes da 1ª venda entra nas defasagens; mês sem gasto ou sem receita = NaN (fora do par)
+    eixo = _eixo_mensal(G.index, vendas["yyyymm"])
+    G = G.reindex(eixo)
+    midias = list(G.columns)
+    receita = vendas.set_index("yyyymm")["receita"].reindex(eixo).to_numpy(dtype=float)
+    lags = np.asarray(lags, dtype=int)
+
+    X = _defasar(G.to_numpy(dtype=float), lags)
+    n, corr, receita_por_real = _inclinacao_corr(X, receita)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logX = np.log(np.where(X > 0, X, np.nan))
+        logy = np.log(np.where(receita > 0, receita, np.nan))
+    _, _, elasticidade = _inclinacao_corr(logX, logy)
+
+    tab_lags = pd.DataFrame({
+        "midia": np.tile(midias, len(lags)),
+        "lag": np.repeat(lags, len(midias)),
+        "n_meses": n.ravel(),
+        "correlacao": corr.ravel(),
+        "elasticidade": elasticidade.ravel(),
+        "receita_por_real": receita_por_real.ravel(),
+    })
+
+    comuns = gastos[gastos["yyyymm"].isin(vendas["yyyymm"])]
+    tot = comuns.groupby("midia").agg(gasto=("gasto", "sum"), previsao_mil_unid=("previsao_mil_unid", "sum"))
+    tot.loc[TODAS] = tot.sum()
+    tot["participacao"] = tot["gasto"] / tot.loc[TODAS, "gasto"] if tot.loc[TODAS, "gasto"] else np.nan
+    melhor = (tab_lags.dropna(subset=["correlacao"])
+              .sort_values("correlacao", ascending=False).drop_duplicates("midia").set_index("midia"))
+    resumo = (tot.join(melhor.rename(columns={"lag": "melhor_lag"}), how="left")
+              .reset_index().rename(columns={"index": "midia"})
+              .sort_values("gasto", ascending=False, ignore_index=True))
+
+    mensal = comuns[["yyyymm", "midia", "gasto"]].merge(vendas, on="yyyymm", how="left")
+    return ResultadoROI(mensal=mensal, lags=tab_lags, resumo=resumo)
+
+def salvar(res: ResultadoROI, out_dir=OUT_DIR) -> list[Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    saidas = []
+    for nome, df in [("roi_publicidade_resumo.csv", res.resumo), ("roi_publicidade_lags.csv", res.lags),
+                     ("roi_publicidade_mensal.csv", res.mensal)]:
+        df.to_csv(out_dir / nome, index=False, encoding="utf-8-sig")
+        saidas.append(out_dir / nome)
+    return saidas
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="ROI de publicidade: gastos por mídia x receita mensal (rollup).")
+    ap.add_argument("--kpi", default=str(KPI_PATH), help="Rollup mensal (kpi_mensal.csv do eda_quick).")
+    ap.add_argument("--gastos", default=str(GASTOS_PATH), help="CSV de gastos com publicidade.")
+    ap.add_argument("--out-dir", default=str(OUT_DIR), help="Diretório de saída.")
+    ap.add_argument("--lags", type=int, default=max(LAGS), help="Defasagem máxima em meses.")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    iniciar("roi_publicidade")
+    args = parse_args()
+    with etapa("roi_publicidade"):
+        res = analisar(ler_gastos(args.gastos), pd.read_csv(args.kpi), lags=range(args.lags + 1))
+        saidas = salvar(res, args.out_dir)
+    print(res.resumo.to_string(index=False))
+    print("[OK] ROI de publicidade salvo em:")
+    for p in saidas:
+        print(" -", p)
@@ -1,14 +1,24 @@
 import streamlit as st, plotly.express as px, pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+import os, sys
 from pathlib import Path
-from core_dataviz import load_df, filter_df, kpis, choices
 from maps_plotly import choropleth_receita_por_uf, bubblemap_receita_por_uf
+import dados_compartilhados
 
 # --- Paths para assets ---
 BASE_DIR = Path(__file__).parent
 ASSETS_DIR = BASE_DIR / "DashImg"
 LOGO_PATH = ASSETS_DIR / "LogoMelhoresComprasPET_NEW.png"
+sys.path.append(str(BASE_DIR.parent / "src"))   # módulos de análise do pipeline (ex.: roi_publicidade)
+import comparativos, roi_publicidade
+
+# --- Backend de dados: DASH_BACKEND=pandas (padrão, DataFrame em memória) | duckdb (Parquet em disco) ---
+BACKEND = os.environ.get("DASH_BACKEND", "pandas").strip().lower()
+if BACKEND == "duckdb":
+    import core_duckdb as core
+else:
+    import core_dataviz as core
 
 # --- Config da página ---
 st.set_page_config(page_title="Mapa de Oportunidades (Pet)", page_icon="📊", layout="wide")
@@ -22,37 +32,44 @@ with col_title:
     st.markdown("# 📊 Mapa de Oportunidades (Pet)")
     st.caption("Preview em Streamlit — filtros no painel lateral, gráficos interativos e mapas")
 
-@st.cache_data(show_spinner=False)
-def _load():
-    df = load_df()
-    return df, choices(df)
+# ---------- Dados: um único dataset por processo, compartilhado por todas as sessões ----------
+# (cache_resource não copia nem serializa; o DataFrame é Arrow e somente leitura)
+FONTE = core.fonte_padrao()
 
-df, opts = _load()
+@st.cache_data(ttl=60, show_spinner=False)
+def _versao(fonte: str) -> str:
+    return dados_compartilhados.versao_fonte(fonte)
 
-# ---------- Fallback: Canal = Forma de Pagamento ----------
-CANAL_FALLBACK_ACTIVE = False
-if "canal" not in df.columns and "forma_pagamento" in df.columns:
-    df = df.copy()
-    df["canal"] = df["forma_pagamento"]
-    CANAL_FALLBACK_ACTIVE = True
+# catálogo (<parquet>.catalogo.json): sidebar e cabeçalho saem dele sem ler o fato
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _meta(fonte: str, versao: str) -> dados_compartilhados.MetaDataset | None:
+    return dados_compartilhados.ler_meta(fonte, versao)
 
-def _unique_sorted(series: pd.Series):
-    return sorted(series.dropna().astype(str).str.strip().unique().tolist())
+@st.cache_resource(max_entries=1, show_spinner="Carregando dados...")
+def _dataset(backend: str, fonte: str, versao: str) -> dados_compartilhados.DatasetCompartilhado:
+    return dados_compartilhados.montar(core, fonte, versao, meta=_meta(fonte, versao))
 
-canal_opts = _unique_sorted(df["canal"]) if "canal" in df.columns else []
+VERSAO = _versao(FONTE)
+meta = _meta(FONTE, VERSAO)
+if meta is None:  # sem catálogo: opções vêm do próprio dataset (carregado já aqui)
+    meta = _dataset(BACKEND, FONTE, VERSAO).meta
+opts = meta.opcoes
+CANAL_FALLBACK_ACTIVE = meta.canal_fallback
+canal_opts = meta.canal_opts
+CENTRO_COL, centro_opts = meta.centro_col, meta.centro_opts
 
-# ---------- Centro de Distribuição ----------
-CENTRO_COL = next((c for c in ["centro_distribuicao_normalizado", "centro_distribuicao", "centro_id", "centro"] if c in df.columns), None)
-centro_opts = _unique_sorted(df[CENTRO_COL]) if CENTRO_COL else []
+with col_title:
+    periodo = f" · {meta.periodo[0]} a {meta.periodo[1]}" if meta.periodo else ""
+    st.caption(f"{meta.linhas:,} linhas{periodo}".replace(",", "."))
 
 # ---------- Donut robusto (matplotlib) ----------
-def donut_canal_streamlit(df: pd.DataFrame):
+def donut_canal_streamlit(df):
     cand_cols = ["canal", "canal_venda", "canal_vendas", "forma_pagamento"]
     col = next((c for c in cand_cols if c in df.columns), None)
     if not col or "receita" not in df.columns:
         st.info("Colunas necessárias para o donut não encontradas.")
         return
-    tmp = df[[col, "receita"]].copy()
+    tmp = core.receita_por(df, col)
     tmp[col] = tmp[col].astype(str).str.strip()
     tmp["receita"] = pd.to_numeric(tmp["receita"], errors="coerce")
     g = (tmp.dropna().groupby(col, dropna=False)["receita"].sum().sort_values(ascending=False))
@@ -83,37 +100,6 @@ def format_choropleth_hover_mm(fig):
             fig.update_layout(title=str(fig.layout.title.text) + " – R$ MM")
     return fig
 
-# ---------- Métrica p/ mapa de bolhas ----------
-def compute_metric_by_uf(df: pd.DataFrame, metric: str) -> pd.Series:
-    """Retorna série indexada por UF com a métrica escolhida (sempre float >= 0)."""
-    uf_col = "estado" if "estado" in df.columns else ("uf" if "uf" in df.columns else None)
-    if uf_col is None:
-        return pd.Series(dtype=float)
-
-    to_num = lambda s: pd.to_numeric(s, errors="coerce")
-
-    if metric == "Ticket Médio":
-        tmp = df[[uf_col, "receita", "pedido_id"]].copy()
-        tmp["receita"] = to_num(tmp["receita"])
-        grp = tmp.groupby(uf_col).agg(receita=("receita", "sum"), pedidos=("pedido_id", "nunique"))
-        s = (grp["receita"] / grp["pedidos"]).replace([np.inf, -np.inf], np.nan)
-
-    elif metric == "Lucro Líquido" and "lucro_liquido" in df.columns:
-        tmp = df[[uf_col, "lucro_liquido"]].copy()
-        tmp["lucro_liquido"] = to_num(tmp["lucro_liquido"])
-        s = tmp.groupby(uf_col)["lucro_liquido"].sum()
-
-    elif metric == "Valor de Comissão" and "valor_comissao" in df.columns:
-        tmp = df[[uf_col, "valor_comissao"]].copy()
-        tmp["valor_comissao"] = to_num(tmp["valor_comissao"])
-        s = tmp.groupby(uf_col)["valor_comissao"].sum()
-
-    else:
-        s = pd.Series(dtype=float)
-
-    s = pd.to_numeric(s, errors="coerce").fillna(0.0).astype(float)
-    return s.clip(lower=0.0)
-
 # ---------- Utilitários de bolhas ----------
 def _trace_labels(tr):
     if hasattr(tr, "hovertext") and isinstance(tr.hovertext, (list, tuple, np.ndarray)):
@@ -192,6 +178,17 @@ def prep_area_base(fig_area):
     return fig_area
 
 # ---------------- Sidebar (filtros) ----------------
+with st.sidebar.expander("Dados", expanded=False):
+    st.caption(f"Backend **{BACKEND}** · versão `{meta.versao}` · opções do {meta.origem}")
+    nulos = {c: t for c, t in meta.taxa_nulos.items() if t > 0}
+    if nulos:
+        st.caption("Nulos: " + ", ".join(f"{c} {t:.2%}" for c, t in sorted(nulos.items(), key=lambda x: -x[1])))
+    if st.button("Recarregar dados", help="Relê a fonte para todas as sessões"):
+        _versao.clear()
+        _meta.clear()
+        _dataset.clear()
+        st.rerun()
+
 st.sidebar.header("Filtros")
 anos  = st.sidebar.multiselect("Ano", options=opts["anos"], default=opts["anos"])
 meses = st.sidebar.multiselect("Mês (YYYY-MM)", options=opts["meses"], default=[])
@@ -217,31 +214,44 @@ resps = st.sidebar.multiselect("Responsável do Pedido", options=opts["responsav
 # Opções do mapa de bolhas (sem 'Receita')
 with st.sidebar.expander("Mapa de bolhas – opções", expanded=False):
     metric_options = []
-    if "pedido_id" in df.columns and "receita" in df.columns:
+    if "pedido_id" in meta.colunas and "receita" in meta.colunas:
         metric_options.append("Ticket Médio")
-    if "lucro_liquido" in df.columns:
+    if "lucro_liquido" in meta.colunas:
         metric_options.append("Lucro Líquido")
-    if "valor_comissao" in df.columns:
+    if "valor_comissao" in meta.colunas:
         metric_options.append("Valor de Comissão")
     metric_choice = st.selectbox("Métrica", options=metric_options, index=0 if metric_options else None)
     size_max_px = st.slider("Tamanho máximo (px)", min_value=8, max_value=60, value=22, step=1)
     size_min_px = st.slider("Tamanho mínimo (px)", min_value=0, max_value=10, value=3, step=1)
 
+# Fato: carregado só depois do sidebar (com catálogo, a tela já aparece filtrável)
+dados = _dataset(BACKEND, FONTE, VERSAO)
+df = dados.df
+st.sidebar.caption(f"Dados carregados em {dados.carregado_em}")
+
 # Aplica filtros principais
-df_f = filter_df(df, anos=anos, meses=meses, categorias=cats, canais=canais, estados=ufs, responsaveis=resps)
+df_f = core.filter_df(df, anos=anos, meses=meses, categorias=cats, canais=canais, estados=ufs, responsaveis=resps)
 # Filtro adicional por Centro
 if CENTRO_COL and centros:
-    df_f = df_f[df_f[CENTRO_COL].astype(str).str.strip().isin(centros)]
+    df_f = core.filtrar_coluna(df_f, CENTRO_COL, centros)
 
 # ---------------- KPIs ----------------
 ref_mes = meses[0] if len(meses) == 1 else None
-m = kpis(df_f, ref_mes=ref_mes)
+m = core.kpis(df_f)
+# série mensal filtrada: gráfico da Visão Geral + comparativos (YoY/MoM/YTD) sem nova varredura
+s = core.serie_mensal(df_f)
+comp = comparativos.comparar(s)
+ref_comp = ref_mes or (str(s["mes"].iloc[-1]) if len(s) else None)
+c_ref = comparativos.linha(comp, ref_comp) if ref_comp else {}
 k1, k2, k3, k4, k5 = st.columns(5)
 k1.metric("Receita", f"R$ {m['Receita']:,.0f}".replace(",", "."))
 k2.metric("Pedidos", f"{m['Pedidos']:,}".replace(",", "."))
 k3.metric("Itens",   f"{m['Itens']:,.0f}".replace(",", "."))
 k4.metric("Ticket Médio", f"R$ {m['Ticket Médio']:,.2f}".replace(",", ".") if pd.notna(m['Ticket Médio']) else "—")
-#k5.metric("Crescimento YoY", f"{m['YoY']:.2%}" if pd.notna(m['YoY']) else "—")
+yoy, mom = c_ref.get("receita_yoy", np.nan), c_ref.get("receita_mom", np.nan)
+k5.metric("Crescimento YoY", f"{yoy:.2%}" if pd.notna(yoy) else "—",
+          delta=f"MoM {mom:+.1%}" if pd.notna(mom) else None,
+          help=f"Receita de {ref_comp} vs. o mesmo mês do ano anterior" if ref_comp else None)
 
 st.divider()
 
@@ -251,27 +261,14 @@ tab1, tab2, tab3, tab4 = st.tabs(["📈 Visão Geral", "🗺️ Mapas", "x Tabel
 with tab1:
     left, right = st.columns([2, 1])
 
-    # Série temporal
-    s = (
-        df_f.dropna(subset=["_data_pedido"]).sort_values("_data_pedido")
-            .groupby("mes").agg(
-                Receita=("receita", "sum"),
-                Pedidos=("pedido_id", "nunique"),
-                Itens=("itens", "sum")
-            ).reset_index()
-    )
+    # Série temporal (s: calculada junto dos KPIs)
     fig_ts = px.line(s, x="mes", y=["Receita", "Pedidos", "Itens"], markers=True, title="Série Temporal Mensal")
     fig_ts.update_layout(legend_title=None, xaxis_title="", yaxis_title="")
     left.plotly_chart(fig_ts, use_container_width=True)
 
     # Barras por categoria — maior->menor
-    if "categoria" in df_f.columns and not df_f["categoria"].dropna().empty:
-        g = (
-            df_f.groupby("categoria", dropna=False)["receita"]
-                .sum()
-                .sort_values(ascending=False)
-                .reset_index()
-        )
+    g = core.receita_por(df_f, "categoria")
+    if g["categoria"].notna().any():
         fig_cat = px.bar(g, x="receita", y="categoria", orientation="h", title="Receita por Categoria")
         fig_cat.update_layout(xaxis_title="Receita", yaxis_title="")
         fig_cat.update_yaxes(autorange="reversed")
@@ -282,14 +279,8 @@ with tab1:
         donut_canal_streamlit(df_f)
 
     # Top responsável do pedido
-    if "responsavelpedido" in df_f.columns and not df_f["responsavelpedido"].dropna().empty:
-        g = (
-            df_f.groupby("responsavelpedido", dropna=False)["receita"]
-                .sum()
-                .sort_values(ascending=False)
-                .head(10)
-                .reset_index()
-        )
+    g = core.receita_por(df_f, "responsavelpedido", top=10)
+    if g["responsavelpedido"].notna().any():
         fig_resp = px.bar(
             g, x="receita", y="responsavelpedido", orientation="h",
             title="Top 10 Faturamento Bruto por Responsável do Pedido"
@@ -299,20 +290,21 @@ with tab1:
 
 with tab2:
     c1, c2 = st.columns(2)
+    receita_uf = core.receita_por(df_f, "estado")   # agregado pequeno (UF x receita) para os dois mapas
 
     # Mapa 1: Choropleth de Receita (hover em MM)
-    fig_ch = choropleth_receita_por_uf(df_f)
+    fig_ch = choropleth_receita_por_uf(receita_uf)
     fig_ch = format_choropleth_hover_mm(fig_ch)
     c1.plotly_chart(fig_ch, use_container_width=True)
 
     # Mapa 2: Bolhas com base de área + métrica escolhida (sem Receita na lista)
     # 1) base
-    fig_base = choropleth_receita_por_uf(df_f)
+    fig_base = choropleth_receita_por_uf(receita_uf)
     fig_base = prep_area_base(fig_base)
 
     # 2) bolhas
-    fig_bu = bubblemap_receita_por_uf(df_f, size_max=45, use_log=False)
-    metric_series = compute_metric_by_uf(df_f, metric_choice) if metric_choice else pd.Series(dtype=float)
+    fig_bu = bubblemap_receita_por_uf(receita_uf, size_max=45, use_log=False)
+    metric_series = core.metrica_por_uf(df_f, metric_choice) if metric_choice else pd.Series(dtype=float)
 
     fig_bu = adjust_bubble_sizes(fig_bu, metric_series, size_max_px=size_max_px, size_min_px=size_min_px)
     fig_bu = apply_bubble_hover(fig_bu, metric_series, metric_choice or "")
@@ -327,14 +319,8 @@ with tab2:
 with tab3:
     st.subheader("Tabela de Indicadores")
     # ----- mapeia/deriva colunas solicitadas -----
-    # Ano mês
-    if "mes" in df_f.columns:
-        col_mes = "mes"
-        df_f["_ano_mes"] = df_f["mes"].astype(str)
-    elif "_data_pedido" in df_f.columns:
-        df_f["_ano_mes"] = pd.to_datetime(df_f["_data_pedido"], errors="coerce").dt.to_period("M").astype(str)
-    else:
-        df_f["_ano_mes"] = ""
+    # Ano mês (derivado no load: core.load_df)
+    col_mes = "mes" if "mes" in df_f.columns else None
 
     # Forma de pagamento
     col_fp = "forma_pagamento" if "forma_pagamento" in df_f.columns else ("canal" if "canal" in df_f.columns else None)
@@ -351,17 +337,8 @@ with tab3:
     # Produto
     col_prod = next((c for c in ["produto_nome", "produto", "produto_descricao", "item_nome"] if c in df_f.columns), None)
 
-    # Métricas base
-    df_tmp = df_f.copy()
-    df_tmp["receita"] = pd.to_numeric(df_tmp.get("receita", np.nan), errors="coerce")
-    df_tmp["itens"] = pd.to_numeric(df_tmp.get("itens", 0), errors="coerce").fillna(0)
-    df_tmp["valor_comissao"] = pd.to_numeric(df_tmp.get("valor_comissao", np.nan), errors="coerce")
-
-    # Valor unitário (quando possível)
-    df_tmp["_valor_unit"] = np.where(df_tmp["itens"] > 0, df_tmp["receita"] / df_tmp["itens"], np.nan)
-
     # Dimensões existentes
-    dims = [("_ano_mes", "Ano Mês"),
+    dims = [(col_mes, "Ano Mês"),
             (col_fp, "Forma Pagamento"),
             (col_centro, "Centro de Distribuição"),
             (col_estado, "Estado"),
@@ -371,18 +348,8 @@ with tab3:
     dims = [(c, label) for c, label in dims if c is not None]
 
     if dims:
-        group_cols = [c for c, _ in dims]
-        agg = df_tmp.groupby(group_cols).agg(
-            valor_total_bruto=("receita", "sum"),
-            valor=("._valor_unit".replace(".", ""), "mean"),  # _valor_unit
-            valor_comissao=("valor_comissao", "sum"),
-            qtd_pedido_ordem=("pedido_id", "nunique"),
-            qtd_items=("itens", "sum"),
-        ).reset_index()
-
-        # renomeia dimensões para os rótulos solicitados
-        rename_map = {c: label for c, label in dims}
-        agg = agg.rename(columns=rename_map)
+        # métricas por dimensão (valor unitário médio, total bruto, comissão, pedidos, itens) já com os rótulos
+        agg = core.tabela_indicadores(df_f, dims)
 
         # Ticket Médio
         agg["TicketMedio"] = np.where(agg["qtd_pedido_ordem"] > 0, agg["valor_total_bruto"] / agg["qtd_pedido_ordem"], 0.0)
@@ -414,11 +381,85 @@ with tab3:
     else:
         st.info("Não há colunas suficientes para montar a tabela com as dimensões solicitadas.")
 
+@st.cache_data(show_spinner=False)
+def _gastos_publicidade():
+    return roi_publicidade.ler_gastos() if roi_publicidade.GASTOS_PATH.exists() else None
+
+DIMS_COMPARATIVO = {"Estado": "estado", "Categoria": "categoria", "Canal": "canal",
+                    "Responsável do Pedido": "responsavelpedido", "Centro de Distribuição": CENTRO_COL}
+
 with tab4:
     st.subheader("Insights")
-    c1, c2 = st.columns(2)
-    with c1:
-        st.write("🔎 Espaço reservado para insights (gráficos/indicadores adicionais).")
-    with c2:
-        st.write("💡 Podemos incluir comparativos, variações YoY, outliers por UF etc.")
+
+    # ---------- Crescimento por membro (YoY / MoM / YTD no mês de referência) ----------
+    st.markdown("#### Crescimento por dimensão")
+    dims_ok = {rot: col for rot, col in DIMS_COMPARATIVO.items() if col and col in meta.colunas}
+    if not ref_comp or not dims_ok:
+        st.info("Sem meses ou dimensões para comparar com os filtros atuais.")
+    else:
+        rot_dim = st.selectbox("Dimensão", options=list(dims_ok), index=0)
+        col_dim = dims_ok[rot_dim]
+        comp_dim = comparativos.comparar(core.rollup_mensal(df_f, col_dim), col_dim)
+        ref = comp_dim[comp_dim["mes"] == ref_comp].sort_values("receita", ascending=False)
+        st.caption(f"Mês de referência **{ref_comp}** (último mês filtrado, ou o mês selecionado no sidebar).")
+        c1, c2 = st.columns([1, 1])
+        fig_yoy = px.bar(ref.dropna(subset=["receita_yoy"]).sort_values("receita_yoy"), x="receita_yoy", y=col_dim,
+                         orientation="h", title=f"Crescimento YoY da receita por {rot_dim}")
+        fig_yoy.update_layout(xaxis_title="YoY", yaxis_title="", xaxis_tickformat=".0%")
+        c1.plotly_chart(fig_yoy, use_container_width=True)
+        c2.dataframe(
+            ref[[col_dim, "receita", "receita_mom", "receita_yoy", "receita_ytd", "receita_ytd_yoy", "ticket_yoy"]]
+               .assign(**{c: ref[c] * 100 for c in ["receita_mom", "receita_yoy", "receita_ytd_yoy", "ticket_yoy"]}),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                col_dim: st.column_config.TextColumn(rot_dim),
+                "receita": st.column_config.NumberColumn("Receita", format="R$ %.0f"),
+                "receita_mom": st.column_config.NumberColumn("MoM", format="%.1f%%"),
+                "receita_yoy": st.column_config.NumberColumn("YoY", format="%.1f%%"),
+                "receita_ytd": st.column_config.NumberColumn("Receita YTD", format="R$ %.0f"),
+                "receita_ytd_yoy": st.column_config.NumberColumn("YTD vs. ano anterior", format="%.1f%%"),
+                "ticket_yoy": st.column_config.NumberColumn("Ticket YoY", format="%.1f%%"),
+            }
+        )
+
+    # ---------- Publicidade x Receita (rollup mensal dos filtros atuais; sem nova leitura do fato) ----------
+    st.markdown("#### Publicidade × Receita")
+    gastos = _gastos_publicidade()
+    if gastos is None:
+        st.info("Arquivo de gastos com publicidade não encontrado.")
+    else:
+        roi = roi_publicidade.analisar(gastos, s)   # s = série mensal filtrada (Visão Geral)
+        if roi.mensal.empty:
+            st.info("Sem meses em comum entre os gastos com publicidade e as vendas filtradas.")
+        else:
+            st.caption("Gasto do mês *t − defasagem* contra a receita do mês *t*. "
+                       "Elasticidade = % de receita por % de gasto; receita por real = R$ de receita por R$ investido.")
+            c1, c2 = st.columns(2)
+            corr = roi.lags.pivot(index="midia", columns="lag", values="correlacao")
+            fig_corr = px.imshow(corr, text_auto=".2f", color_continuous_scale="RdBu", zmin=-1, zmax=1, aspect="auto",
+                                 title="Correlação gasto × receita por defasagem (meses)")
+            fig_corr.update_layout(xaxis_title="Defasagem (meses)", yaxis_title="")
+            c1.plotly_chart(fig_corr, use_container_width=True)
+
+            mensal = roi.mensal.groupby("yyyymm", as_index=False).agg(gasto=("gasto", "sum"), receita=("receita", "first"))
+            fig_gr = px.line(mensal, x="yyyymm", y=["gasto", "receita"], markers=True, title="Gasto total em mídia × Receita")
+            fig_gr.update_layout(legend_title=None, xaxis_title="", yaxis_title="R$")
+            c2.plotly_chart(fig_gr, use_container_width=True)
+
+            st.dataframe(
+                roi.resumo.assign(participacao=roi.resumo["participacao"] * 100)[["midia", "gasto", "participacao", "melhor_lag", "correlacao", "elasticidade", "receita_por_real", "n_meses"]],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "midia": st.column_config.TextColumn("Mídia"),
+                    "gasto": st.column_config.NumberColumn("Gasto", format="R$ %.0f"),
+                    "participacao": st.column_config.NumberColumn("Participação", format="%.1f%%"),
+                    "melhor_lag": st.column_config.NumberColumn("Melhor defasagem", format="%d"),
+                    "correlacao": st.column_config.NumberColumn("Correlação", format="%.2f"),
+                    "elasticidade": st.column_config.NumberColumn("Elasticidade", format="%.2f"),
+                    "receita_por_real": st.column_config.NumberColumn("Receita por R$", format="%.2f"),
+                    "n_meses": st.column_config.NumberColumn("Meses", format="%d"),
+                }
+            )
 
@@ -1,5 +1,12 @@
 from io import BytesIO
-import unicodedata, requests, pandas as pd, numpy as np
+import os, sys
+from pathlib import Path
+import unicodedata, pandas as pd, numpy as np, pyarrow as pa
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))  # datas_rapidas: mesma conversão do pipeline
+from datas_rapidas import datas_com_periodo
+from conversao_numerica import normalizar_medida
+import comparativos
 
 URL_PARQUET = "https://raw.githubusercontent.com/regis-zang/TrbFiap25_Cap05/main/sample/vendas_completo_enriquecido.parquet"
 
@@ -8,7 +15,7 @@ def _norm(txt: str | None) -> str | None:
     return unicodedata.normalize("NFKD", str(txt)).encode("ascii","ignore").decode("ascii").strip()
 
 def to_number(s: pd.Series) -> pd.Series:
-    if pd.api.types.is_numeric_dtype(s): return pd.to_numeric(s, errors="coerce")
+    if pd.api.types.is_numeric_dtype(s): return normalizar_medida(pd.to_numeric(s, errors="coerce"))
     s = s.astype("string").str.replace("\u00A0"," ",regex=False).str.strip()
     s = s.str.replace(r"[^\d,.\-]", "", regex=True)
     both = s.str.contains(",", na=False) & s.str.contains(r"\.", na=False)
@@ -20,16 +27,35 @@ def to_number(s: pd.Series) -> pd.Series:
 def choose_col(df: pd.DataFrame, options: list[str]) -> str | None:
     return next((c for c in options if c in df.columns), None)
 
-def load_df(url: str = URL_PARQUET) -> pd.DataFrame:
-    r = requests.get(url, timeout=60); r.raise_for_status()
-    df = pd.read_parquet(BytesIO(r.content), engine="pyarrow")
+def fonte_padrao() -> str:
+    """DASH_PARQUET (arquivo local ou URL) ou o parquet de amostra do repositório no GitHub."""
+    return os.environ.get("DASH_PARQUET") or URL_PARQUET
+
+def load_df(fonte: str | None = None) -> pd.DataFrame:
+    fonte = fonte or fonte_padrao()
+    if Path(fonte).exists():
+        df = pd.read_parquet(fonte, engine="pyarrow")
+    else:
+        import requests  # só aqui: preparar_df/filter_df/kpis rodam sem rede (bench/)
+        r = requests.get(fonte, timeout=60); r.raise_for_status()
+        df = pd.read_parquet(BytesIO(r.content), engine="pyarrow")
+    return congelar(preparar_df(df))
+
+def congelar(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas em buffers Arrow (ArrowDtype, imutáveis): o mesmo DataFrame é compartilhado
+    entre sessões do app sem cópias; filtros/agrupamentos geram frames novos."""
+    return pa.Table.from_pandas(df, preserve_index=False).to_pandas(types_mapper=pd.ArrowDtype)
 
+def preparar_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas derivadas usadas pelo dashboard (_data_pedido, ano, mes, trimestre, receita, itens, pedido_id)."""
     data_col = choose_col(df, ["data_pedido","data","dt_pedido","pedido_data"])
     if not data_col: raise RuntimeError("coluna de data não encontrada (ex.: data_pedido).")
-    df["_data_pedido"] = pd.to_datetime(df[data_col], errors="coerce", dayfirst=True)
-    df["ano"] = df["_data_pedido"].dt.year
-    df["mes"] = df["_data_pedido"].dt.to_period("M").astype(str)
-    df["trimestre"] = df["_data_pedido"].dt.quarter
+    # datas distintas convertidas uma vez (formato detectado); data inválida -> ano/mes/trimestre nulos
+    per = datas_com_periodo(df[data_col], dayfirst=True)
+    df["_data_pedido"] = per["data"]
+    df["ano"] = per["ano"]
+    df["mes"] = per["mes"]
+    df["trimestre"] = per["trimestre"]
 
     total_col = choose_col(df, ["valor_total_bruto","valor_total","total_bruto","total"])
     if not total_col: raise RuntimeError("coluna de total não encontrada.")
@@ -39,7 +65,11 @@ def load_df(url: str = URL_PARQUET) -> pd.DataFrame:
     df["itens"] = to_number(df[qtd_col]) if qtd_col else np.nan
 
     pedido_col = choose_col(df, ["cod_pedido","pedido","id_pedido","num_pedido"])
-    df["pedido_id"] = (df[pedido_col].astype("string") if pedido_col else df.index.astype(str))
+    # cod_pedido inteiro (esquema tipado) fica inteiro: nunique em int64, sem strings
+    if pedido_col and pd.api.types.is_integer_dtype(df[pedido_col]):
+        df["pedido_id"] = df[pedido_col]
+    else:
+        df["pedido_id"] = (df[pedido_col].astype("string") if pedido_col else df.index.astype(str))
 
     for c in ["estado","regiao_pais","categoria","subcategoria","produto","cliente",
               "canal","forma_pagamento","responsavelpedido"]:
@@ -48,7 +78,7 @@ def load_df(url: str = URL_PARQUET) -> pd.DataFrame:
 
 def filter_df(df: pd.DataFrame,
               anos=None, meses=None, categorias=None, canais=None, estados=None, responsaveis=None) -> pd.DataFrame:
-    d = df.copy()
+    d = df.copy(deep=False)  # cópia rasa: não duplica os dados compartilhados
     if anos: d = d[d["ano"].isin(anos)]
     if meses: d = d[d["mes"].isin(meses)]
     if categorias and "categoria" in d.columns: d = d[d["categoria"].isin(categorias)]
@@ -57,6 +87,15 @@ def filter_df(df: pd.DataFrame,
     if responsaveis and "responsavelpedido" in d.columns: d = d[d["responsavelpedido"].isin(responsaveis)]
     return d
 
+def filtrar_coluna(df: pd.DataFrame, col: str, valores) -> pd.DataFrame:
+    """Filtro extra do app (ex.: Centro de Distribuição), comparando o texto sem espaços nas pontas."""
+    if not valores or col not in df.columns: return df
+    return df[df[col].astype(str).str.strip().isin(valores)]
+
+def alias_coluna(df: pd.DataFrame, novo: str, origem: str) -> pd.DataFrame:
+    """Nova coluna = mesma série de outra (ex.: canal <- forma_pagamento), sem copiar os dados."""
+    return df.assign(**{novo: df[origem]})
+
 def kpis(df: pd.DataFrame, ref_mes: str | None = None) -> dict:
     receita = df["receita"].sum(min_count=1)
     pedidos = df["pedido_id"].nunique()
@@ -64,18 +103,16 @@ def kpis(df: pd.DataFrame, ref_mes: str | None = None) -> dict:
     ticket  = receita / pedidos if pedidos and pd.notna(receita) else np.nan
 
     yoy = np.nan
-    if ref_mes:
-        try:
-            y, m = ref_mes.split("-")
-            prev = f"{int(y)-1:04d}-{m}"
-            cur = df.loc[df["mes"]==ref_mes,"receita"].sum(min_count=1)
-            prv = df.loc[df["mes"]==prev,"receita"].sum(min_count=1)
-            if pd.notna(cur) and pd.notna(prv) and prv != 0: yoy = (cur-prv)/prv
-        except Exception:
-            pass
+    if ref_mes:  # rollup mensal de receita (uma agregação) -> comparativos
+        r = df.groupby("mes")["receita"].sum().reset_index()
+        yoy = comparativos.linha(comparativos.comparar(r, medidas=("receita",)), ref_mes).get("receita_yoy", np.nan)
 
     return {"Receita":receita,"Pedidos":pedidos,"Itens":itens,"Ticket Médio":ticket,"YoY":yoy}
 
+def valores_distintos(df: pd.DataFrame, col: str) -> list:
+    if col not in df.columns: return []
+    return sorted(df[col].dropna().astype(str).str.strip().unique().tolist())
+
 def choices(df: pd.DataFrame) -> dict:
     return {
         "anos": sorted([int(x) for x in df["ano"].dropna().unique()]),
@@ -85,3 +122,73 @@ def choices(df: pd.DataFrame) -> dict:
         "estados": sorted(df["estado"].dropna().unique().tolist()) if "estado" in df.columns else [],
         "responsaveis": sorted(df["responsavelpedido"].dropna().unique().tolist()) if "responsavelpedido" in df.columns else [],
     }
+
+# ---------- agregações por gráfico (mesma API no core_duckdb.py) ----------
+def serie_mensal(df: pd.DataFrame) -> pd.DataFrame:
+    return (
+        df.dropna(subset=["_data_pedido"]).sort_values("_data_pedido")
+          .groupby("mes").agg(
+              Receita=("receita", "sum"),
+              Pedidos=("pedido_id", "nunique"),
+              Itens=("itens", "sum")
+          ).reset_index()
+    )
+
+def rollup_mensal(df: pd.DataFrame, dim: str | None = None) -> pd.DataFrame:
+    """mes [+ dim] x receita, pedidos, itens: entrada do comparativos.comparar."""
+    chaves = ["mes"] + ([dim] if dim else [])
+    return df.groupby(chaves).agg(receita=("receita", "sum"), pedidos=("pedido_id", "nunique"),
+                                  itens=("itens", "sum")).reset_index()
+
+def receita_por(df: pd.DataFrame, col: str, top: int | None = None) -> pd.DataFrame:
+    if col not in df.columns: return pd.DataFrame(columns=[col, "receita"])
+    g = df.groupby(col, dropna=False)["receita"].sum().sort_values(ascending=False)
+    return (g.head(top) if top else g).reset_index()
+
+def metrica_por_uf(df: pd.DataFrame, metric: str) -> pd.Series:
+    """Retorna série indexada por UF com a métrica escolhida (sempre float >= 0)."""
+    uf_col = "estado" if "estado" in df.columns else ("uf" if "uf" in df.columns else None)
+    if uf_col is None:
+        return pd.Series(dtype=float)
+
+    to_num = to_number
+
+    if metric == "Ticket Médio":
+        tmp = df[[uf_col, "receita", "pedido_id"]].copy()
+        tmp["receita"] = to_num(tmp["receita"])
+        grp = tmp.groupby(uf_col).agg(receita=("receita", "sum"), pedidos=("pedido_id", "nunique"))
+        s = (grp["receita"] / grp["pedidos"]).replace([np.inf, -np.inf], np.nan)
+
+    elif metric == "Lucro Líquido" and "lucro_liquido" in df.columns:
+        tmp = df[[uf_col, "lucro_liquido"]].copy()
+        tmp["lucro_liquido"] = to_num(tmp["lucro_liquido"])
+        s = tmp.groupby(uf_col)["lucro_liquido"].sum()
+
+    elif metric == "Valor de Comissão" and "valor_comissao" in df.columns:
+        tmp = df[[uf_col, "valor_comissao"]].copy()
+        tmp["valor_comissao"] = to_num(tmp["valor_comissao"])
+        s = tmp.groupby(uf_col)["valor_comissao"].sum()
+
+    else:
+        s = pd.Series(dtype=float)
+
+    s = pd.to_numeric(s, errors="coerce").fillna(0.0).astype(float)
+    return s.clip(lower=0.0)
+
+def tabela_indicadores(df: pd.DataFrame, dims: list[tuple[str, str]]) -> pd.DataFrame:
+    """Agregado por dimensões [(coluna, rótulo)]: valor médio, total bruto, comissão, pedidos, itens."""
+    cols = [c for c, _ in dims]
+    tmp = df[list(dict.fromkeys(cols + ["receita", "itens", "pedido_id"]))].copy()
+    tmp["receita"] = pd.to_numeric(tmp["receita"], errors="coerce")
+    tmp["itens"] = pd.to_numeric(tmp["itens"], errors="coerce").fillna(0)
+    tmp["valor_comissao"] = to_number(df["valor_comissao"]) if "valor_comissao" in df.columns else np.nan
+    tmp["_valor_unit"] = np.where(tmp["itens"] > 0, tmp["receita"] / tmp["itens"], np.nan)
+
+    agg = tmp.groupby(cols).agg(
+        valor_total_bruto=("receita", "sum"),
+        valor=("_valor_unit", "mean"),
+        valor_comissao=("valor_comissao", "sum"),
+        qtd_pedido_ordem=("pedido_id", "nunique"),
+        qtd_items=("itens", "sum"),
+    ).reset_index()
+    return agg.rename(columns={c: label for c, label in dims})
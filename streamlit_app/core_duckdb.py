@@ -0,0 +1,242 @@
+"""Backend DuckDB do dashboard: mesma API do core_dataviz.py, mas o Parquet fica em disco.
+
+Nada é materializado no load: `load_df()` devolve uma ConsultaDuckDB (view sobre o
+Parquet + colunas derivadas em SQL) e `filter_df` só acumula predicados. Cada KPI /
+gráfico vira uma consulta agregada (projeção e filtros empurrados para o leitor de
+Parquet, execução multi-thread) que devolve um DataFrame pequeno.
+
+Ativado por DASH_BACKEND=duckdb (ver app_streamlit.py). Configuração:
+  DASH_PARQUET          arquivo(s)/glob/URL do parquet enriquecido
+  DASH_DUCKDB_THREADS   threads do DuckDB (padrão: todos os núcleos)
+  DASH_DUCKDB_MEMORIA   limite de memória (ex.: "2GB")
+"""
+import os, sys
+from pathlib import Path
+import numpy as np, pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))  # comparativos (compartilhado com o pipeline)
+import comparativos
+from conversao_numerica import CASAS_MOEDA
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PARQUET_PADRAO = BASE_DIR / "sample" / "vendas_completo_enriquecido.parquet"
+
+TEXTO = ["estado","regiao_pais","categoria","subcategoria","produto","cliente",
+         "canal","forma_pagamento","responsavelpedido"]
+MEDIDAS = ["valor_comissao", "lucro_liquido"]
+FORMATOS_DATA = ["%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
+
+def _q(col: str) -> str:
+    return '"' + str(col).replace('"', '""') + '"'
+
+def _lit(txt: str) -> str:
+    return "'" + str(txt).replace("'", "''") + "'"
+
+def _inteiro(tipo: str) -> bool:
+    return tipo in {"TINYINT","SMALLINT","INTEGER","BIGINT","HUGEINT","UTINYINT","USMALLINT","UINTEGER","UBIGINT"}
+
+def _numerico(tipo: str) -> bool:
+    return tipo.split("(")[0] in {"TINYINT","SMALLINT","INTEGER","BIGINT","HUGEINT","UTINYINT","USMALLINT",
+                                  "UINTEGER","UBIGINT","FLOAT","DOUBLE","DECIMAL"}
+
+def _sql_numero(col: str, tipo: str) -> str:
+    """Equivalente SQL do core_dataviz.to_number (milhar '.', decimal ',', R$, NBSP)."""
+    if tipo == "FLOAT": return f"round(CAST({_q(col)} AS DOUBLE), {CASAS_MOEDA})"   # moeda float32, como conversao_numerica.numero
+    if _numerico(tipo): return f"CAST({_q(col)} AS DOUBLE)"
+    s = f"regexp_replace(trim(replace(CAST({_q(col)} AS VARCHAR), chr(160), ' ')), '[^0-9,.\\-]', '', 'g')"
+    return (f"TRY_CAST(CASE WHEN contains({s}, ',') AND contains({s}, '.') THEN replace(replace({s}, '.', ''), ',', '.') "
+            f"WHEN contains({s}, ',') THEN replace({s}, ',', '.') ELSE {s} END AS DOUBLE)")
+
+def _sql_data(col: str, tipo: str) -> str:
+    if tipo.startswith(("DATE","TIMESTAMP")): return f"CAST({_q(col)} AS TIMESTAMP)"
+    t = f"trim(CAST({_q(col)} AS VARCHAR))"
+    return "COALESCE(" + ", ".join(f"try_strptime({t}, {_lit(f)})" for f in FORMATOS_DATA) + ")"
+
+def _choose(tipos: dict, options: list[str]) -> str | None:
+    return next((c for c in options if c in tipos), None)
+
+def _conectar():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("DASH_BACKEND=duckdb requer o pacote duckdb (pip install duckdb).") from e
+    con = duckdb.connect(database=":memory:")
+    if os.environ.get("DASH_DUCKDB_THREADS"): con.execute(f"SET threads TO {int(os.environ['DASH_DUCKDB_THREADS'])}")
+    if os.environ.get("DASH_DUCKDB_MEMORIA"): con.execute(f"SET memory_limit = {_lit(os.environ['DASH_DUCKDB_MEMORIA'])}")
+    return con
+
+class ConsultaDuckDB:
+    """Consulta lazy: view base + predicados (AND). Imutável: filtrar devolve outra instância."""
+
+    def __init__(self, con, view: str, columns: list[str], filtros: tuple = (), params: tuple = ()):
+        self._con, self._view = con, view
+        self.columns = list(columns)
+        self._filtros, self._params = tuple(filtros), tuple(params)
+
+    # ---------- construção ----------
+    def filtrar(self, col: str, valores) -> "ConsultaDuckDB":
+        valores = list(valores)
+        if not valores: return self
+        marc = ", ".join("?" for _ in valores)
+        return ConsultaDuckDB(self._con, self._view, self.columns,
+                              self._filtros + (f"{_q(col)} IN ({marc})",), self._params + tuple(valores))
+
+    def _where(self, extra: list[str] | None = None) -> str:
+        conds = list(self._filtros) + list(extra or [])
+        return (" WHERE " + " AND ".join(f"({c})" for c in conds)) if conds else ""
+
+    # ---------- execução ----------
+    def executar(self, select: str, extra_where: list[str] | None = None, tail: str = "", params: tuple = ()):
+        """SELECT <select> FROM view WHERE <filtros> <tail>; `params` são os '?' do select.
+        cursor() = conexão própria por thread (sessões do Streamlit rodam em threads)."""
+        q = f"SELECT {select} FROM {self._view}{self._where(extra_where)} {tail}"
+        return self._con.cursor().execute(q, list(params) + list(self._params))
+
+    def sql(self, select: str, extra_where: list[str] | None = None, tail: str = "", params: tuple = ()) -> pd.DataFrame:
+        return self.executar(select, extra_where, tail, params).df()
+
+    def __len__(self):
+        return int(self.sql("count(*) AS n")["n"].iloc[0])
+
+def fonte_padrao() -> str:
+    return os.environ.get("DASH_PARQUET") or str(PARQUET_PADRAO)
+
+def load_df(fonte=None) -> ConsultaDuckDB:
+    """Cria a view `vendas` com as mesmas colunas derivadas do core_dataviz.preparar_df."""
+    fonte = fonte or fonte_padrao()
+    con = _conectar()
+    leitura = f"read_parquet({_lit(fonte)})"
+    tipos = dict(con.execute(f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM {leitura})").fetchall())
+
+    data_col = _choose(tipos, ["data_pedido","data","dt_pedido","pedido_data"])
+    if not data_col: raise RuntimeError("coluna de data não encontrada (ex.: data_pedido).")
+    total_col = _choose(tipos, ["valor_total_bruto","valor_total","total_bruto","total"])
+    if not total_col: raise RuntimeError("coluna de total não encontrada.")
+    qtd_col = _choose(tipos, ["quantidade","qtd","qtde"])
+    pedido_col = _choose(tipos, ["cod_pedido","pedido","id_pedido","num_pedido"])
+
+    derivadas = {
+        "receita": _sql_numero(total_col, tipos[total_col]),
+        "itens": _sql_numero(qtd_col, tipos[qtd_col]) if qtd_col else "CAST(NULL AS DOUBLE)",
+        "pedido_id": (_q(pedido_col) if _inteiro(tipos[pedido_col]) else f"CAST({_q(pedido_col)} AS VARCHAR)") if pedido_col
+                     else "CAST(row_number() OVER () - 1 AS VARCHAR)",
+    }
+    for c in MEDIDAS:   # texto ("6,24") ou float32 -> DOUBLE, como o to_number do pandas
+        if c in tipos: derivadas[c] = _sql_numero(c, tipos[c])
+    for c in TEXTO:
+        if c in tipos: derivadas[c] = f"trim(CAST({_q(c)} AS VARCHAR))"
+    substitui = [c for c in derivadas if c in tipos]
+    base = f"SELECT * EXCLUDE ({', '.join(_q(c) for c in substitui)})" if substitui else "SELECT *"
+    extras = ", ".join(f"{sql} AS {_q(c)}" for c, sql in derivadas.items())
+    con.execute(f"""
+        CREATE VIEW vendas_base AS {base}, {_sql_data(data_col, tipos[data_col])} AS _data_pedido, {extras} FROM {leitura};
+        CREATE VIEW vendas AS SELECT *, year(_data_pedido) AS ano, strftime(_data_pedido, '%Y-%m') AS mes,
+               quarter(_data_pedido) AS trimestre FROM vendas_base;
+    """)
+    colunas = [r[0] for r in con.execute("DESCRIBE vendas").fetchall()]
+    return ConsultaDuckDB(con, "vendas", colunas)
+
+def filter_df(df: ConsultaDuckDB,
+              anos=None, meses=None, categorias=None, canais=None, estados=None, responsaveis=None) -> ConsultaDuckDB:
+    d = df
+    if anos: d = d.filtrar("ano", [int(a) for a in anos])
+    if meses: d = d.filtrar("mes", meses)
+    if categorias and "categoria" in d.columns: d = d.filtrar("categoria", categorias)
+    if canais and "canal" in d.columns: d = d.filtrar("canal", canais)
+    if estados and "estado" in d.columns: d = d.filtrar("estado", estados)
+    if responsaveis and "responsavelpedido" in d.columns: d = d.filtrar("responsavelpedido", responsaveis)
+    return d
+
+def filtrar_coluna(df: ConsultaDuckDB, col: str, valores) -> ConsultaDuckDB:
+    """Filtro extra do app (ex.: Centro de Distribuição), comparando o texto sem espaços nas pontas."""
+    valores = list(valores or [])
+    if not valores or col not in df.columns: return df
+    marc = ", ".join("?" for _ in valores)
+    return ConsultaDuckDB(df._con, df._view, df.columns,
+                          df._filtros + (f"trim(CAST({_q(col)} AS VARCHAR)) IN ({marc})",), df._params + tuple(valores))
+
+def alias_coluna(df: ConsultaDuckDB, novo: str, origem: str) -> ConsultaDuckDB:
+    """Nova coluna = cópia de outra (ex.: canal <- forma_pagamento), como subconsulta (sem DDL)."""
+    view = f"(SELECT *, {_q(origem)} AS {_q(novo)} FROM {df._view}) AS v"
+    return ConsultaDuckDB(df._con, view, df.columns + [novo], df._filtros, df._params)
+
+def _nan(v):
+    return np.nan if v is None or pd.isna(v) else v
+
+def kpis(df: ConsultaDuckDB, ref_mes: str | None = None) -> dict:
+    r = df.executar("sum(receita) AS receita, count(DISTINCT pedido_id) AS pedidos, sum(itens) AS itens").fetchone()
+    receita, pedidos, itens = _nan(r[0]), int(r[1] or 0), _nan(r[2])
+    ticket = receita / pedidos if pedidos and pd.notna(receita) else np.nan
+
+    yoy = np.nan
+    if ref_mes:  # rollup mensal de receita -> comparativos (mesma regra do core_dataviz)
+        rollup = df.sql("mes, sum(receita) AS receita", extra_where=["mes IS NOT NULL"], tail="GROUP BY mes")
+        yoy = comparativos.linha(comparativos.comparar(rollup, medidas=("receita",)), ref_mes).get("receita_yoy", np.nan)
+
+    return {"Receita":receita,"Pedidos":pedidos,"Itens":itens,"Ticket Médio":ticket,"YoY":yoy}
+
+def valores_distintos(df: ConsultaDuckDB, col: str) -> list:
+    if col not in df.columns: return []
+    t = f"trim(CAST({_q(col)} AS VARCHAR))"
+    return df.sql(f"DISTINCT {t} AS v", extra_where=[f"{_q(col)} IS NOT NULL"], tail="ORDER BY 1")["v"].tolist()
+
+def choices(df: ConsultaDuckDB) -> dict:
+    def _dist(col):
+        if col not in df.columns: return []
+        return df.sql(f"DISTINCT {_q(col)} AS v", extra_where=[f"{_q(col)} IS NOT NULL"], tail="ORDER BY 1")["v"].tolist()
+    return {
+        "anos": [int(x) for x in _dist("ano")],
+        "meses": _dist("mes"),
+        "categorias": _dist("categoria"),
+        "canais": _dist("canal"),
+        "estados": _dist("estado"),
+        "responsaveis": _dist("responsavelpedido"),
+    }
+
+# ---------- agregações por gráfico ----------
+def serie_mensal(df: ConsultaDuckDB) -> pd.DataFrame:
+    return df.sql("mes, sum(receita) AS Receita, count(DISTINCT pedido_id) AS Pedidos, sum(itens) AS Itens",
+                  extra_where=["_data_pedido IS NOT NULL"], tail="GROUP BY mes ORDER BY mes")
+
+def rollup_mensal(df: ConsultaDuckDB, dim: str | None = None) -> pd.DataFrame:
+    chaves = "mes" + (f", {_q(dim)}" if dim else "")
+    return df.sql(f"{chaves}, sum(receita) AS receita, count(DISTINCT pedido_id) AS pedidos, sum(itens) AS itens",
+                  extra_where=["mes IS NOT NULL"] + ([f"{_q(dim)} IS NOT NULL"] if dim else []),
+                  tail=f"GROUP BY {chaves} ORDER BY {chaves}")
+
+def receita_por(df: ConsultaDuckDB, col: str, top: int | None = None) -> pd.DataFrame:
+    if col not in df.columns: return pd.DataFrame(columns=[col, "receita"])
+    tail = f"GROUP BY {_q(col)} ORDER BY receita DESC NULLS LAST" + (f" LIMIT {int(top)}" if top else "")
+    return df.sql(f"{_q(col)}, coalesce(sum(receita), 0) AS receita", tail=tail)
+
+def metrica_por_uf(df: ConsultaDuckDB, metric: str) -> pd.Series:
+    """Série indexada por UF com a métrica escolhida (sempre float >= 0)."""
+    uf_col = "estado" if "estado" in df.columns else ("uf" if "uf" in df.columns else None)
+    if uf_col is None: return pd.Series(dtype=float)
+    if metric == "Ticket Médio":
+        expr = "sum(receita) / nullif(count(DISTINCT pedido_id), 0)"
+    elif metric == "Lucro Líquido" and "lucro_liquido" in df.columns:
+        expr = f"sum(TRY_CAST({_q('lucro_liquido')} AS DOUBLE))"
+    elif metric == "Valor de Comissão" and "valor_comissao" in df.columns:
+        expr = f"sum(TRY_CAST({_q('valor_comissao')} AS DOUBLE))"
+    else:
+        return pd.Series(dtype=float)
+    g = df.sql(f"{_q(uf_col)} AS uf, {expr} AS v", extra_where=[f"{_q(uf_col)} IS NOT NULL"], tail="GROUP BY 1 ORDER BY 1")
+    s = pd.Series(g["v"].to_numpy(), index=pd.Index(g["uf"], name=uf_col))
+    s = pd.to_numeric(s, errors="coerce").fillna(0.0).astype(float)
+    return s.clip(lower=0.0)
+
+def tabela_indicadores(df: ConsultaDuckDB, dims: list[tuple[str, str]]) -> pd.DataFrame:
+    """Agregado por dimensões [(coluna, rótulo)], mesmas métricas do core_dataviz.tabela_indicadores."""
+    cols = [c for c, _ in dims]
+    grupo = ", ".join(_q(c) for c in cols)
+    comissao = f"TRY_CAST({_q('valor_comissao')} AS DOUBLE)" if "valor_comissao" in df.columns else "CAST(NULL AS DOUBLE)"
+    agg = df.sql(
+        f"{grupo}, coalesce(sum(receita), 0) AS valor_total_bruto, "
+        f"avg(CASE WHEN coalesce(itens, 0) > 0 THEN receita / itens END) AS valor, "
+        f"coalesce(sum({comissao}), 0) AS valor_comissao, count(DISTINCT pedido_id) AS qtd_pedido_ordem, "
+        f"coalesce(sum(itens), 0) AS qtd_items",
+        extra_where=[f"{_q(c)} IS NOT NULL" for c in cols],
+        tail=f"GROUP BY {grupo} ORDER BY {grupo}",
+    )
+    return agg.rename(columns={c: label for c, label in dims})
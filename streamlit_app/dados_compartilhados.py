@@ -0,0 +1,170 @@
+"""Dataset do dashboard como recurso único do processo (compartilhado entre sessões).
+
+`montar()` carrega a fonte uma vez e já deixa pronto tudo o que antes era refeito a
+cada sessão/rerun: colunas derivadas (core.load_df), fallback Canal = Forma de
+Pagamento, coluna de Centro de Distribuição e as opções do sidebar.
+
+- pandas: DataFrame com colunas Arrow (core_dataviz.congelar), tratado como somente
+  leitura — filtros e agregações geram frames novos, o original nunca é alterado.
+- duckdb: a ConsultaDuckDB (conexão + view); cada sessão só acumula filtros.
+
+Versão = identidade da fonte (mtime/tamanho do arquivo local ou ETag/Last-Modified da
+URL). O app usa a versão como chave do cache: fonte nova -> dataset novo, o antigo
+sai do cache (max_entries=1) e é liberado quando a última sessão deixa de usá-lo.
+
+Catálogo (<parquet>.catalogo.json, gerado por src/catalogo_dados.py): linhas, período,
+membros das dimensões e taxa de nulos. Com ele, `ler_meta()` monta sidebar e cabeçalho
+sem tocar no fato; sem ele (ou desatualizado), o MetaDataset sai do próprio dataset.
+Desatualizado = assinatura do catálogo (sha256 do footer do parquet) diferente da do
+parquet atual, local (seek na cauda) ou remoto (HTTP Range): pega regravações de
+mesmo tamanho, o que o tamanho/ETag sozinhos não garantem.
+"""
+import json, sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))  # assinatura_parquet (mesma do catalogo_dados)
+from assinatura_parquet import assinatura
+
+FORMATO_CATALOGO = 2
+CENTRO_CANDIDATAS = ["centro_distribuicao_normalizado", "centro_distribuicao", "centro_id", "centro"]
+DERIVADAS = ["_data_pedido", "ano", "mes", "trimestre", "receita", "itens", "pedido_id"]   # core.load_df
+
+@dataclass(frozen=True)
+class MetaDataset:
+    """O que sidebar e cabeçalho precisam: opções de filtro, colunas e resumo da base."""
+    opcoes: dict
+    canal_opts: list
+    centro_col: str | None
+    centro_opts: list
+    canal_fallback: bool
+    colunas: frozenset
+    linhas: int
+    periodo: tuple | None          # (início, fim) em ISO: datas (catálogo) ou meses (dataset)
+    taxa_nulos: dict
+    versao: str
+    origem: str                    # "catálogo" | "dataset"
+
+@dataclass(frozen=True)
+class DatasetCompartilhado:
+    df: object                     # pd.DataFrame (Arrow, somente leitura) | ConsultaDuckDB
+    meta: MetaDataset
+    fonte: str
+    carregado_em: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+def versao_fonte(fonte: str) -> str:
+    """Barato o bastante para rodar a cada poucos segundos: stat() local ou HEAD na URL."""
+    p = Path(fonte)
+    if p.exists():
+        st = p.stat()
+        return f"{st.st_mtime_ns}-{st.st_size}"
+    try:
+        import requests
+        r = requests.head(fonte, timeout=10, allow_redirects=True)
+        r.raise_for_status()
+        return r.headers.get("ETag") or r.headers.get("Last-Modified") or r.headers.get("Content-Length") or "desconhecida"
+    except Exception:
+        return "desconhecida"
+
+# ---------- catálogo ----------
+def caminho_catalogo(fonte: str) -> str | None:
+    if not fonte.endswith(".parquet"): return None   # glob / vários arquivos: sem catálogo
+    return fonte[: -len(".parquet")] + ".catalogo.json"
+
+def ler_catalogo(fonte: str) -> dict | None:
+    """Catálogo da fonte, ou None se não existe, é de outro formato ou não bate com o parquet."""
+    destino = caminho_catalogo(fonte)
+    if destino is None: return None
+    try:
+        if Path(fonte).exists():
+            p = Path(destino)
+            if not p.exists(): return None
+            cat = json.loads(p.read_text(encoding="utf-8"))
+        else:
+            import requests
+            r = requests.get(destino, timeout=10)
+            if r.status_code != 200: return None
+            cat = r.json()
+    except Exception:
+        return None
+    if cat.get("formato") != FORMATO_CATALOGO: return None
+    if not cat.get("assinatura") or cat["assinatura"] != assinatura(fonte): return None   # parquet regravado
+    return cat
+
+def meta_do_catalogo(cat: dict, versao: str) -> MetaDataset | None:
+    dims = cat.get("dimensoes", {})
+    periodo = cat.get("periodo")
+    if not periodo: return None   # sem coluna de data o load_df falha de qualquer jeito
+
+    def membros(col):
+        m = dims.get(col, {}).get("membros")
+        return list(m) if m is not None else []
+
+    brutas = set(cat["colunas"])
+    canal_fallback = "canal" not in brutas and "forma_pagamento" in brutas
+    colunas = brutas | set(DERIVADAS) | ({"canal"} if canal_fallback else set())
+    centro_col = next((c for c in CENTRO_CANDIDATAS if c in colunas), None)
+    if any(c in brutas and dims.get(c, {}).get("membros") is None
+           for c in ["categoria", "estado", "responsavelpedido", centro_col]):
+        return None   # dimensão sem lista no catálogo (cardinalidade alta): opções vêm do dataset
+    canal_opts = membros("forma_pagamento" if canal_fallback else "canal")
+    return MetaDataset(
+        opcoes={
+            "anos": list(periodo["anos"]),
+            "meses": list(periodo["meses"]),
+            "categorias": membros("categoria"),
+            "canais": canal_opts,
+            "estados": membros("estado"),
+            "responsaveis": membros("responsavelpedido"),
+        },
+        canal_opts=canal_opts,
+        centro_col=centro_col,
+        centro_opts=membros(centro_col) if centro_col else [],
+        canal_fallback=canal_fallback,
+        colunas=frozenset(colunas),
+        linhas=int(cat["linhas"]),
+        periodo=(periodo["min"], periodo["max"]),
+        taxa_nulos={c: v["taxa_nulos"] for c, v in cat["colunas"].items()},
+        versao=versao,
+        origem="catálogo",
+    )
+
+def ler_meta(fonte: str, versao: str) -> MetaDataset | None:
+    cat = ler_catalogo(fonte)
+    return meta_do_catalogo(cat, versao) if cat else None
+
+# ---------- dataset ----------
+def meta_do_dataset(core, df, versao: str, canal_fallback: bool) -> MetaDataset:
+    opcoes = core.choices(df)
+    centro_col = next((c for c in CENTRO_CANDIDATAS if c in df.columns), None)
+    anos_meses = opcoes["meses"]
+    return MetaDataset(
+        opcoes=opcoes,
+        canal_opts=core.valores_distintos(df, "canal"),
+        centro_col=centro_col,
+        centro_opts=core.valores_distintos(df, centro_col) if centro_col else [],
+        canal_fallback=canal_fallback,
+        colunas=frozenset(df.columns),
+        linhas=len(df),
+        periodo=(anos_meses[0], anos_meses[-1]) if anos_meses else None,
+        taxa_nulos={},
+        versao=versao,
+        origem="dataset",
+    )
+
+def montar(core, fonte: str | None = None, versao: str | None = None,
+           meta: MetaDataset | None = None) -> DatasetCompartilhado:
+    """Carrega o fato; com `meta` (catálogo) não refaz as varreduras de opções."""
+    fonte = fonte or core.fonte_padrao()
+    versao = versao or versao_fonte(fonte)
+    df = core.load_df(fonte)
+
+    # ---------- Fallback: Canal = Forma de Pagamento ----------
+    canal_fallback = "canal" not in df.columns and "forma_pagamento" in df.columns
+    if canal_fallback:
+        df = core.alias_coluna(df, "canal", "forma_pagamento")
+
+    if meta is None:
+        meta = meta_do_dataset(core, df, versao, canal_fallback)
+    return DatasetCompartilhado(df=df, meta=meta, fonte=fonte)
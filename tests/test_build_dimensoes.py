@@ -0,0 +1,31 @@
+# tests/test_build_dimensoes.py
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import build_dim_produto  # noqa: E402
+import build_dimensoes  # noqa: E402
+
+def test_dim_produto_igual_ao_build_dim_produto(tmp_path):
+    # "Racao A" aparece antes de "Bola B" e muda de categoria (vale a da última linha)
+    fato = pd.DataFrame({
+        "produto": ["Racao A", "Bola B", "Racao A", "Areia C", "Bola B", "Areia C"],
+        "categoriaprod": ["Alimento", "Brinquedo", "Racao", None, "Brinquedo", "Higiene"],
+    })
+    fato_path = tmp_path / "part_001.parquet"
+    fato.to_parquet(fato_path, index=False)
+
+    ref = build_dim_produto.construir_dim(
+        build_dim_produto.carregar_base_distinta(str(fato_path), "produto", "categoriaprod"),
+        "produto", "categoriaprod", "sequencial")
+    dim = build_dimensoes.executar(tmp_path, tmp_path / "dimensoes", apenas=["produto"])["produto"]
+
+    cols = ["produto_id", "produto_nome", "categoria"]
+    esperado = ref[cols].sort_values("produto_id").reset_index(drop=True)
+    obtido = dim[cols].sort_values("produto_id").reset_index(drop=True)
+    assert esperado.values.tolist() == obtido.values.tolist()
+    assert obtido["produto_nome"].tolist() == ["Racao A", "Bola B", "Areia C"]
+    assert obtido["categoria"].tolist() == ["Racao", "Brinquedo", "Higiene"]
@@ -0,0 +1,39 @@
+# tests/test_resolver_nao_casados.py
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from indice_dimensoes import norm  # noqa: E402
+from resolver_nao_casados import aliases, medidas, resolver  # noqa: E402
+
+DIM = [norm("RACAO PREMIUM CAES ADULTOS 15KG"), norm("SHAMPOO NEUTRO 500 ML")]
+IDS = ["P1", "P2"]
+
+def _status(consultas, **kw) -> pd.Series:
+    res = resolver([norm(c) for c in consultas], DIM, IDS, **kw)
+    return res.set_index("consulta")["status"]
+
+def test_gramatura_diferente_nao_casa_automaticamente():
+    status = _status(["RACAO PREMIUM CAES ADULTOS 1KG", "RACAO PREMIUM CAES ADULTOS 10KG"])
+    # Jaccard de trigramas >= 0.75 (0.85 e 0.82), mas é outro produto
+    assert status[norm("RACAO PREMIUM CAES ADULTOS 1KG")] == "sugerido"
+    assert status[norm("RACAO PREMIUM CAES ADULTOS 10KG")] == "sugerido"
+
+def test_mesma_medida_com_escrita_diferente_segue_automatica():
+    status = _status(["RACAO PREMIUM CAES ADULTOS 15 KG"])
+    assert status[norm("RACAO PREMIUM CAES ADULTOS 15 KG")] == "auto"
+    assert medidas("500 gr") == medidas("500g")
+
+def test_cache_antigo_com_auto_de_outra_medida_e_rebaixado(tmp_path):
+    cache = tmp_path / "resolucoes_produto.csv"
+    _status(["RACAO PREMIUM CAES ADULTOS 1KG"], cache_path=cache)
+    antigo = pd.read_csv(cache, encoding="utf-8-sig")
+    antigo["status"] = "auto"          # como gravado antes da regra de medidas
+    antigo.to_csv(cache, index=False, encoding="utf-8-sig")
+
+    res = resolver([norm("RACAO PREMIUM CAES ADULTOS 1KG")], DIM, IDS, cache_path=cache)
+    assert res["status"].tolist() == ["sugerido"]
+    assert aliases(res) == {}
@@ -0,0 +1,40 @@
+# tests/test_roi_publicidade.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from roi_publicidade import analisar  # noqa: E402
+
+MESES = [f"2022-{m:02d}" for m in range(1, 13)]
+
+def _gastos() -> pd.DataFrame:
+    gasto = np.random.default_rng(7).uniform(1_000, 5_000, len(MESES))
+    return pd.DataFrame({"yyyymm": MESES, "midia": "TV", "gasto": gasto, "previsao_mil_unid": 1.0})
+
+def test_lag_usa_mes_de_calendario_com_buraco_nas_vendas():
+    gastos = _gastos()
+    # receita(t) = 1000 + 3 * gasto(t-1); vendas começam em fevereiro e junho/julho não aparecem
+    receita = 1_000 + 3 * gastos["gasto"].to_numpy()[:-1]
+    vendas = pd.DataFrame({"yyyymm": MESES[1:], "receita": receita})
+    vendas = vendas[~vendas["yyyymm"].isin(["2022-06", "2022-07"])]
+
+    lags = analisar(gastos, vendas, lags=(0, 1)).lags.set_index(["midia", "lag"])
+    lag1 = lags.loc[("TV", 1)]
+    assert lag1["n_meses"] == 9        # 11 meses de fev a dez, menos os 2 do buraco
+    assert lag1["correlacao"] == pytest.approx(1.0)
+    assert lag1["receita_por_real"] == pytest.approx(3.0)
+    assert lags.loc[("TV", 0), "correlacao"] < 0.99
+
+def test_meses_sem_gasto_ficam_fora_dos_pares():
+    gastos = _gastos()
+    gastos = gastos[gastos["yyyymm"] != "2022-04"]
+    vendas = pd.DataFrame({"yyyymm": MESES, "receita": 1_000.0 + np.arange(12)})
+
+    lags = analisar(gastos, vendas, lags=(0, 1)).lags.set_index(["midia", "lag"])
+    assert lags.loc[("TV", 0), "n_meses"] == 11
+    assert lags.loc[("TV", 1), "n_meses"] == 10      # jan sem t-1, mai sem o gasto de abril